@@ -7,9 +7,16 @@
 # **********************************************************************
 
 # Imports ----
+import os
+import sys
+
 import nlopt
 import numpy as np
 
+# The evaluation cache is shared with the stochastic algorithms
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "4.Stochastic-Algorithms"))
+from memoization import EvaluationCache
+
 
 # Objective Function ----
 def objective_function(x, grad):
@@ -81,6 +88,23 @@ def g8(x, grad): return - x[17]
 def g9(x, grad): return x[18] - x[19]  # Inactive (removed)
 
 
+# Linear Constraints as A x <= b ----
+# g1, g5, g6 and g8 are linear; in nlopt's sense (g(x) <= 0) each row of A
+# holds the coefficients of g: tal - r, r - exp - mal, qs and -tal
+A_linear = np.zeros((4, 20))
+A_linear[0, [17, 0]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [1, -1, -1]
+A_linear[2, 11] = 1
+A_linear[3, 17] = -1
+b_linear = np.zeros(4)
+
+
+# All the linear constraints in one callback (grad is not used, as in
+# the other constraint functions)
+def linear_constraints(result, x, grad):
+    result[:] = A_linear @ x - b_linear
+
+
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
 lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
                0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
@@ -92,6 +116,16 @@ init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044
                52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
                74.185, 222.395])
 
+# Memoization ----
+# COBYLA re-scores points it has already evaluated (e.g. the initial
+# point); the cache returns their stored values (memoize = False to turn
+# it off)
+memoize = True
+evaluation_cache = EvaluationCache()
+if memoize:
+    objective_function, g2, g3, g4 = (evaluation_cache.memoize(function) for function in
+                                      [objective_function, g2, g3, g4])
+
 # Optimizer Object ----
 # Create an optimizer object with 20 dimensions
 opt = nlopt.opt(nlopt.LN_COBYLA, 20)
@@ -101,14 +135,12 @@ opt.set_min_objective(objective_function)
 
 # Add the inequality constraints
 # with a tolerance for how closely they must be met
-opt.add_inequality_constraint(g1, 1e-3)
+# (the linear constraints g1, g5, g6 and g8 as one vector-valued constraint)
+opt.add_inequality_mconstraint(linear_constraints, [1e-3] * len(b_linear))
 opt.add_inequality_constraint(g2, 1e-3)
 opt.add_inequality_constraint(g3, 1e-3)
 opt.add_inequality_constraint(g4, 1e-3)
-opt.add_inequality_constraint(g5, 1e-3)
-opt.add_inequality_constraint(g6, 1e-3)
 # opt.add_inequality_constraint(g7, 1e-3)
-opt.add_inequality_constraint(g8, 1e-3)
 # opt.add_inequality_constraint(g9, 1e-3)
 
 # Add the equality constraints
@@ -133,3 +165,5 @@ min_f = opt.last_optimum_value()
 
 x_opt_formatted = ", ".join([f"{x:.8f}" for x in x_opt])
 print(f"Optimal solution: [{x_opt_formatted}], Objective function value at optimal solution: {min_f:.8f}")
+if memoize:
+    print(evaluation_cache.summary("COBYLA.py evaluation cache"))
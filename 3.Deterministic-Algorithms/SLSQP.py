@@ -81,6 +81,23 @@ def g8(x, grad): return - x[17]
 def g9(x, grad): return x[18] - x[19]  # Inactive (removed)
 
 
+# Linear Constraints as A x <= b ----
+# g1, g5, g6 and g8 are linear; in nlopt's sense (g(x) <= 0) each row of A
+# holds the coefficients of g: tal - r, r - exp - mal, qs and -tal
+A_linear = np.zeros((4, 20))
+A_linear[0, [17, 0]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [1, -1, -1]
+A_linear[2, 11] = 1
+A_linear[3, 17] = -1
+b_linear = np.zeros(4)
+
+
+# All the linear constraints in one callback (grad is not used, as in
+# the other constraint functions)
+def linear_constraints(result, x, grad):
+    result[:] = A_linear @ x - b_linear
+
+
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
 lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
                0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
@@ -102,14 +119,12 @@ opt.set_min_objective(objective_function)
 
 # Add the inequality constraints
 # with a tolerance for how closely they must be met
-opt.add_inequality_constraint(g1, 1e-3)
+# (the linear constraints g1, g5, g6 and g8 as one vector-valued constraint)
+opt.add_inequality_mconstraint(linear_constraints, [1e-3] * len(b_linear))
 opt.add_inequality_constraint(g2, 1e-3)
 opt.add_inequality_constraint(g3, 1e-3)
 opt.add_inequality_constraint(g4, 1e-3)
-opt.add_inequality_constraint(g5, 1e-3)
-opt.add_inequality_constraint(g6, 1e-3)
 # opt.add_inequality_constraint(g7, 1e-3)
-opt.add_inequality_constraint(g8, 1e-3)
 # opt.add_inequality_constraint(g9, 1e-3)
 
 # Add the equality constraints
@@ -0,0 +1,263 @@
+# **********************************************************************
+# Parallel Basin Hopping (BH) Walkers ----
+#
+# Purpose ----
+# Perform function optimization using several Basin Hopping (BH) walkers
+# that run in parallel, one per process, and share the incumbent (the
+# best solution found so far) after every round of hops. The local
+# minimizer (L-BFGS-B) is given the adaptively penalized objective of
+# BH.py (see constraint_handling.py) together with its exact gradient, so
+# that each local search needs a few calls instead of the 21 calls per
+# finite-difference gradient.
+# **********************************************************************
+
+# Imports ----
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.optimize import basinhopping
+
+from constraint_handling import AdaptivePenalty, PenalizedObjective
+
+
+# Objective Function ----
+def objective_function(x):
+    """
+    The variables and parameters have been coded as follows:
+    x[0] = r
+    x[1] = amp_w
+    x[2] = t_w
+    x[3] = tp_w
+    x[4] = phase_w
+    x[5] = vert_w
+    x[6] = acre
+    x[7] = c_w
+    x[8] = qe
+    x[9] = ce
+    x[10] = qd
+    x[11] = qs
+    x[12] = amp_s
+    x[13] = t_s
+    x[14] = tp_s
+    x[15] = phase_s
+    x[16] = vert_s
+    x[17] = tal
+    x[18] = exp
+    x[19] = mal
+    """
+    return (
+        0.2350747 * x[0] ** (-1.0)
+        + 0.4804318 * (
+            (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+            (x[8] * x[6] * x[9]) ** 0.6
+        )
+        + 0.2811869 * x[10]
+        - 0.9963252 * x[11]
+        - 0.1230044 * ((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10])
+        + 0.2777817 * x[17] ** (-1.0)
+        + 1.1544897 * x[16] ** (-1.0)
+        + 0.1500959 * x[18] ** (-1.0)
+        + 0.1491099 * x[19] ** (-1.0)
+        + 0.0004785
+    )
+
+
+# Gradient of the Objective Function ----
+def objective_gradient(x):
+    grad = np.zeros_like(x, dtype=float)
+
+    # Winter (w) and summer (s) sine factors and their arguments
+    theta_w = (2 * np.pi) / x[2] * (x[3] - x[4])
+    theta_s = (2 * np.pi) / x[13] * (x[14] - x[15])
+    water = x[1] * np.sin(theta_w) + x[5]
+    energy = x[8] * x[6] * x[9]
+    w = water * x[6] * x[7]
+
+    # Cobb-Douglas term: 0.4804318 * w^0.4 * energy^0.6
+    cobb_douglas = 0.4804318 * w ** 0.4 * energy ** 0.6
+    d_w = 0.4 * cobb_douglas / w
+    d_energy = 0.6 * cobb_douglas / energy
+    d_theta_w = d_w * x[1] * np.cos(theta_w) * x[6] * x[7]
+
+    grad[0] = -0.2350747 * x[0] ** (-2.0)
+    grad[1] = d_w * np.sin(theta_w) * x[6] * x[7]
+    grad[2] = d_theta_w * -(2 * np.pi) * (x[3] - x[4]) / x[2] ** 2
+    grad[3] = d_theta_w * (2 * np.pi) / x[2]
+    grad[4] = -grad[3]
+    grad[5] = d_w * x[6] * x[7]
+    grad[6] = d_w * water * x[7] + d_energy * x[8] * x[9]
+    grad[7] = d_w * water * x[6]
+    grad[8] = d_energy * x[6] * x[9]
+    grad[9] = d_energy * x[8] * x[6]
+    grad[10] = 0.2811869 + 0.1230044
+    grad[11] = -0.9963252
+    grad[12] = -0.1230044 * np.sin(theta_s)
+    d_theta_s = -0.1230044 * x[12] * np.cos(theta_s)
+    grad[13] = d_theta_s * -(2 * np.pi) * (x[14] - x[15]) / x[13] ** 2
+    grad[14] = d_theta_s * (2 * np.pi) / x[13]
+    grad[15] = -grad[14]
+    grad[16] = -0.1230044 - 1.1544897 * x[16] ** (-2.0)
+    grad[17] = -0.2777817 * x[17] ** (-2.0)
+    grad[18] = -0.1500959 * x[18] ** (-2.0)
+    grad[19] = -0.1491099 * x[19] ** (-2.0)
+    return grad
+
+
+# Constraint Functions ----
+def g1(x): return x[17] - x[0]
+
+
+def g2(x): return ((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) - x[0]
+
+
+def g3(x): return (x[8] * x[6] * x[9]) - x[0]
+
+
+def g4(x): return np.abs((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) + x[10]) - 1000
+
+
+def g5(x): return x[0] - (x[18] + x[19])
+
+
+def g6(x): return x[11]
+
+
+def g7(x): return x[11] + x[10] - 1000  # Inactive (removed)
+
+
+def g8(x): return - x[17]
+
+
+def g9(x): return x[18] - x[19]  # Inactive (removed)
+
+
+# Constraint Jacobian ----
+def constraints_jacobian(x):
+    """
+    Rows follow the order of the `constraints` list: g1, g2, g3, g4, g5, g6.
+    """
+    jacobian = np.zeros((len(constraints), len(x)))
+    theta_w = (2 * np.pi) / x[2] * (x[3] - x[4])
+    theta_s = (2 * np.pi) / x[13] * (x[14] - x[15])
+    water = x[1] * np.sin(theta_w) + x[5]
+    d_theta_w = x[1] * np.cos(theta_w) * x[6] * x[7]
+
+    # g1 = tal - r
+    jacobian[0, 17], jacobian[0, 0] = 1.0, -1.0
+    # g2 = water * acre * c_w - r
+    jacobian[1, 0] = -1.0
+    jacobian[1, 1] = np.sin(theta_w) * x[6] * x[7]
+    jacobian[1, 2] = d_theta_w * -(2 * np.pi) * (x[3] - x[4]) / x[2] ** 2
+    jacobian[1, 3] = d_theta_w * (2 * np.pi) / x[2]
+    jacobian[1, 4] = -jacobian[1, 3]
+    jacobian[1, 5] = x[6] * x[7]
+    jacobian[1, 6] = water * x[7]
+    jacobian[1, 7] = water * x[6]
+    # g3 = qe * acre * ce - r
+    jacobian[2, 0] = -1.0
+    jacobian[2, 6], jacobian[2, 8], jacobian[2, 9] = x[8] * x[9], x[6] * x[9], x[8] * x[6]
+    # g4 = |amp_s * sin(theta_s) + vert_s + qd| - 1000
+    sign = np.sign(x[12] * np.sin(theta_s) + x[16] + x[10])
+    d_theta_s = sign * x[12] * np.cos(theta_s)
+    jacobian[3, 10] = sign
+    jacobian[3, 12] = sign * np.sin(theta_s)
+    jacobian[3, 13] = d_theta_s * -(2 * np.pi) * (x[14] - x[15]) / x[13] ** 2
+    jacobian[3, 14] = d_theta_s * (2 * np.pi) / x[13]
+    jacobian[3, 15] = -jacobian[3, 14]
+    jacobian[3, 16] = sign
+    # g5 = r - (exp + mal)
+    jacobian[4, 0], jacobian[4, 18], jacobian[4, 19] = 1.0, -1.0, -1.0
+    # g6 = qs
+    jacobian[5, 11] = 1.0
+    return jacobian
+
+
+# Constraints passed as a list of functions
+# Same active set and sense as BH.py: a constraint is satisfied when
+# g(x) >= 0 (g8 = -tal >= 0 is left out: no point within the bounds
+# satisfies it)
+constraints = [g1, g2, g3, g4, g5, g6]
+
+
+def constraint_values(x):
+    return np.array([constraint(x) for constraint in constraints])
+
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
+lb = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+ub = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+ip = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
+               52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
+               74.185, 222.395])
+
+# Walker Settings ----
+number_of_walkers = os.cpu_count() or 1  # One walker (process) per core
+number_of_rounds = 10  # The incumbent is shared after every round
+hops_per_round = 20  # number_of_rounds * hops_per_round = niter of BH.py
+random_seed = 42
+
+minimizer_kwargs = {"method": "L-BFGS-B", "jac": True, "bounds": list(zip(lb, ub))}
+
+
+# Walker ----
+def walk(arguments):
+    """
+    Perform `hops_per_round` basin hops from `start_point` with the given
+    penalty weights and return the best point evaluated by Deb's
+    feasibility rules, its objective value and total violation, the
+    number of function (and gradient) evaluations used and the weights
+    reached. As in BH.py, the weights are updated between two hops only,
+    so that every local minimization sees a fixed (continuous) function.
+    """
+    start_point, seed, weights = arguments
+    penalty = AdaptivePenalty()
+    penalty.weights = weights.copy()
+    penalized_objective = PenalizedObjective(objective_function, constraint_values, penalty,
+                                             objective_gradient=objective_gradient,
+                                             constraints_jacobian=constraints_jacobian)
+
+    def update_penalty(x, f, accept):
+        penalty.flush()
+
+    result = basinhopping(penalized_objective, start_point, minimizer_kwargs=minimizer_kwargs,
+                          niter=hops_per_round, T=1.0, stepsize=0.5, seed=seed, callback=update_penalty)
+    return (penalized_objective.x, penalized_objective.f, penalized_objective.violation,
+            result.nfev, penalty.weights)
+
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    rng = np.random.default_rng(random_seed)
+    penalty = AdaptivePenalty()
+    penalty.calibrate(objective_function, constraint_values, lb, ub, rng=rng)
+    incumbent_x, incumbent_f, incumbent_violation = ip.copy(), np.inf, np.inf
+    total_evaluations = 0
+
+    with Pool(processes=number_of_walkers) as pool:
+        for _ in range(number_of_rounds):
+            # Every walker restarts from the shared incumbent with the shared
+            # weights; the walkers diverge because each one takes its own
+            # random steps
+            seeds = rng.integers(0, 2 ** 31 - 1, size=number_of_walkers)
+            arguments = [(incumbent_x, int(seed), penalty.weights) for seed in seeds]
+            walker_weights = []
+            for x, f, violation, nfev, weights in pool.map(walk, arguments):
+                total_evaluations += nfev
+                walker_weights.append(weights)
+                # Best point by Deb's feasibility rules
+                if (violation, f) < (incumbent_violation, incumbent_f):
+                    incumbent_x, incumbent_f, incumbent_violation = x, f, violation
+            # The next round uses, for each constraint, the largest weight
+            # any walker reached
+            penalty.weights = np.max(walker_weights, axis=0)
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print(f"Optimal solution: {', '.join(f'{value:.8f}' for value in incumbent_x)}"
+          f", Objective function value at optimal solution: {incumbent_f:.8f}")
+    print(f"Constraint violation at optimal solution: {incumbent_violation:.8f}")
+    print(f"Function evaluations (with exact gradient): {total_evaluations}")
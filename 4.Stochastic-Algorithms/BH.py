@@ -9,6 +9,10 @@
 import numpy as np
 from scipy.optimize import basinhopping
 
+from constraint_handling import AdaptivePenalty, PenalizedObjective
+from memoization import EvaluationCache
+from tuning import load_tuned_configuration
+
 
 # Objective Function ----
 def objective_function(x):
@@ -80,17 +84,16 @@ def g8(x): return - x[17]
 def g9(x): return x[18] - x[19]  # Inactive (removed)
 
 
-# Define a wrapper function for applying constraints to the objective function ----
-def constrained_objective(x):
-    penalty = 0
-    # Applying a simple penalty for constraint violations
-    for constraint in constraints:
-        penalty += np.abs(min(0, constraint(x))) * 1e3  # Large penalty for violations
-    return objective_function(x) + penalty
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py: a constraint is satisfied when
+# g(x) >= 0 (g8 = -tal >= 0 is left out: no point within the bounds
+# satisfies it)
+constraints = [g1, g2, g3, g4, g5, g6]
 
 
-# Constraints passed as a list of functions
-constraints = [g1, g2, g3, g4, g5, g6, g8]
+def constraint_values(x):
+    return np.array([constraint(x) for constraint in constraints])
+
 
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
 lb = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
@@ -104,10 +107,58 @@ ip = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
                74.185, 222.395])
 
 
-# Perform the Optimization ----
-minimizer_kwargs = {"method": "L-BFGS-B", "bounds": list(zip(lb, ub))}
-result = basinhopping(constrained_objective, ip, minimizer_kwargs=minimizer_kwargs, niter=200, T=1.0, stepsize=0.5)
+# Basin Hopping Settings ----
+temperature = 1.0
+step_size = 0.5
+
+# Tuned values (see tuning.py), if the tuning was run
+tuned_configuration = load_tuned_configuration("BH")
+temperature = tuned_configuration.get("T", temperature)
+step_size = tuned_configuration.get("stepsize", step_size)
+
+
+# Define a wrapper function for applying constraints to the objective function ----
+# Adaptive penalty (see constraint_handling.py): one weight per constraint,
+# updated between two hops only, so that every local minimization sees a
+# fixed (continuous) function
+# Memoization: points that a hop or a local search revisits are not
+# re-scored (memoize = False to turn it off)
+memoize = True
 
-# Print the Objective Function Value at the Optimal Solution ----
-print(f"Optimal solution: {', '.join(f'{value:.8f}' for value in result.x)}"
-      f", Objective function value at optimal solution: {result.fun:.8f}")
+
+def make_constrained_objective(evaluation_cache=None, telemetry=None, rng=None):
+    penalty = AdaptivePenalty()
+    penalty.calibrate(objective_function, constraint_values, lb, ub, rng=rng)
+    if evaluation_cache is not None:
+        return PenalizedObjective(evaluation_cache.memoize(objective_function),
+                                  evaluation_cache.memoize(constraint_values), penalty, telemetry)
+    return PenalizedObjective(objective_function, constraint_values, penalty, telemetry)
+
+
+def basin_hopping(constrained_objective, temperature, step_size, niter=200, seed=None):
+    """
+    Basin hopping from ip (tuning.py races this same run).
+    """
+    def update_penalty(x, f, accept):
+        constrained_objective.penalty.flush()
+
+    minimizer_kwargs = {"method": "L-BFGS-B", "bounds": list(zip(lb, ub))}
+    return basinhopping(constrained_objective, ip, minimizer_kwargs=minimizer_kwargs, niter=niter, T=temperature,
+                        stepsize=step_size, callback=update_penalty, seed=seed)
+
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    evaluation_cache = EvaluationCache() if memoize else None
+    constrained_objective = make_constrained_objective(evaluation_cache)
+    result = basin_hopping(constrained_objective, temperature, step_size)
+    # Best point by Deb's feasibility rules
+    x_opt = constrained_objective.x
+    min_f, violation = constrained_objective.f, constrained_objective.violation
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print(f"Optimal solution: {', '.join(f'{value:.8f}' for value in x_opt)}"
+          f", Objective function value at optimal solution: {min_f:.8f}")
+    print(f"Constraint violation at optimal solution: {violation:.8f}")
+    if memoize:
+        print(evaluation_cache.summary("BH.py evaluation cache"))
@@ -0,0 +1,148 @@
+# **********************************************************************
+# Differential Evolution (DE) ----
+#
+# Purpose ----
+# Perform function optimization using the Differential Evolution (DE)
+# algorithm. The whole trial population is scored either in one
+# vectorized call or across worker processes, and the constraints are
+# handled as constraints (feasibility rules) rather than as a penalty.
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+from scipy.optimize import LinearConstraint, NonlinearConstraint, differential_evolution
+
+
+# Objective Function ----
+def objective_function(x):
+    """
+    The variables and parameters have been coded as follows:
+    x[0] = r
+    x[1] = amp_w
+    x[2] = t_w
+    x[3] = tp_w
+    x[4] = phase_w
+    x[5] = vert_w
+    x[6] = acre
+    x[7] = c_w
+    x[8] = qe
+    x[9] = ce
+    x[10] = qd
+    x[11] = qs
+    x[12] = amp_s
+    x[13] = t_s
+    x[14] = tp_s
+    x[15] = phase_s
+    x[16] = vert_s
+    x[17] = tal
+    x[18] = exp
+    x[19] = mal
+    """
+    return (
+        0.2350747 * x[0] ** (-1.0)
+        + 0.4804318 * (
+            (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+            (x[8] * x[6] * x[9]) ** 0.6
+        )
+        + 0.2811869 * x[10]
+        - 0.9963252 * x[11]
+        - 0.1230044 * ((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10])
+        + 0.2777817 * x[17] ** (-1.0)
+        + 1.1544897 * x[16] ** (-1.0)
+        + 0.1500959 * x[18] ** (-1.0)
+        + 0.1491099 * x[19] ** (-1.0)
+        + 0.0004785
+    )
+
+
+# Constraint Functions ----
+def g1(x): return x[17] - x[0]
+
+
+def g2(x): return ((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) - x[0]
+
+
+def g3(x): return (x[8] * x[6] * x[9]) - x[0]
+
+
+def g4(x): return np.abs((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) + x[10]) - 1000
+
+
+def g5(x): return x[0] - (x[18] + x[19])
+
+
+def g6(x): return x[11]
+
+
+def g7(x): return x[11] + x[10] - 1000  # Inactive (removed)
+
+
+def g8(x): return - x[17]
+
+
+def g9(x): return x[18] - x[19]  # Inactive (removed)
+
+
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py and CMAES.py: a constraint is
+# satisfied when g(x) >= 0
+constraints = [g1, g2, g3, g4, g5, g6]
+
+# Linear Constraints as A x <= b ----
+# g1, g5 and g6 are linear; in the sense above (g(x) >= 0) each row of A
+# is -g. They are passed as a LinearConstraint (a matrix product inside
+# scipy) instead of through the Python constraint function
+A_linear = np.zeros((3, 20))
+A_linear[0, [0, 17]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [-1, 1, 1]
+A_linear[2, 11] = -1
+b_linear = np.zeros(3)
+nonlinear_constraints = [g2, g3, g4]
+
+
+# All the nonlinear constraints in one call: x is either one solution
+# (shape (20,)) or, in vectorized mode, a whole population (shape (20, S))
+def constraint_values(x):
+    return np.array([constraint(x) for constraint in nonlinear_constraints])
+
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
+lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+upper_bounds = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
+               52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
+               74.185, 222.395])
+
+# DE Settings ----
+# "vectorized": the whole trial population is scored in one call
+# "workers": the trial population is split across all the cores
+evaluation_mode = "vectorized"
+population_size_multiplier = 15  # Population size = 15 * 20 variables
+# Same budget as the nlopt-based algorithms (about 100,000 evaluations)
+number_of_generations = 100000 // (population_size_multiplier * len(init_point)) - 1
+random_seed = 42
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    result = differential_evolution(
+        objective_function,
+        bounds=list(zip(lower_bounds, upper_bounds)),
+        constraints=[LinearConstraint(A_linear, -np.inf, b_linear),
+                     NonlinearConstraint(constraint_values, 0, np.inf)],
+        popsize=population_size_multiplier,
+        maxiter=number_of_generations,
+        x0=init_point,
+        polish=False,
+        seed=random_seed,
+        vectorized=evaluation_mode == "vectorized",
+        workers=-1 if evaluation_mode == "workers" else 1,
+        updating="deferred",
+    )
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in result.x)}"
+          f", Objective function value at optimal solution: {result.fun:.8f}")
@@ -11,6 +11,11 @@ import numpy as np
 import random
 from deap import base, creator, tools, algorithms
 
+from CMAES import repair
+from constraint_handling import EpsilonLevel, epsilon_order, total_violation, violation_matrix
+from memoization import EvaluationCache
+from tuning import load_tuned_configuration
+
 
 # Objective Function ----
 def objective_function(x):
@@ -94,27 +99,64 @@ init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044
                74.185, 222.395])
 
 
-# Constraint Functions as penalty
-def constraint_penalty(individual):
-    x = np.array(individual)
-    penalties = sum([
-        max(0, g1(x)),
-        max(0, g2(x)),
-        max(0, g3(x)),
-        max(0, g4(x)),
-        max(0, g5(x)),
-        max(0, g6(x)),
-        # max(0, g7(x)),
-        max(0, g8(x))
-        # max(0, g9(x)),
-    ])
-    return penalties,
+# Linear Constraints as A x <= b ----
+# g1, g5 and g6 are linear; in the sense used below (same active set and
+# sense as PSO.py: a constraint is satisfied when g(x) >= 0) each row of A
+# is -g: r - tal <= 0, exp + mal - r <= 0 and -qs <= 0
+A_linear = np.zeros((3, 20))
+A_linear[0, [0, 17]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [-1, 1, 1]
+A_linear[2, 11] = -1
+b_linear = np.zeros(3)
+nonlinear_constraints = [g2, g3, g4]
+
+
+# All the constraint values (satisfied when >= 0)
+def constraint_values(x):
+    return np.concatenate([b_linear - A_linear @ x, [constraint(x) for constraint in nonlinear_constraints]])
+
+
+# Constraint Handling ----
+# "feasibility rules": Deb's rules, from the lexicographic fitness
+# (violation, f) compared by the usual tournament
+# "epsilon": epsilon-constrained tournament, in which a violation up to a
+# level that decreases to 0 over `epsilon_generations` counts as feasible
+constraint_handling = "feasibility rules"
+epsilon_generations = 50
+
+# Memoization ----
+# DEAP invalidates the fitness of every mated or mutated individual, even
+# when the variation left it unchanged; the cache returns the fitness of
+# the individuals that were already scored (memoize = False to turn it off)
+memoize = True
+evaluation_cache = EvaluationCache()
 
 
 # Perform the Optimization ----
 def objective(individual):
     x = np.array(individual)
-    return objective_function(x),  # Note: grad is not used
+    violation = total_violation(violation_matrix(constraint_values(x)))[0]
+    return float(violation), float(objective_function(x))  # Note: grad is not used
+
+
+# Tournament on the epsilon-constrained ranking of the population
+epsilon_level = None
+generation = 0
+
+
+def selEpsilonTournament(individuals, k, tournsize):
+    global epsilon_level, generation
+    violation, f = np.array([ind.fitness.values for ind in individuals]).T
+    if epsilon_level is None:
+        epsilon_level = EpsilonLevel(violation, epsilon_generations)
+    rank = np.empty(len(individuals), dtype=int)
+    rank[epsilon_order(f, violation, epsilon_level(generation))] = np.arange(len(individuals))
+    generation += 1
+    chosen = []
+    for _ in range(k):
+        aspirants = [random.randrange(len(individuals)) for _ in range(tournsize)]
+        chosen.append(individuals[min(aspirants, key=lambda i: rank[i])])
+    return chosen
 
 
 # Modify the individual if it violates the bounds
@@ -132,37 +174,78 @@ def checkBounds(mins, maxs):
         return wrapper
     return decorator
 
-creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+
+# Repair the offspring if they violate the linear constraints (bisection
+# projection of CMAES.py, which has the same A x <= b as above)
+def repairLinearConstraints():
+    def decorator(func):
+        def wrapper(*args, **kargs):
+            offspring = func(*args, **kargs)
+            X = repair(np.array(offspring, dtype=float), lower_bounds, upper_bounds)
+            for child, x in zip(offspring, X):
+                child[:] = x.tolist()
+            return offspring
+        return wrapper
+    return decorator
+
+# Lexicographic fitness (violation first, then f): DEAP compares fitness
+# values as tuples, which gives Deb's feasibility rules
+creator.create("FitnessMin", base.Fitness, weights=(-1.0, -1.0))
 creator.create("Individual", list, fitness=creator.FitnessMin)
 
-toolbox = base.Toolbox()
-toolbox.register("attr_float", random.uniform, lower_bounds[0], upper_bounds[0])
-toolbox.register("individual", tools.initRepeat, creator.Individual,
-                 toolbox.attr_float, n=len(lower_bounds))
-toolbox.register("population", tools.initRepeat, list, toolbox.individual)
 
-toolbox.register("evaluate", objective)
-toolbox.decorate("evaluate", tools.DeltaPenalty(constraint_penalty, 1000))
-toolbox.register("mate", tools.cxBlend, alpha=0.5)
-toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.1)
-toolbox.register("select", tools.selTournament, tournsize=3)
-toolbox.decorate("mate", checkBounds(lower_bounds, upper_bounds))
-toolbox.decorate("mutate", checkBounds(lower_bounds, upper_bounds))
+def make_toolbox(evaluate):
+    """
+    The GA's operators, with `evaluate` as the fitness function (tuning.py
+    races this same toolbox).
+    """
+    toolbox = base.Toolbox()
+    toolbox.register("attr_float", random.uniform, lower_bounds[0], upper_bounds[0])
+    toolbox.register("individual", tools.initRepeat, creator.Individual,
+                     toolbox.attr_float, n=len(lower_bounds))
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+
+    toolbox.register("evaluate", evaluate)
+    toolbox.register("mate", tools.cxBlend, alpha=0.5)
+    toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.1)
+    if constraint_handling == "epsilon":
+        toolbox.register("select", selEpsilonTournament, tournsize=3)
+    else:
+        toolbox.register("select", tools.selTournament, tournsize=3)
+    toolbox.decorate("mate", checkBounds(lower_bounds, upper_bounds))
+    toolbox.decorate("mutate", checkBounds(lower_bounds, upper_bounds))
+    toolbox.decorate("mate", repairLinearConstraints())
+    toolbox.decorate("mutate", repairLinearConstraints())
+    return toolbox
+
 
 population_size = 50
 crossover_probability = 0.7
 mutation_probability = 0.2
 number_of_generations = 100
 
-pop = toolbox.population(n=population_size)
-hof = tools.HallOfFame(1)
-stats = tools.Statistics(lambda ind: ind.fitness.values)
-stats.register("avg", np.mean)
-stats.register("min", min)
-stats.register("max", max)
-
-result, log = algorithms.eaSimple(pop, toolbox, cxpb=crossover_probability, mutpb=mutation_probability,
-                                   ngen=number_of_generations, stats=stats, halloffame=hof, verbose=True)
-
-# Print the Objective Function Value at the Optimal Solution ----
-print("Optimal solution:", hof[0], " Objective function value at optimal solution:", hof[0].fitness.values)
+# Tuned values (see tuning.py), if the tuning was run
+tuned_configuration = load_tuned_configuration("GA")
+population_size = tuned_configuration.get("population_size", population_size)
+crossover_probability = tuned_configuration.get("crossover_probability", crossover_probability)
+mutation_probability = tuned_configuration.get("mutation_probability", mutation_probability)
+number_of_generations = tuned_configuration.get("number_of_generations", number_of_generations)
+
+if __name__ == "__main__":
+    toolbox = make_toolbox(evaluation_cache.memoize(objective) if memoize else objective)
+    pop = toolbox.population(n=population_size)
+    hof = tools.HallOfFame(1)
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("avg", np.mean, axis=0)
+    stats.register("min", min)
+    stats.register("max", max)
+    stats.register("feasible", lambda values: sum(violation == 0 for violation, _ in values))
+
+    result, log = algorithms.eaSimple(pop, toolbox, cxpb=crossover_probability, mutpb=mutation_probability,
+                                       ngen=number_of_generations, stats=stats, halloffame=hof, verbose=True)
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print("Optimal solution:", hof[0], " Objective function value at optimal solution:", hof[0].fitness.values[1],
+          " Constraint violation at optimal solution:", hof[0].fitness.values[0])
+    if memoize:
+        print(evaluation_cache.summary("GA.py evaluation cache"))
@@ -0,0 +1,185 @@
+# **********************************************************************
+# Island-Model Improved Stochastic Ranking Evolution Strategy (ISRES) ----
+#
+# Purpose ----
+# Perform function optimization using several Improved Stochastic Ranking
+# Evolution Strategy (ISRES) populations ("islands") that evolve in
+# parallel, one per process. Each island keeps its population and step
+# sizes from one epoch to the next (ask_tell.StochasticRanking, since
+# nlopt's GN_ISRES cannot be resumed); every few generations, each island
+# receives the best individual of its neighbour (ring migration) and the
+# global incumbent is gathered from all the islands at the end.
+# **********************************************************************
+
+# Imports ----
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from ask_tell import BatchEvaluator, StochasticRanking, run
+
+
+# Objective Function ----
+def objective_function(x, grad):
+    """
+    The variables and parameters have been coded as follows:
+    x[0] = r
+    x[1] = amp_w
+    x[2] = t_w
+    x[3] = tp_w
+    x[4] = phase_w
+    x[5] = vert_w
+    x[6] = acre
+    x[7] = c_w
+    x[8] = qe
+    x[9] = ce
+    x[10] = qd
+    x[11] = qs
+    x[12] = amp_s
+    x[13] = t_s
+    x[14] = tp_s
+    x[15] = phase_s
+    x[16] = vert_s
+    x[17] = tal
+    x[18] = exp
+    x[19] = mal
+    """
+    return (
+        0.2350747 * x[0] ** (-1.0)
+        + 0.4804318 * (
+            (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+            (x[8] * x[6] * x[9]) ** 0.6
+        )
+        + 0.2811869 * x[10]
+        - 0.9963252 * x[11]
+        - 0.1230044 * ((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10])
+        + 0.2777817 * x[17] ** (-1.0)
+        + 1.1544897 * x[16] ** (-1.0)
+        + 0.1500959 * x[18] ** (-1.0)
+        + 0.1491099 * x[19] ** (-1.0)
+        + 0.0004785
+    )
+
+
+# Constraint Functions ----
+def g1(x, grad): return x[17] - x[0]
+
+
+def g2(x, grad): return ((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) - x[0]
+
+
+def g3(x, grad): return (x[8] * x[6] * x[9]) - x[0]
+
+
+def g4(x, grad): return np.abs((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) + x[10]) - 1000
+
+
+def g5(x, grad): return x[0] - (x[18] + x[19])
+
+
+def g6(x, grad): return x[11]
+
+
+def g7(x, grad): return x[11] + x[10] - 1000  # Inactive (removed)
+
+
+def g8(x, grad): return - x[17]
+
+
+def g9(x, grad): return x[18] - x[19]  # Inactive (removed)
+
+
+# Same active set as ISRES.py: the nonlinear constraints as a list of
+# functions and the linear ones (g1, g5, g6 and g8) as A x <= b, where in
+# nlopt's sense (g(x) <= 0) each row of A holds the coefficients of g
+nonlinear_constraints = [g2, g3, g4]
+A_linear = np.zeros((4, 20))
+A_linear[0, [17, 0]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [1, -1, -1]
+A_linear[2, 11] = 1
+A_linear[3, 17] = -1
+b_linear = np.zeros(4)
+constraint_tolerance = 1e-3
+
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
+lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+upper_bounds = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
+               52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
+               74.185, 222.395])
+
+# Island-Model Settings ----
+number_of_islands = os.cpu_count() or 1  # One island (process) per core
+population_size = 20 * (len(init_point) + 1)  # nlopt's default ISRES population
+migration_interval = 10  # Generations between two migrations (k)
+evaluations_per_island = 100000  # Same budget per island as ISRES.py
+random_seed = 42
+
+
+# Evaluation of Individuals ----
+def total_violation(X):
+    violation = (sum(np.maximum(0.0, constraint(X.T, None)) for constraint in nonlinear_constraints)
+                 + np.maximum(0.0, X @ A_linear.T - b_linear).sum(axis=1))
+    # Within the tolerance, an individual counts as feasible
+    return np.where(violation <= constraint_tolerance, 0.0, violation)
+
+
+def evaluate_population(X):
+    return objective_function(X.T, None), total_violation(X)
+
+
+# Island Worker ----
+def evolve_island(island):
+    """
+    Evolve one island for `migration_interval` generations and return it
+    (population included) with its best individual over these generations.
+    """
+    incumbent = run(island, BatchEvaluator(evaluate_population), migration_interval * population_size)
+    return island, incumbent
+
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    rng = np.random.default_rng(random_seed)
+    evaluations_per_epoch = migration_interval * population_size
+    number_of_epochs = max(1, evaluations_per_island // evaluations_per_epoch)
+
+    # Every island seeds its population with the initial point; the
+    # islands diverge because each one uses its own random generator
+    islands = [
+        StochasticRanking(lower_bounds, upper_bounds, x0=init_point, population_size=population_size,
+                          rng=np.random.default_rng(seed))
+        for seed in rng.integers(0, 2 ** 31 - 1, size=number_of_islands)
+    ]
+    island_x = [init_point.copy()] * number_of_islands
+    island_f = [objective_function(init_point, None)] * number_of_islands
+    island_violation = [total_violation(init_point[None, :])[0]] * number_of_islands
+
+    with Pool(processes=number_of_islands) as pool:
+        for epoch in range(number_of_epochs):
+            results = pool.map(evolve_island, islands)
+            islands = [island for island, _ in results]
+            for i, (_, incumbent) in enumerate(results):
+                if (incumbent.violation, incumbent.f) < (island_violation[i], island_f[i]):
+                    island_x[i], island_f[i], island_violation[i] = incumbent.x, incumbent.f, incumbent.violation
+
+            # Ring migration: each island receives the best individual of
+            # its neighbour in place of its worst one, if the migrant is better
+            for i in range(number_of_islands):
+                _, migrant = results[i - 1]
+                islands[i].inject(migrant.x, migrant.f, migrant.violation)
+
+    # Gather the global incumbent from all the islands (Deb's feasibility rules)
+    best = min(range(number_of_islands), key=lambda i: (island_violation[i], island_f[i]))
+    x_opt, min_f, violation = island_x[best], island_f[best], island_violation[best]
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in x_opt)}"
+          f", Objective function value at optimal solution: {min_f:.8f}"
+          f", Constraint violation: {violation:.8f}")
@@ -10,6 +10,8 @@
 import nlopt
 import numpy as np
 
+from telemetry import Telemetry
+
 
 # Objective Function ----
 def objective_function(x, grad):
@@ -81,6 +83,23 @@ def g8(x, grad): return - x[17]
 def g9(x, grad): return x[18] - x[19]  # Inactive (removed)
 
 
+# Linear Constraints as A x <= b ----
+# g1, g5, g6 and g8 are linear; in nlopt's sense (g(x) <= 0) each row of A
+# holds the coefficients of g: tal - r, r - exp - mal, qs and -tal
+A_linear = np.zeros((4, 20))
+A_linear[0, [17, 0]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [1, -1, -1]
+A_linear[2, 11] = 1
+A_linear[3, 17] = -1
+b_linear = np.zeros(4)
+
+
+# All the linear constraints in one callback (grad is not used, as in
+# the other constraint functions)
+def linear_constraints(result, x, grad):
+    result[:] = A_linear @ x - b_linear
+
+
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
 lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
                0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
@@ -92,23 +111,42 @@ init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044
                52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
                74.185, 222.395])
 
+# Telemetry (see telemetry.py): a port to serve the metrics over HTTP
+# (e.g. 9100) and/or a file to append them to; None turns it off
+telemetry_port = None
+telemetry_file = None  # e.g. "ISRES-telemetry.jsonl"
+telemetry = None
+if telemetry_port is not None or telemetry_file is not None:
+    # nlopt's ISRES uses a population of 20 (n + 1) by default
+    telemetry = Telemetry("ISRES.py", port=telemetry_port, path=telemetry_file, population_size=20 * (20 + 1),
+                          tolerance=1e-3)
+
+
+# Objective function that also reports every evaluation (nlopt evaluates
+# the constraints separately, so they are evaluated here for the
+# feasibility only when the telemetry is on)
+def monitored_objective_function(x, grad):
+    f = objective_function(x, grad)
+    g = np.concatenate([A_linear @ x - b_linear, [g2(x, grad), g3(x, grad), g4(x, grad)]])
+    telemetry.observe(f, np.sum(np.maximum(0.0, g)))
+    return f
+
+
 # Optimizer Object ----
 # Create an optimizer object with 20 dimensions
 opt = nlopt.opt(nlopt.GN_ISRES, 20)
 
 # Set the objective function
-opt.set_min_objective(objective_function)
+opt.set_min_objective(objective_function if telemetry is None else monitored_objective_function)
 
 # Add the inequality constraints
 # with a tolerance for how closely they must be met
-opt.add_inequality_constraint(g1, 1e-3)
+# (the linear constraints g1, g5, g6 and g8 as one vector-valued constraint)
+opt.add_inequality_mconstraint(linear_constraints, [1e-3] * len(b_linear))
 opt.add_inequality_constraint(g2, 1e-3)
 opt.add_inequality_constraint(g3, 1e-3)
 opt.add_inequality_constraint(g4, 1e-3)
-opt.add_inequality_constraint(g5, 1e-3)
-opt.add_inequality_constraint(g6, 1e-3)
 # opt.add_inequality_constraint(g7, 1e-3)
-opt.add_inequality_constraint(g8, 1e-3)
 # opt.add_inequality_constraint(g9, 1e-3)
 
 # Add the equality constraints
@@ -125,10 +163,14 @@ opt.set_maxeval(100000)
 
 # Perform the Optimization ----
 # Initialization point
+if telemetry is not None:
+    telemetry.start()
 x_opt = opt.optimize([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
                52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
                74.185, 222.395])
 min_f = opt.last_optimum_value()
+if telemetry is not None:
+    telemetry.stop()
 
 # Print the Objective Function Value at the Optimal Solution ----
 # print(f"Optimal solution found: {x_opt}, with minimum value: {min_f}")
@@ -0,0 +1,260 @@
+# **********************************************************************
+# Multi-Objective Optimization with NSGA-II ----
+#
+# Purpose ----
+# Compute the trade-off (Pareto front) between the objective function and
+# a second objective, e.g. the total fees (exp + mal) or the revenue r,
+# instead of a single optimum. The populations are numpy arrays (one
+# candidate per row) rather than lists of DEAP individuals, so that
+# populations of 10^4 and more are practical:
+# - every generation is scored in one batched call (evaluate_population);
+# - the non-dominated sort of two objectives takes O(N log N) (a sweep in
+#   the order of the first objective with a binary search over the fronts)
+#   and the one of more objectives O(M N^2) in vectorized blocks;
+# - the crowding distances are computed for all the fronts at once.
+# The constraints are handled by constrained domination (feasible before
+# infeasible, infeasible by total violation), and the linear constraints
+# are repaired as in CMAES.py. The Pareto front of all the feasible points
+# evaluated so far is kept in an archive that is updated incrementally:
+# new points that the archive dominates are rejected by a binary search,
+# and only the others are merged.
+# **********************************************************************
+
+# Imports ----
+import csv
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from CMAES import evaluate_population, ip, lb, repair, ub
+
+# NSGA-II Settings ----
+population_size = 10000
+number_of_generations = 100
+crossover_probability = 0.9
+crossover_eta = 15  # Distribution index of the simulated binary crossover
+mutation_eta = 20  # Distribution index of the polynomial mutation
+archive_capacity = 10000  # The most crowded points are dropped beyond it
+output_file = "NSGA2-front.csv"
+random_seed = 42
+
+# Second objective (minimized), computed on a whole population at once
+second_objectives = {
+    "total fees": lambda X: X[:, 18] + X[:, 19],  # exp + mal
+    "revenue": lambda X: -X[:, 0],  # Maximize r
+    "slack of g5": lambda X: -(X[:, 0] - X[:, 18] - X[:, 19]),  # Maximize r - (exp + mal)
+}
+second_objective = "total fees"
+
+
+# Non-Dominated Sorting ----
+def non_dominated_ranks(F):
+    """
+    Front of every point (0 for the non-dominated points) for objectives F
+    (one row per point, one column per objective, all minimized).
+    """
+    if F.shape[1] == 2:
+        return _non_dominated_ranks_2d(F)
+    return _non_dominated_ranks_blocks(F)
+
+
+def _non_dominated_ranks_2d(F):
+    # In the order of (f1, f2), a point can only be dominated by earlier
+    # points. The lowest f2 of the fronts increases with the front, so the
+    # front of a point is found by a binary search: the first front whose
+    # lowest f2 is above the point's f2 (identical points share a front).
+    order = np.lexsort((F[:, 1], F[:, 0]))
+    ranks = np.empty(len(F), dtype=int)
+    lowest = []  # Lowest f2 of every front
+    previous, previous_rank = None, -1
+    for i in order:
+        point = (F[i, 0], F[i, 1])
+        if point == previous:
+            rank = previous_rank
+        else:
+            rank = bisect_right(lowest, point[1])
+            if rank == len(lowest):
+                lowest.append(point[1])
+            else:
+                lowest[rank] = point[1]
+        ranks[i] = rank
+        previous, previous_rank = point, rank
+    return ranks
+
+
+def _non_dominated_ranks_blocks(F, block_size=1024):
+    # Fast non-dominated sort (domination counts and dominated sets),
+    # with the N x N domination matrix built in blocks of rows
+    n = len(F)
+    dominates = np.zeros((n, n), dtype=bool)
+    for start in range(0, n, block_size):
+        A = F[start:start + block_size, None, :]
+        dominates[start:start + block_size] = np.all(A <= F[None], axis=2) & np.any(A < F[None], axis=2)
+    counts = dominates.sum(axis=0)
+    ranks = np.full(n, -1)
+    front, rank = np.flatnonzero(counts == 0), 0
+    while len(front):
+        ranks[front] = rank
+        counts -= dominates[front].sum(axis=0)
+        counts[front] = -1
+        front, rank = np.flatnonzero(counts == 0), rank + 1
+    return ranks
+
+
+def constrained_ranks(F, violation):
+    """
+    Constrained domination: the feasible points are sorted into fronts,
+    and the infeasible ones follow, ranked by their total violation.
+    """
+    ranks = np.empty(len(F), dtype=int)
+    feasible = violation <= 0
+    ranks[feasible] = non_dominated_ranks(F[feasible]) if feasible.any() else 0
+    start = ranks[feasible].max() + 1 if feasible.any() else 0
+    infeasible = np.flatnonzero(~feasible)
+    ranks[infeasible] = start + np.unique(violation[infeasible], return_inverse=True)[1]
+    return ranks
+
+
+def crowding_distances(F, ranks):
+    """
+    Crowding distance of every point within its front, for all the fronts
+    at once (infinite at the extremes of a front).
+    """
+    distances = np.zeros(len(F))
+    for m in range(F.shape[1]):
+        order = np.lexsort((F[:, m], ranks))
+        values, fronts = F[order, m], ranks[order]
+        span = np.ptp(values) or 1.0
+        gap = np.full(len(F), np.inf)
+        inner = (fronts[:-2] == fronts[1:-1]) & (fronts[1:-1] == fronts[2:])
+        gap[1:-1] = np.where(inner, (values[2:] - values[:-2]) / span, np.inf)
+        distances[order] += gap
+    return distances
+
+
+# Variation ----
+def tournament(rng, ranks, distances, size):
+    """
+    Binary tournaments: lower front, then larger crowding distance.
+    """
+    a, b = rng.integers(len(ranks), size=(2, size))
+    better = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (distances[a] > distances[b]))
+    return np.where(better, a, b)
+
+
+def variation(rng, parents):
+    """
+    Simulated binary crossover and polynomial mutation in coordinates
+    normalized to the bounds, for the whole population at once.
+    """
+    span = ub - lb
+    U = (parents - lb) / span
+    n, d = U.shape
+    first, second = U[0::2], U[1::2]
+    if len(second) < len(first):
+        second = np.vstack([second, U[:1]])  # Odd population: the last parent mates with the first
+
+    # Simulated binary crossover (SBX), variable by variable
+    u = rng.random(first.shape)
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (crossover_eta + 1)), (1 / (2 * (1 - u))) ** (1 / (crossover_eta + 1)))
+    crossed = (rng.random(len(first)) < crossover_probability)[:, None] & (rng.random(first.shape) < 0.5)
+    beta = np.where(crossed, beta, 1.0)
+    children = np.vstack([0.5 * ((1 + beta) * first + (1 - beta) * second),
+                          0.5 * ((1 - beta) * first + (1 + beta) * second)])[:n]
+
+    # Polynomial mutation, with probability 1/d per variable
+    u = rng.random(children.shape)
+    delta = np.where(u < 0.5, (2 * u) ** (1 / (mutation_eta + 1)) - 1, 1 - (2 * (1 - u)) ** (1 / (mutation_eta + 1)))
+    mutated = rng.random(children.shape) < 1 / d
+    children = np.clip(children + np.where(mutated, delta, 0.0), 0, 1)
+    return repair(lb + children * span)
+
+
+# Pareto Archive ----
+class ParetoArchive:
+    """
+    Non-dominated feasible points (two objectives) found so far, sorted by
+    the first objective (the second one is then decreasing). New points are
+    first checked against the archive with a binary search, so that the
+    usual dominated offspring cost O(log A) each, and only the remaining
+    ones are merged into the front.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.X = np.empty((0, len(ip)))
+        self.F = np.empty((0, 2))
+
+    def add(self, X, F):
+        if len(self.F):
+            # The archived point with the largest f1 <= f1 of a new point has
+            # the lowest f2 of all the archived points with f1 <= f1
+            k = np.searchsorted(self.F[:, 0], F[:, 0], side="right") - 1
+            previous = self.F[np.maximum(k, 0)]
+            dominated = (k >= 0) & (previous[:, 1] <= F[:, 1]) & np.any(previous != F, axis=1)
+            X, F = X[~dominated], F[~dominated]
+        if not len(F):
+            return 0
+        X, F = np.vstack([self.X, X]), np.vstack([self.F, F])
+        front = non_dominated_ranks(F) == 0
+        X, F = X[front], F[front]
+        # Identical objective values are kept once
+        F, unique = np.unique(F, axis=0, return_index=True)
+        self.X, self.F = X[unique], F
+        if self.capacity is not None and len(self.F) > self.capacity:
+            keep = np.sort(np.argsort(-crowding_distances(self.F, np.zeros(len(self.F), dtype=int)),
+                                      kind="stable")[:self.capacity])
+            self.X, self.F = self.X[keep], self.F[keep]
+        return len(F)
+
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    rng = np.random.default_rng(random_seed)
+    objective_2 = second_objectives[second_objective]
+    start_time = time.perf_counter()
+
+    def evaluate(X):
+        f, violation = evaluate_population(X)
+        return np.column_stack([f, objective_2(X)]), violation
+
+    population = repair(lb + rng.random((population_size, len(ip))) * (ub - lb))
+    F, violation = evaluate(population)
+    archive = ParetoArchive(capacity=archive_capacity)
+    archive.add(population[violation <= 0], F[violation <= 0])
+    ranks = constrained_ranks(F, violation)
+    distances = crowding_distances(F, ranks)
+
+    for generation in range(number_of_generations):
+        offspring = variation(rng, population[tournament(rng, ranks, distances, population_size)])
+        F_offspring, violation_offspring = evaluate(offspring)
+        feasible = violation_offspring <= 0
+        archive.add(offspring[feasible], F_offspring[feasible])
+
+        # Elitist survival among the parents and the offspring
+        population = np.vstack([population, offspring])
+        F, violation = np.vstack([F, F_offspring]), np.concatenate([violation, violation_offspring])
+        ranks = constrained_ranks(F, violation)
+        distances = crowding_distances(F, ranks)
+        survivors = np.lexsort((-distances, ranks))[:population_size]
+        population, F, violation = population[survivors], F[survivors], violation[survivors]
+        ranks, distances = ranks[survivors], distances[survivors]
+        if generation % 10 == 9:
+            print(f"Generation {generation + 1}: {np.sum(violation <= 0)} feasible, "
+                  f"{len(archive.F)} points on the archived front")
+    elapsed = time.perf_counter() - start_time
+
+    # Save the Pareto Front ----
+    with open(output_file, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["objective_function", second_objective] + [f"x[{i}]" for i in range(len(ip))])
+        for x, values in zip(archive.X, archive.F):
+            writer.writerow(list(values) + list(x))
+
+    # Print the Extremes of the Pareto Front ----
+    print(f"Pareto front: {len(archive.F)} points (saved in {output_file}), "
+          f"{population_size * (number_of_generations + 1)} evaluations in {elapsed:.3f} seconds")
+    for name, i in [("Best objective function value", 0), (f"Best {second_objective}", -1)]:
+        print(f"{name}: Objective function value: {archive.F[i, 0]:.8f}, "
+              f"{second_objective}: {archive.F[i, 1]:.8f}")
@@ -10,6 +10,11 @@
 import numpy as np
 from pyswarm import pso
 
+from constraint_handling import AdaptivePenalty, PenalizedObjective
+from solution_archive import SolutionArchive
+from telemetry import Telemetry
+from tuning import load_tuned_configuration
+
 
 # Objective Function ----
 def objective_function(x):
@@ -81,8 +86,20 @@ def g8(x): return - x[17]
 def g9(x): return x[18] - x[19]  # Inactive (removed)
 
 
-# Constraints passed as a list of functions
-constraints = [g1, g2, g3, g4, g5, g6]
+# All the constraint values (satisfied when >= 0): the linear ones (g1, g5
+# and g6) as b - A x, in one matrix product, and the nonlinear ones as a
+# list of functions
+A_linear = np.zeros((3, 20))
+A_linear[0, [0, 17]] = [1, -1]
+A_linear[1, [0, 18, 19]] = [-1, 1, 1]
+A_linear[2, 11] = -1
+b_linear = np.zeros(3)
+nonlinear_constraints = [g2, g3, g4]
+
+
+def constraint_values(x):
+    return np.concatenate([b_linear - A_linear @ x, [constraint(x) for constraint in nonlinear_constraints]])
+
 
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
 lb = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
@@ -95,25 +112,68 @@ ip = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
                52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
                74.185, 222.395])
 
+# PSO Settings ----
+swarm_size = 100
+omega, phip, phig = 0.5, 0.5, 0.5  # pyswarm's defaults
+
+# Tuned values (see tuning.py), if the tuning was run
+tuned_configuration = load_tuned_configuration("PSO")
+swarm_size = tuned_configuration.get("swarm_size", swarm_size)
+omega = tuned_configuration.get("omega", omega)
+phip = tuned_configuration.get("phip", phip)
+phig = tuned_configuration.get("phig", phig)
+
+
+# Adaptive Penalty for Constraints
+# Instead of ignoring infeasible particles (pyswarm's constraint handling,
+# which leaves the swarm nothing to follow until particles happen to be
+# feasible), infeasible particles are penalized with one weight per
+# constraint, updated every generation (see constraint_handling.py)
+def make_penalized_objective(swarm_size, telemetry=None, rng=None):
+    penalty = AdaptivePenalty(window=swarm_size)
+    penalty.calibrate(objective_function, constraint_values, lb, ub, rng=rng)
+    return PenalizedObjective(objective_function, constraint_values, penalty, telemetry)
+
+
 # Perform the Optimization ----
-xopt, fopt = pso(objective_function, lb, ub, ieqcons=constraints,
-                 f_ieqcons=None, maxiter=100000, swarmsize=100, debug=True)
-
-# Print the Objective Function Value at the Optimal Solution ----
-# print("Optimal solution:", xopt)
-# print("Objective function value at optimal solution:", fopt)
-
-# print("Optimal solution:")
-# for value in xopt:
-#     print(f"{value:.8f}")
-# print(f"Objective function value at optimal solution: {fopt:.8f}")
-print(f"Optimal solution: {', '.join(f'{value:.8f}' for value in xopt)}"
-      f", Objective function value at optimal solution: {fopt:.8f}")
-
-# Optimal Solution ----
-# Optimal solution leads to an objective function value of -3,515.885829
-optimized_x = np.array([197.3555162, 10000.04094, 6.06058071, 6.06481227,
-                        4.55822528, 26305.20034, 4.36023396, 0.00221809,
-                        55.86751226, 1.54009833, 720.005943, 3600.099775,
-                        524.0792289, 6.04250929, 6.03679917, 4.55245179,
-                        2082.596513, 4423.625629, 52.0247252, 51.7242541])
+if __name__ == "__main__":
+    # Telemetry (see telemetry.py): a port to serve the metrics over HTTP
+    # (e.g. 9100) and/or a file to append them to; None turns it off
+    telemetry_port = None
+    telemetry_file = None  # e.g. "PSO-telemetry.jsonl"
+    telemetry = None
+    if telemetry_port is not None or telemetry_file is not None:
+        telemetry = Telemetry("PSO.py", port=telemetry_port, path=telemetry_file, population_size=swarm_size)
+    penalized_objective_function = make_penalized_objective(swarm_size, telemetry)
+
+    if telemetry is not None:
+        telemetry.start()
+    pso(penalized_objective_function, lb, ub, maxiter=100000, swarmsize=swarm_size, omega=omega, phip=phip, phig=phig,
+        debug=True)
+    if telemetry is not None:
+        telemetry.stop()
+    # Best point by Deb's feasibility rules
+    xopt, fopt = penalized_objective_function.x, penalized_objective_function.f
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    # print("Optimal solution:", xopt)
+    # print("Objective function value at optimal solution:", fopt)
+
+    # print("Optimal solution:")
+    # for value in xopt:
+    #     print(f"{value:.8f}")
+    # print(f"Objective function value at optimal solution: {fopt:.8f}")
+    print(f"Optimal solution: {', '.join(f'{value:.8f}' for value in xopt)}"
+          f", Objective function value at optimal solution: {fopt:.8f}")
+    print(f"Constraint violation at optimal solution: {penalized_objective_function.violation:.8f}")
+
+    # Archive the Solution ----
+    # The best known solutions are kept in solution-archive.json (see
+    # solution_archive.py) instead of being copied here by hand
+    archive = SolutionArchive()
+    key = archive.configure(objective_function, constraint_values, lb, ub)
+    archive.add(key, xopt, fopt, penalized_objective_function.violation, source="PSO.py")
+    archive.save()
+    best_known = archive.best(key)
+    if best_known:
+        print(f"Best known objective function value: {best_known[0].f:.8f} (from {best_known[0].source})")
@@ -0,0 +1,179 @@
+# **********************************************************************
+# Algorithm Portfolio with Racing ----
+#
+# Purpose ----
+# Run several optimization algorithms concurrently (one process each)
+# under a shared wall-clock and evaluation budget. The best feasible
+# solution found by any of them (the incumbent) is shared through shared
+# memory, so that algorithms that can use it (PSO, GA) adopt it. Runs that
+# are clearly dominated by the incumbent are stopped early (racing), which
+# leaves the cores to the algorithms that are still competitive.
+# **********************************************************************
+
+# Imports ----
+import time
+from multiprocessing import Array, Process, Value
+
+import nlopt
+import numpy as np
+from scipy.optimize import LinearConstraint, basinhopping, differential_evolution, dual_annealing, minimize
+
+from ask_tell import CallbackAdapter, GeneticAlgorithm, ParticleSwarm
+from CMAES import A_linear, CMAES, b_linear, evaluate_population, ip, lb, repair, ub
+
+# Portfolio Settings ----
+portfolio = ["CMA-ES", "PSO", "GA", "COBYLA", "ISRES", "SA", "BH", "SLSQP"]
+time_budget = 60.0  # Seconds of wall-clock time
+max_evaluations = 1000000  # Evaluations shared by all the algorithms
+racing_interval = 1.0  # Seconds between two racing decisions
+grace_period = 0.2  # Fraction of the time budget before racing starts
+racing_margin = 0.01  # Relative gap to the incumbent that is "clearly dominated"
+share_interval = 10  # Iterations between two reads of the incumbent
+random_seed = 42
+
+
+# Algorithms ----
+def make_optimizer(name, seed, lower=lb, upper=ub):
+    """
+    Create the ask/tell optimizer for `name` within the bounds (lower,
+    upper). Algorithms that drive their own evaluation loop are wrapped in
+    a CallbackAdapter.
+    """
+    rng = np.random.default_rng(seed)
+    bounds = list(zip(lower, upper))
+    start = np.clip(ip, lower, upper)
+
+    def repair_within_bounds(X):
+        return repair(X, lower, upper)
+
+    if name == "CMA-ES":
+        return CMAES(start, 0.3, lower, upper, rng=rng)
+    if name == "PSO":
+        return ParticleSwarm(lower, upper, repair=repair_within_bounds, rng=rng)
+    if name == "GA":
+        return GeneticAlgorithm(lower, upper, repair=repair_within_bounds, rng=rng)
+    if name in ("COBYLA", "ISRES"):
+        def run_nlopt(function):
+            nlopt.srand(seed)
+            opt = nlopt.opt(nlopt.LN_COBYLA if name == "COBYLA" else nlopt.GN_ISRES, len(ip))
+            opt.set_min_objective(function)
+            opt.set_lower_bounds(lower)
+            opt.set_upper_bounds(upper)
+            opt.set_xtol_rel(1e-3)
+            opt.set_maxeval(100000)
+            return opt.optimize(start)
+        return CallbackAdapter(run_nlopt, len(ip))
+    if name == "SA":
+        return CallbackAdapter(lambda function: dual_annealing(function, bounds=bounds, seed=seed), len(ip))
+    if name == "BH":
+        minimizer_kwargs = {"method": "L-BFGS-B", "bounds": bounds}
+        return CallbackAdapter(lambda function: basinhopping(
+            function, start, minimizer_kwargs=minimizer_kwargs, niter=200, T=1.0, stepsize=0.5, seed=seed), len(ip))
+    if name == "SLSQP":
+        # The linear constraints are handled by SLSQP itself
+        linear_constraint = LinearConstraint(A_linear, -np.inf, b_linear)
+        return CallbackAdapter(lambda function: minimize(
+            function, start, method="SLSQP", bounds=bounds, constraints=linear_constraint), len(ip))
+    if name == "DE":
+        return CallbackAdapter(lambda function: differential_evolution(
+            function, bounds, seed=seed, polish=False), len(ip))
+    raise ValueError(f"Unknown algorithm: {name}")
+
+
+# Worker ----
+def run_algorithm(index, name, seed, incumbent, progress, stop_flags, evaluations, deadline):
+    """
+    Run one algorithm until it converges, is stopped by the racing, or the
+    budget is spent. `incumbent` holds [violation, f, x...] of the best
+    solution of the whole portfolio; `progress` holds [violation, f,
+    evaluations] of every algorithm.
+    """
+    optimizer = make_optimizer(name, seed)
+    iteration = 0
+    try:
+        while (not optimizer.stop() and not stop_flags[index]
+               and time.time() < deadline and evaluations.value < max_evaluations):
+            X = optimizer.ask()
+            if not len(X):
+                break
+            f, violation = evaluate_population(X)
+            optimizer.tell(f, violation)
+            with evaluations.get_lock():
+                evaluations.value += len(X)
+
+            i = np.lexsort((f, violation))[0]
+            with progress.get_lock():
+                slot = 3 * index
+                if (violation[i], f[i]) < (progress[slot], progress[slot + 1]):
+                    progress[slot], progress[slot + 1] = violation[i], f[i]
+                progress[slot + 2] += len(X)
+            with incumbent.get_lock():
+                if (violation[i], f[i]) < (incumbent[0], incumbent[1]):
+                    incumbent[0], incumbent[1] = violation[i], f[i]
+                    incumbent[2:] = X[i]
+
+            # Adopt the shared incumbent, if the algorithm can use it
+            iteration += 1
+            if hasattr(optimizer, "inject") and iteration % share_interval == 0:
+                with incumbent.get_lock():
+                    shared = np.array(incumbent[:])
+                if np.isfinite(shared[1]):
+                    optimizer.inject(shared[2:], shared[1], shared[0])
+    finally:
+        if hasattr(optimizer, "close"):
+            optimizer.close()
+
+
+# Racing ----
+def is_dominated(violation, f, incumbent_violation, incumbent_f):
+    # Infeasible while a feasible incumbent exists, or clearly worse than it
+    if incumbent_violation > 0:
+        return False
+    return violation > 0 or f > incumbent_f + racing_margin * abs(incumbent_f)
+
+
+# Perform the Optimization ----
+if __name__ == "__main__":
+    incumbent = Array("d", [np.inf, np.inf] + [np.nan] * len(ip))
+    progress = Array("d", [np.inf, np.inf, 0] * len(portfolio))
+    stop_flags = Array("b", [0] * len(portfolio))
+    evaluations = Value("l", 0)
+    start = time.time()
+    deadline = start + time_budget
+
+    seeds = np.random.default_rng(random_seed).integers(0, 2 ** 31 - 1, size=len(portfolio))
+    processes = [
+        Process(target=run_algorithm,
+                args=(i, name, int(seeds[i]), incumbent, progress, stop_flags, evaluations, deadline))
+        for i, name in enumerate(portfolio)
+    ]
+    for process in processes:
+        process.start()
+
+    while any(process.is_alive() for process in processes) and time.time() < deadline:
+        time.sleep(racing_interval)
+        if time.time() - start < grace_period * time_budget:
+            continue
+        with incumbent.get_lock():
+            incumbent_violation, incumbent_f = incumbent[0], incumbent[1]
+        for i, process in enumerate(processes):
+            slot = 3 * i
+            if process.is_alive() and is_dominated(progress[slot], progress[slot + 1],
+                                                   incumbent_violation, incumbent_f):
+                stop_flags[i] = 1
+
+    for process in processes:
+        process.join(timeout=racing_interval)
+        if process.is_alive():
+            process.terminate()
+
+    # Print the Results of the Race ----
+    for i, name in enumerate(portfolio):
+        slot = 3 * i
+        status = "stopped by racing" if stop_flags[i] else "finished"
+        print(f"{name}: {status}, best objective function value {progress[slot + 1]:.8f}, "
+              f"constraint violation {progress[slot]:.8f}, evaluations {int(progress[slot + 2])}")
+
+    # Print the Objective Function Value at the Optimal Solution ----
+    print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in incumbent[2:])}"
+          f", Objective function value at optimal solution: {incumbent[1]:.8f}")
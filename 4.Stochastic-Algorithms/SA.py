@@ -10,6 +10,8 @@
 import numpy as np
 from scipy.optimize import dual_annealing
 
+from constraint_handling import AdaptivePenalty, PenalizedObjective
+
 
 # Objective Function
 def objective_function(x):
@@ -81,38 +83,29 @@ def g8(x): return - x[17]
 def g9(x): return x[18] - x[19]  # Inactive (removed)
 
 
-# Penalty Function for Constraints
-def penalty(x):
-    penalties = 0
-    # Large penalty multiplier to ensure constraints are respected
-    penalty_multiplier = 1e-1
-    
-    # Apply penalties for each constraint violation
-    if g1(x) > 0:
-        penalties += penalty_multiplier * abs(g1(x))
-    if g2(x) > 0:
-        penalties += penalty_multiplier * abs(g2(x))
-    if g3(x) > 0:
-        penalties += penalty_multiplier * abs(g3(x))
-    if g4(x) > 0:
-        penalties += penalty_multiplier * abs(g4(x))
-    if g5(x) > 0:
-        penalties += penalty_multiplier * abs(g5(x))
-    if g6(x) > 0:
-        penalties += penalty_multiplier * abs(g6(x))
-    # if g7(x) > 0:
-    #   penalties += penalty_multiplier * abs(g7(x))
-    if g8(x) > 0:
-        penalties += penalty_multiplier * abs(g8(x))
-    # if g9(x) > 0:
-    #   penalties += penalty_multiplier * abs(g9(x))
-
-    return penalties
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py: a constraint is satisfied when
+# g(x) >= 0 (penalizing g(x) > 0 instead made qs <= 0 a constraint, which
+# no point within the bounds satisfies)
+constraints = [g1, g2, g3, g4, g5, g6]
+
+
+def constraint_values(x):
+    return np.array([constraint(x) for constraint in constraints])
+
 
+# Adaptive Penalty for Constraints
+# One weight per constraint (see constraint_handling.py) instead of a fixed
+# multiplier. The weights are updated between two rounds of dual annealing
+# only, from the evaluations of the round, so that the local searches
+# (finite-difference gradients, line search) and the acceptance test always
+# compare energies scored with the same weights
+penalty = AdaptivePenalty()
+number_of_rounds = 10
+iterations_per_round = 100  # number_of_rounds * iterations_per_round = maxiter of dual_annealing
 
 # Modified Objective Function with Constraints Penalty
-def modified_objective_function(x):
-    return objective_function(x) + penalty(x)
+modified_objective_function = PenalizedObjective(objective_function, constraint_values, penalty)
 
 
 # Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
@@ -130,11 +123,21 @@ ip = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
 bounds = [(lb[i], ub[i]) for i in range(len(lb))]
 
 # Perform the Optimization ----
-result = dual_annealing(modified_objective_function, bounds=bounds)
+penalty.calibrate(objective_function, constraint_values, lb, ub)
+x0 = None
+for _ in range(number_of_rounds):
+    # Each round restarts from the best point so far, with fixed weights
+    result = dual_annealing(modified_objective_function, bounds=bounds, maxiter=iterations_per_round, x0=x0)
+    penalty.flush()
+    x0 = modified_objective_function.x
+# Best point by Deb's feasibility rules
+x_opt = modified_objective_function.x
+min_f, violation = modified_objective_function.f, modified_objective_function.violation
 
 # Print the Objective Function Value at the Optimal Solution ----
 # print(f"Optimal solution: {result.x}")
 # print(f"Objective function value at optimal solution: {result.fun}")
 
-print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in result.x)}"
-      f", Objective function value at optimal solution: {result.fun:.8f}")
+print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in x_opt)}"
+      f", Objective function value at optimal solution: {min_f:.8f}")
+print(f"Constraint violation at optimal solution: {violation:.8f}")
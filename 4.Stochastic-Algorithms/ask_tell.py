@@ -0,0 +1,521 @@
+# **********************************************************************
+# Ask/Tell Optimizer Protocol ----
+#
+# Purpose ----
+# Decouple the optimization algorithms from the evaluation of the
+# objective function. An optimizer only proposes candidates (`ask`) and
+# learns from their scores (`tell`); an evaluator scores whole batches of
+# candidates, serially, in a vectorized call or across processes. Any
+# evaluator can therefore serve any optimizer, and several optimizers can
+# be scheduled together so that their candidates are scored as one batch.
+#
+# Protocol ----
+# optimizer.ask() -> X            candidates, one per row
+# optimizer.tell(f, violation)    objective values and total constraint
+#                                 violations (0 when feasible) of X
+# optimizer.stop() -> bool        True once the optimizer has converged
+# optimizer.inject(x, f, violation)   optional: adopt a solution found
+#                                 elsewhere (e.g. a shared incumbent)
+# evaluator(X) -> (f, violation)
+# **********************************************************************
+
+# Imports ----
+import os
+import queue
+import random
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Process, Queue, shared_memory
+
+import numpy as np
+from deap import base, creator, tools, algorithms
+
+# Best candidate found by an optimizer
+Incumbent = namedtuple("Incumbent", ["x", "f", "violation", "evaluations"])
+
+
+# Evaluators ----
+class BatchEvaluator:
+    """
+    Score the whole batch in one call of `evaluate_population(X)`, which
+    returns the objective values and the constraint violations of X.
+    """
+
+    def __init__(self, evaluate_population):
+        self.evaluate_population = evaluate_population
+        self.evaluations = 0
+
+    def __call__(self, X):
+        self.evaluations += len(X)
+        return self.evaluate_population(X)
+
+    def close(self):
+        pass
+
+
+class SerialEvaluator(BatchEvaluator):
+    """
+    Score the candidates one at a time (for backends that cannot take a
+    batch, e.g. a remote model that is queried point by point).
+    """
+
+    def __call__(self, X):
+        self.evaluations += len(X)
+        scores = [self.evaluate_population(X[i:i + 1]) for i in range(len(X))]
+        return (np.concatenate([np.atleast_1d(f) for f, _ in scores]),
+                np.concatenate([np.atleast_1d(violation) for _, violation in scores]))
+
+
+class PoolEvaluator(BatchEvaluator):
+    """
+    Split the batch into one chunk per process and score the chunks in
+    parallel. `evaluate_population` must be defined at module level so
+    that it can be sent to the worker processes.
+    """
+
+    def __init__(self, evaluate_population, processes=None):
+        super().__init__(evaluate_population)
+        self.processes = processes or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.processes)
+
+    def __call__(self, X):
+        self.evaluations += len(X)
+        chunks = [chunk for chunk in np.array_split(X, self.processes) if len(chunk)]
+        scores = list(self.executor.map(self.evaluate_population, chunks))
+        return (np.concatenate([f for f, _ in scores]),
+                np.concatenate([violation for _, violation in scores]))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def _shared_memory_worker(names, capacity, dimension, evaluate_population, tasks, done):
+    # Attach to the buffers once; afterwards only index ranges are received
+    buffers = [shared_memory.SharedMemory(name=name) for name in names]
+    X = np.ndarray((capacity, dimension), dtype=float, buffer=buffers[0].buf)
+    f = np.ndarray(capacity, dtype=float, buffer=buffers[1].buf)
+    violation = np.ndarray(capacity, dtype=float, buffer=buffers[2].buf)
+    for start, stop in iter(tasks.get, None):
+        # An error is sent back to the parent, which re-raises it; the
+        # worker keeps serving the following batches
+        try:
+            f[start:stop], violation[start:stop] = evaluate_population(X[start:stop])
+            done.put(stop - start)
+        except Exception as error:
+            done.put(error)
+    del X, f, violation
+    for buffer in buffers:
+        buffer.close()
+
+
+class SharedMemoryEvaluator(BatchEvaluator):
+    """
+    Keep the candidate matrix and the result vectors in shared memory.
+    The worker processes attach to these buffers once and then only
+    receive (start, stop) index ranges, which they score in place: no
+    candidate or result is pickled. `capacity` is the largest batch size.
+    """
+
+    def __init__(self, evaluate_population, dimension, capacity, processes=None):
+        super().__init__(evaluate_population)
+        self.processes = processes or os.cpu_count() or 1
+        self.capacity = capacity
+        self.buffers = [
+            shared_memory.SharedMemory(create=True, size=capacity * dimension * 8),
+            shared_memory.SharedMemory(create=True, size=capacity * 8),
+            shared_memory.SharedMemory(create=True, size=capacity * 8),
+        ]
+        self.X = np.ndarray((capacity, dimension), dtype=float, buffer=self.buffers[0].buf)
+        self.f = np.ndarray(capacity, dtype=float, buffer=self.buffers[1].buf)
+        self.violation = np.ndarray(capacity, dtype=float, buffer=self.buffers[2].buf)
+
+        self.tasks, self.done = Queue(), Queue()
+        names = [buffer.name for buffer in self.buffers]
+        self.workers = [
+            Process(target=_shared_memory_worker, daemon=True,
+                    args=(names, capacity, dimension, evaluate_population, self.tasks, self.done))
+            for _ in range(self.processes)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def __call__(self, X):
+        n = len(X)
+        if n > self.capacity:
+            raise ValueError(f"Batch of {n} candidates exceeds the capacity of {self.capacity}")
+        self.evaluations += n
+        self.X[:n] = X
+        bounds = np.linspace(0, n, min(self.processes, n) + 1).astype(int)
+        ranges = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        for task in ranges:
+            self.tasks.put(task)
+        # Wait for every range, so that no reply is left over for the next
+        # batch, before re-raising the first error of a worker
+        errors = [reply for reply in (self.done.get() for _ in ranges) if isinstance(reply, Exception)]
+        if errors:
+            raise errors[0]
+        return self.f[:n].copy(), self.violation[:n].copy()
+
+    def close(self):
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        del self.X, self.f, self.violation
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.unlink()
+
+
+# Particle Swarm Optimization (PSO) ----
+class ParticleSwarm:
+    """
+    The particle swarm of pyswarm's `pso` (same update rule and default
+    coefficients) with an ask/tell interface. Personal and global bests
+    follow Deb's feasibility rules instead of ignoring infeasible points.
+    `repair(X)`, if given, moves the particles onto the linear constraints
+    (e.g. CMAES.repair) before they are evaluated.
+    """
+
+    def __init__(self, lower, upper, swarm_size=100, omega=0.5, phip=0.5, phig=0.5,
+                 minstep=1e-8, minfunc=1e-8, repair=None, rng=None):
+        self.lower, self.upper = lower, upper
+        self.repair = repair
+        self.omega, self.phip, self.phig = omega, phip, phig
+        self.minstep, self.minfunc = minstep, minfunc
+        self.rng = rng if rng is not None else np.random.default_rng()
+        span = upper - lower
+        self.x = lower + self.rng.random((swarm_size, len(lower))) * span
+        self.v = -span + self.rng.random((swarm_size, len(lower))) * 2 * span
+        self.p = self.x.copy()
+        self.fp = np.full(swarm_size, np.inf)
+        self.vp = np.full(swarm_size, np.inf)
+        self.g, self.fg, self.vg = None, np.inf, np.inf
+        self.converged = False
+        self.first = True
+
+    def ask(self):
+        if not self.first:
+            rp = self.rng.random(self.x.shape)
+            rg = self.rng.random(self.x.shape)
+            self.v = self.omega * self.v + self.phip * rp * (self.p - self.x) + self.phig * rg * (self.g - self.x)
+            self.x = np.clip(self.x + self.v, self.lower, self.upper)
+        if self.repair is not None:
+            self.x = self.repair(self.x)
+        self.first = False
+        return self.x
+
+    def tell(self, f, violation):
+        improved = (violation < self.vp) | ((violation == self.vp) & (f < self.fp))
+        self.p[improved], self.fp[improved], self.vp[improved] = self.x[improved], f[improved], violation[improved]
+
+        i = np.lexsort((self.fp, self.vp))[0]
+        if (self.vp[i], self.fp[i]) < (self.vg, self.fg):
+            if self.g is not None and self.vp[i] == self.vg == 0:
+                # pyswarm's stopping rules: tiny change of the best point or value
+                self.converged = (np.linalg.norm(self.g - self.p[i]) <= self.minstep
+                                  or abs(self.fg - self.fp[i]) <= self.minfunc)
+            self.g, self.fg, self.vg = self.p[i].copy(), self.fp[i], self.vp[i]
+
+    def inject(self, x, f, violation):
+        # A better solution found elsewhere becomes the global best
+        if (violation, f) < (self.vg, self.fg):
+            self.g, self.fg, self.vg = np.array(x, dtype=float), f, violation
+
+    def stop(self):
+        return self.converged
+
+
+# Genetic Algorithm (GA) ----
+# Lexicographic fitness (violation first, then f): DEAP compares fitness
+# values as tuples, which gives Deb's feasibility rules
+creator.create("FitnessFeasibleMin", base.Fitness, weights=(-1.0, -1.0))
+creator.create("FeasibleIndividual", list, fitness=creator.FitnessFeasibleMin)
+
+
+class GeneticAlgorithm:
+    """
+    The generational loop of DEAP's `eaSimple` (as used in GA.py) with an
+    ask/tell interface: every generation, only the individuals that were
+    changed by crossover or mutation are asked to be evaluated. `repair(X)`,
+    if given, moves them onto the linear constraints (e.g. CMAES.repair)
+    before they are evaluated.
+    """
+
+    def __init__(self, lower, upper, population_size=50, cxpb=0.7, mutpb=0.2, repair=None, rng=None):
+        self.lower, self.upper = lower, upper
+        self.repair = repair
+        self.cxpb, self.mutpb = cxpb, mutpb
+        self.rng = rng if rng is not None else np.random.default_rng()
+        random.seed(int(self.rng.integers(2 ** 31 - 1)))
+
+        self.toolbox = base.Toolbox()
+        self.toolbox.register("mate", tools.cxBlend, alpha=0.5)
+        self.toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.1)
+        self.toolbox.register("select", tools.selTournament, tournsize=3)
+
+        X = lower + self.rng.random((population_size, len(lower))) * (upper - lower)
+        self.population = [creator.FeasibleIndividual(x) for x in X]
+        self.pending = self.population
+
+    def ask(self):
+        while not self.pending:
+            offspring = self.toolbox.select(self.population, len(self.population))
+            offspring = algorithms.varAnd(offspring, self.toolbox, self.cxpb, self.mutpb)
+            self.population = offspring
+            self.pending = [ind for ind in offspring if not ind.fitness.valid]
+        X = np.clip(np.array(self.pending, dtype=float).reshape(-1, len(self.lower)), self.lower, self.upper)
+        if self.repair is not None:
+            X = self.repair(X)
+        for ind, x in zip(self.pending, X):
+            ind[:] = x
+        return X
+
+    def tell(self, f, violation):
+        for ind, fi, vi in zip(self.pending, f, violation):
+            ind.fitness.values = (vi, fi)
+        self.pending = []
+
+    def inject(self, x, f, violation):
+        # A better solution found elsewhere replaces the worst individual
+        best = tools.selBest(self.population, 1)[0]
+        if (violation, f) < best.fitness.values:
+            worst = tools.selWorst(self.population, 1)[0]
+            worst[:] = x
+            worst.fitness.values = (violation, f)
+
+    def stop(self):
+        return False
+
+
+# Improved Stochastic Ranking Evolution Strategy (ISRES) ----
+class StochasticRanking:
+    """
+    The (mu, lambda) evolution strategy of nlopt's `GN_ISRES` (Runarsson and
+    Yao's improved stochastic ranking, same default settings) with an
+    ask/tell interface, so that a population survives across calls (e.g.
+    between the migrations of ISRES-Islands.py). Individuals are ranked by
+    a bubble sort that compares f with probability `pf` (or when both are
+    feasible) and the constraint violation otherwise.
+    """
+
+    def __init__(self, lower, upper, x0=None, population_size=None, pf=0.45, gamma=0.85,
+                 alpha=0.2, rng=None):
+        self.lower, self.upper = lower, upper
+        self.pf, self.gamma, self.alpha = pf, gamma, alpha
+        self.rng = rng if rng is not None else np.random.default_rng()
+        n = len(lower)
+        population_size = population_size or 20 * (n + 1)
+        self.mu = int(np.ceil(population_size / 7))
+        self.tau = 1 / np.sqrt(2 * np.sqrt(n))
+        self.tau_prime = 1 / np.sqrt(2 * n)
+
+        self.x = lower + self.rng.random((population_size, n)) * (upper - lower)
+        if x0 is not None:
+            self.x[0] = x0
+        self.sigma = np.tile((upper - lower) / np.sqrt(n), (population_size, 1))
+        self.f = self.violation = None
+
+    def rank(self):
+        # Stochastic bubble sort, run as an odd-even transposition sort so
+        # that every pass compares its disjoint pairs at once
+        order = np.arange(len(self.x))
+        for _ in range(len(order)):
+            swapped = False
+            for first in (0, 1):
+                a, b = order[first:-1:2], order[first + 1::2]
+                a = a[:len(b)]
+                by_f = ((self.violation[a] == 0) & (self.violation[b] == 0)) | (self.rng.random(len(a)) < self.pf)
+                worse = np.where(by_f, self.f[a] > self.f[b], self.violation[a] > self.violation[b])
+                order[first:first + 2 * len(a):2][worse], order[first + 1:first + 2 * len(a):2][worse] = b[worse], a[worse]
+                swapped |= worse.any()
+            if not swapped:
+                break
+        return order
+
+    def ask(self):
+        if self.f is None:
+            return self.x
+        parents = self.rank()[:self.mu]
+        x, sigma = self.x[parents], self.sigma[parents]
+        offspring = np.empty_like(self.x)
+        offspring_sigma = np.empty_like(self.sigma)
+        for k in range(len(self.x)):
+            i = k % self.mu
+            if k < self.mu - 1:
+                # Differential variation towards the best parent
+                offspring_sigma[k] = sigma[i]
+                offspring[k] = x[i] + self.gamma * (x[0] - x[i + 1])
+            else:
+                # Lognormal self-adaptation of the step sizes, then smoothing
+                step = sigma[i] * np.exp(self.tau_prime * self.rng.standard_normal()
+                                         + self.tau * self.rng.standard_normal(len(x[i])))
+                for _ in range(10):
+                    offspring[k] = x[i] + step * self.rng.standard_normal(len(x[i]))
+                    if np.all((offspring[k] >= self.lower) & (offspring[k] <= self.upper)):
+                        break
+                offspring_sigma[k] = sigma[i] + self.alpha * (step - sigma[i])
+        self.x = np.clip(offspring, self.lower, self.upper)
+        self.sigma = offspring_sigma
+        return self.x
+
+    def tell(self, f, violation):
+        self.f, self.violation = np.asarray(f, dtype=float), np.asarray(violation, dtype=float)
+
+    def inject(self, x, f, violation):
+        # A solution found elsewhere replaces the worst individual if it
+        # is better (Deb's feasibility rules), keeping the best step sizes
+        if self.f is None:
+            return
+        order = np.lexsort((self.f, self.violation))
+        best, worst = order[0], order[-1]
+        if (violation, f) < (self.violation[worst], self.f[worst]):
+            self.x[worst], self.sigma[worst] = x, self.sigma[best]
+            self.f[worst], self.violation[worst] = f, violation
+
+    def stop(self):
+        return False
+
+
+# Libraries that Drive their own Evaluation Loop ----
+class StopOptimization(Exception):
+    pass
+
+
+class CallbackAdapter:
+    """
+    Give an ask/tell interface to a library that calls the objective
+    function itself (nlopt, `basinhopping`, `dual_annealing`). The library
+    runs in a background thread and blocks inside the objective function
+    until the evaluator's score is told; candidates are therefore asked one
+    at a time. `run_library(function)` must start the library with
+    `function` as its objective (nlopt's `grad` argument is accepted).
+    The library sees f + penalty_multiplier * violation.
+    """
+
+    def __init__(self, run_library, dimension, penalty_multiplier=1e3):
+        self.dimension = dimension
+        self.penalty_multiplier = penalty_multiplier
+        self.result = None
+        self.started = False
+        self.finished = False
+        self.requests = queue.Queue()
+        self.replies = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._run, args=(run_library,), daemon=True)
+
+    def _run(self, run_library):
+        try:
+            self.result = run_library(self._function)
+        except StopOptimization:
+            pass
+        finally:
+            self.requests.put(None)
+
+    def _function(self, x, *args):
+        self.requests.put(np.array(x, dtype=float))
+        value = self.replies.get()
+        if value is None:
+            raise StopOptimization
+        return value
+
+    def ask(self):
+        if not self.started:
+            self.started = True
+            self.thread.start()
+        x = self.requests.get() if not self.finished else None
+        if x is None:
+            self.finished = True
+            return np.empty((0, self.dimension))
+        return x[None, :]
+
+    def tell(self, f, violation):
+        if len(f):
+            self.replies.put(float(f[0] + self.penalty_multiplier * violation[0]))
+
+    def stop(self):
+        return self.finished
+
+    def close(self):
+        # Unblock the library so that the background thread can finish
+        if self.thread.is_alive():
+            self.replies.put(None)
+            self.thread.join()
+
+
+# Harness ----
+def run_together(optimizers, evaluator, max_evaluations, stop_value=-np.inf):
+    """
+    Run several optimizers on the same evaluator until the evaluation
+    budget is spent, all of them have stopped, or a feasible solution
+    reaches `stop_value` (e.g. a certified lower bound plus a gap
+    tolerance, see branch_and_bound.py). Each round, the candidates of all
+    the running optimizers are concatenated and scored as one batch.
+    Returns the incumbent of every optimizer.
+    """
+    incumbents = [Incumbent(None, np.inf, np.inf, 0) for _ in optimizers]
+    evaluations = 0
+
+    while evaluations < max_evaluations and not any(
+            incumbent.violation <= 0 and incumbent.f <= stop_value for incumbent in incumbents):
+        running = [i for i, optimizer in enumerate(optimizers) if not optimizer.stop()]
+        batches = [(i, optimizers[i].ask()) for i in running]
+        batches = [(i, X) for i, X in batches if len(X)]
+        if not batches:
+            break
+
+        f, violation = evaluator(np.concatenate([X for _, X in batches]))
+        start = 0
+        for i, X in batches:
+            fi, vi = f[start:start + len(X)], violation[start:start + len(X)]
+            start += len(X)
+            optimizers[i].tell(fi, vi)
+
+            best = np.lexsort((fi, vi))[0]
+            x, f_best, v_best, used = incumbents[i]
+            if (vi[best], fi[best]) < (v_best, f_best):
+                x, f_best, v_best = X[best].copy(), fi[best], vi[best]
+            incumbents[i] = Incumbent(x, f_best, v_best, used + len(X))
+        evaluations += sum(len(X) for _, X in batches)
+
+    for optimizer in optimizers:
+        if hasattr(optimizer, "close"):
+            optimizer.close()
+    return incumbents
+
+
+def run(optimizer, evaluator, max_evaluations, stop_value=-np.inf):
+    return run_together([optimizer], evaluator, max_evaluations, stop_value)[0]
+
+
+# Example: CMA-ES, PSO, GA and COBYLA Scheduled Together ----
+if __name__ == "__main__":
+    import nlopt
+    from CMAES import CMAES, evaluate_population, ip, lb, repair, ub
+
+    rng = np.random.default_rng(42)
+
+    def run_cobyla(function):
+        opt = nlopt.opt(nlopt.LN_COBYLA, len(ip))
+        opt.set_min_objective(function)
+        opt.set_lower_bounds(lb)
+        opt.set_upper_bounds(ub)
+        opt.set_xtol_rel(1e-3)
+        return opt.optimize(ip)
+
+    names = ["CMA-ES", "PSO", "GA", "COBYLA"]
+    optimizers = [
+        CMAES(ip, 0.3, lb, ub, rng=rng),
+        ParticleSwarm(lb, ub, repair=repair, rng=rng),
+        GeneticAlgorithm(lb, ub, repair=repair, rng=rng),
+        CallbackAdapter(run_cobyla, len(ip)),
+    ]
+    # The largest batch is one population of every optimizer together
+    evaluator = SharedMemoryEvaluator(evaluate_population, len(ip), capacity=1024)
+    incumbents = run_together(optimizers, evaluator, max_evaluations=100000)
+    evaluator.close()
+
+    for name, incumbent in zip(names, incumbents):
+        print(f"{name}: Optimal solution: {', '.join(f'{x:.8f}' for x in incumbent.x)}"
+              f", Objective function value at optimal solution: {incumbent.f:.8f}"
+              f", Constraint violation: {incumbent.violation:.8f}, Evaluations: {incumbent.evaluations}")
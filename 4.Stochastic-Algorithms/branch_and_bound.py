@@ -0,0 +1,409 @@
+# **********************************************************************
+# Spatial Branch-and-Bound with Interval Arithmetic ----
+#
+# Purpose ----
+# Compute a rigorous lower bound on the minimum of the objective function
+# over the feasible part of the box defined by the bounds, so that the
+# optimality gap of any solution (incumbent minus lower bound) is known.
+# Optimizer runs can stop as soon as this gap falls under a tolerance
+# instead of overspending evaluations "just in case".
+#
+# The existing model functions are run once on symbolic variables, which
+# records their expression graph (identical sub-expressions, such as the
+# water-energy product shared by the objective function and g2, become one
+# node). Each box is then bounded by interval arithmetic on that graph,
+# with outward rounding, after the constraints have been propagated
+# backwards through the graph to contract the box (HC4).
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+from scipy.optimize import minimize
+
+# Binary numpy ufuncs that may be applied to expression nodes
+# (e.g. when the left operand is a numpy scalar)
+binary_ufuncs = {np.add: "add", np.subtract: "sub", np.multiply: "mul",
+                 np.true_divide: "div", np.power: "pow"}
+
+
+# Expression Graph ----
+class Expression:
+    """
+    A node of the expression graph. Arithmetic on nodes (and np.sin or
+    np.abs of nodes) records new nodes instead of computing values.
+    """
+
+    def __init__(self, graph, op, args, value=None):
+        self.graph, self.op, self.args, self.value = graph, op, args, value
+        self.index = len(graph.nodes)
+        graph.nodes.append(self)
+
+    def __add__(self, other): return self.graph.make("add", self, other)
+
+    def __radd__(self, other): return self.graph.make("add", other, self)
+
+    def __sub__(self, other): return self.graph.make("sub", self, other)
+
+    def __rsub__(self, other): return self.graph.make("sub", other, self)
+
+    def __mul__(self, other): return self.graph.make("mul", self, other)
+
+    def __rmul__(self, other): return self.graph.make("mul", other, self)
+
+    def __truediv__(self, other): return self.graph.make("div", self, other)
+
+    def __rtruediv__(self, other): return self.graph.make("div", other, self)
+
+    def __pow__(self, other): return self.graph.make("pow", self, other)
+
+    def __neg__(self): return self.graph.make("neg", self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__":
+            return NotImplemented
+        if ufunc is np.sin:
+            return self.graph.make("sin", inputs[0])
+        if ufunc is np.absolute:
+            return self.graph.make("abs", inputs[0])
+        if ufunc is np.negative:
+            return self.graph.make("neg", inputs[0])
+        if ufunc in binary_ufuncs:
+            return self.graph.make(binary_ufuncs[ufunc], *inputs)
+        return NotImplemented
+
+
+class ExpressionGraph:
+    def __init__(self, dimension):
+        self.nodes = []
+        self.cache = {}
+        self.variables = [Expression(self, "var", (), value=i) for i in range(dimension)]
+
+    def constant(self, value):
+        key = ("const", float(value))
+        if key not in self.cache:
+            self.cache[key] = Expression(self, "const", (), value=float(value))
+        return self.cache[key]
+
+    def make(self, op, *args):
+        # Identical operations on identical operands share one node
+        args = tuple(arg if isinstance(arg, Expression) else self.constant(arg) for arg in args)
+        key = (op, tuple(arg.index for arg in args))
+        if key not in self.cache:
+            self.cache[key] = Expression(self, op, args)
+        return self.cache[key]
+
+
+# Interval Arithmetic (Outward Rounding) ----
+def down(a): return np.nextafter(a, -np.inf)
+
+
+def up(a): return np.nextafter(a, np.inf)
+
+
+def interval_mul(alo, ahi, blo, bhi):
+    products = np.stack([alo * blo, alo * bhi, ahi * blo, ahi * bhi])
+    products = np.where(np.isnan(products), 0.0, products)  # 0 * inf = 0
+    return down(products.min(axis=0)), up(products.max(axis=0))
+
+
+def interval_div(alo, ahi, blo, bhi):
+    # Unbounded when the divisor contains zero
+    safe = (blo > 0) | (bhi < 0)
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        lo, hi = interval_mul(alo, ahi, np.where(safe, 1 / bhi, -np.inf), np.where(safe, 1 / blo, np.inf))
+    return np.where(safe, down(lo), -np.inf), np.where(safe, up(hi), np.inf)
+
+
+def interval_pow(alo, ahi, p):
+    if p == -1:
+        return interval_div(np.ones_like(alo), np.ones_like(ahi), alo, ahi)
+    # Real powers of the model are taken on non-negative bases
+    alo, ahi = np.maximum(alo, 0), np.maximum(ahi, 0)
+    with np.errstate(divide="ignore"):
+        lo, hi = (alo ** p, ahi ** p) if p > 0 else (ahi ** p, alo ** p)
+    return down(down(lo)), up(up(hi))
+
+
+def interval_sin(alo, ahi):
+    lo = np.minimum(np.sin(alo), np.sin(ahi))
+    hi = np.maximum(np.sin(alo), np.sin(ahi))
+    # Maxima at pi/2 + 2k*pi and minima at 3*pi/2 + 2k*pi within the interval
+    k = np.ceil((alo - np.pi / 2) / (2 * np.pi))
+    hi = np.where(np.pi / 2 + 2 * np.pi * k <= ahi, 1.0, hi)
+    k = np.ceil((alo - 3 * np.pi / 2) / (2 * np.pi))
+    lo = np.where(3 * np.pi / 2 + 2 * np.pi * k <= ahi, -1.0, lo)
+    wide = ~np.isfinite(alo) | ~np.isfinite(ahi) | (ahi - alo >= 2 * np.pi)
+    return np.where(wide, -1.0, np.maximum(down(down(lo)), -1.0)), np.where(wide, 1.0, np.minimum(up(up(hi)), 1.0))
+
+
+def interval_abs(alo, ahi):
+    lo = np.where(alo >= 0, alo, np.where(ahi <= 0, -ahi, 0.0))
+    hi = np.maximum(np.abs(alo), np.abs(ahi))
+    return lo, hi
+
+
+# Interval Evaluation of the Graph ----
+def forward(graph, L, H):
+    """
+    Bound every node from the bounds of its arguments, intersecting with
+    the bounds it already has (from an earlier backward pass).
+    """
+    for node in graph.nodes:
+        i = node.index
+        if node.op in ("var", "const"):
+            continue
+        a = node.args[0].index
+        if node.op == "add":
+            b = node.args[1].index
+            lo, hi = down(L[a] + L[b]), up(H[a] + H[b])
+        elif node.op == "sub":
+            b = node.args[1].index
+            lo, hi = down(L[a] - H[b]), up(H[a] - L[b])
+        elif node.op == "mul":
+            b = node.args[1].index
+            lo, hi = interval_mul(L[a], H[a], L[b], H[b])
+        elif node.op == "div":
+            b = node.args[1].index
+            lo, hi = interval_div(L[a], H[a], L[b], H[b])
+        elif node.op == "pow":
+            lo, hi = interval_pow(L[a], H[a], node.args[1].value)
+        elif node.op == "neg":
+            lo, hi = -H[a], -L[a]
+        elif node.op == "sin":
+            lo, hi = interval_sin(L[a], H[a])
+        else:  # abs
+            lo, hi = interval_abs(L[a], H[a])
+        L[i], H[i] = np.maximum(L[i], lo), np.minimum(H[i], hi)
+
+
+def backward(graph, L, H):
+    """
+    Contract the arguments of every node from the bounds of the node
+    (inverse of each operation), from the outputs back to the variables.
+    """
+    for node in reversed(graph.nodes):
+        if node.op in ("var", "const", "sin", "abs"):
+            continue
+        i, a = node.index, node.args[0].index
+        if node.op == "neg":
+            L[a], H[a] = np.maximum(L[a], -H[i]), np.minimum(H[a], -L[i])
+            continue
+        if node.op == "pow":
+            p = node.args[1].value
+            if p > 0:
+                lo, hi = interval_pow(L[i], H[i], 1 / p)
+                L[a], H[a] = np.maximum(L[a], lo), np.minimum(H[a], hi)
+            continue
+
+        b = node.args[1].index
+        if node.op == "add":
+            new_a = (down(L[i] - H[b]), up(H[i] - L[b]))
+            new_b = (down(L[i] - H[a]), up(H[i] - L[a]))
+        elif node.op == "sub":
+            new_a = (down(L[i] + L[b]), up(H[i] + H[b]))
+            new_b = (down(L[a] - H[i]), up(H[a] - L[i]))
+        elif node.op == "mul":
+            new_a = interval_div(L[i], H[i], L[b], H[b])
+            new_b = interval_div(L[i], H[i], L[a], H[a])
+        else:  # div
+            new_a = interval_mul(L[i], H[i], L[b], H[b])
+            new_b = interval_div(L[a], H[a], L[i], H[i])
+        for j, (lo, hi) in ((a, new_a), (b, new_b)):
+            if graph.nodes[j].op != "const":
+                L[j], H[j] = np.maximum(L[j], lo), np.minimum(H[j], hi)
+
+
+# Branch-and-Bound ----
+class BranchAndBound:
+    """
+    Best-first spatial branch-and-bound over the box [lower, upper] for
+    minimizing `objective_function` subject to g(x) >= 0 for every g in
+    `constraints` (the sense used by PSO.py and CMAES.py).
+    """
+
+    def __init__(self, objective_function, constraints, lower, upper, contraction_rounds=3):
+        self.objective_function, self.constraints = objective_function, constraints
+        self.lower, self.upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+        self.contraction_rounds = contraction_rounds
+
+        self.graph = ExpressionGraph(len(lower))
+        x = self.graph.variables
+        self.f_node = objective_function(x)
+        self.g_nodes = [constraint(x) for constraint in constraints]
+
+    def bound(self, lo, hi, incumbent=np.inf):
+        """
+        Contract a batch of boxes (one per row) and bound the objective
+        function over their feasible part. Returns the lower bounds (inf
+        for boxes proven infeasible) and the contracted boxes.
+        """
+        n = len(lo)
+        L = [np.full(n, -np.inf) for _ in self.graph.nodes]
+        H = [np.full(n, np.inf) for _ in self.graph.nodes]
+        for node in self.graph.nodes:
+            if node.op == "var":
+                L[node.index], H[node.index] = lo[:, node.value].copy(), hi[:, node.value].copy()
+            elif node.op == "const":
+                L[node.index], H[node.index] = np.full(n, node.value), np.full(n, node.value)
+
+        forward(self.graph, L, H)
+        for _ in range(self.contraction_rounds):
+            # Feasible points satisfy g(x) >= 0 and can only matter if they
+            # are better than the incumbent
+            for g in self.g_nodes:
+                L[g.index] = np.maximum(L[g.index], 0.0)
+            H[self.f_node.index] = np.minimum(H[self.f_node.index], incumbent)
+            backward(self.graph, L, H)
+            forward(self.graph, L, H)
+
+        empty = np.zeros(n, dtype=bool)
+        for node in self.graph.nodes:
+            empty |= L[node.index] > H[node.index]
+        f_lower = np.where(empty, np.inf, L[self.f_node.index])
+        variables = self.graph.variables
+        new_lo = np.column_stack([L[v.index] for v in variables])
+        new_hi = np.column_stack([H[v.index] for v in variables])
+        return f_lower, np.where(empty[:, None], lo, new_lo), np.where(empty[:, None], hi, new_hi)
+
+    def _update_incumbent(self, points):
+        x = points.T
+        f = self.objective_function(x)
+        feasible = np.all([constraint(x) >= 0 for constraint in self.constraints], axis=0) & np.isfinite(f)
+        if np.any(feasible) and np.min(f[feasible]) < self.incumbent:
+            i = np.flatnonzero(feasible)[np.argmin(f[feasible])]
+            self.incumbent, self.incumbent_x = f[i], points[i].copy()
+
+    def _local_search(self, lo, hi):
+        # Upper bounding: SLSQP from the middle of a promising box
+        result = minimize(self.objective_function, (lo + hi) / 2, method="SLSQP",
+                          bounds=list(zip(self.lower, self.upper)),
+                          constraints=[{"type": "ineq", "fun": g} for g in self.constraints],
+                          options={"ftol": 1e-12, "maxiter": 200})
+        self._update_incumbent(np.clip(result.x, self.lower, self.upper)[None, :])
+
+    def solve(self, incumbent=np.inf, incumbent_x=None, gap_tolerance=1e-3,
+              max_iterations=1000, boxes_per_iteration=64, local_search_interval=10):
+        """
+        Run the branch-and-bound until the gap between the incumbent and
+        the lower bound is at most `gap_tolerance` or `max_iterations` is
+        reached. A known solution can be passed as the initial incumbent;
+        it is improved by a local search from the box with the lowest bound
+        every `local_search_interval` iterations. Returns the lower bound,
+        the incumbent and the incumbent point.
+        The incumbent prunes boxes, so a known solution is re-evaluated and
+        adopted (with its recomputed objective value) only if it lies
+        within the bounds and is feasible; otherwise the search starts
+        from no incumbent.
+        """
+        if incumbent_x is None and np.isfinite(incumbent):
+            raise ValueError("An incumbent value was given without its point (incumbent_x)")
+        self.incumbent, self.incumbent_x = np.inf, None
+        if incumbent_x is not None:
+            incumbent_x = np.asarray(incumbent_x, dtype=float)
+            if incumbent_x.shape != self.lower.shape:
+                raise ValueError(f"incumbent_x has shape {incumbent_x.shape}, expected {self.lower.shape}")
+            if np.all((self.lower <= incumbent_x) & (incumbent_x <= self.upper)):
+                self._update_incumbent(incumbent_x[None, :])
+        bounds, lo, hi = self.bound(self.lower[None, :], self.upper[None, :], self.incumbent)
+        self._update_incumbent((lo + hi) / 2)
+        self.pruned_bound = np.inf  # Lowest bound of the boxes pruned within the tolerance
+        self.iterations = 0
+
+        while self.iterations < max_iterations:
+            # Prune the boxes that cannot improve the incumbent by more
+            # than the tolerance, including the infeasible ones
+            keep = bounds < self.incumbent - gap_tolerance
+            self.pruned_bound = min(self.pruned_bound, np.min(bounds[~keep], initial=np.inf))
+            bounds, lo, hi = bounds[keep], lo[keep], hi[keep]
+            if not len(bounds) or gap_closed(self.incumbent, self.lower_bound(bounds), gap_tolerance):
+                break
+            if self.iterations % local_search_interval == 0:
+                best = np.argmin(bounds)
+                self._local_search(lo[best], hi[best])
+
+            # Split the boxes with the lowest bounds (best first); each box
+            # is split in two along the variable that raises the smaller of
+            # the two child bounds the most
+            selected = np.argsort(bounds)[:boxes_per_iteration]
+            rest = np.setdiff1d(np.arange(len(bounds)), selected)
+            children_lo, children_hi = self._branch(lo[selected], hi[selected])
+            child_bounds, children_lo, children_hi = self.bound(children_lo, children_hi, self.incumbent)
+            self._update_incumbent((children_lo + children_hi) / 2)
+
+            bounds = np.concatenate([bounds[rest], child_bounds])
+            lo = np.concatenate([lo[rest], children_lo])
+            hi = np.concatenate([hi[rest], children_hi])
+            self.iterations += 1
+
+        return self.lower_bound(bounds), self.incumbent, self.incumbent_x
+
+    def lower_bound(self, bounds):
+        # Boxes discarded by the contraction hold nothing better than the
+        # incumbent; boxes pruned within the tolerance hold nothing better
+        # than their own bound
+        return min(np.min(bounds, initial=np.inf), self.pruned_bound, self.incumbent)
+
+    def _branch(self, lo, hi):
+        m, n = lo.shape
+        middle = (lo + hi) / 2
+
+        # Try every variable: 2 * n children per box, bounded in one batch
+        left_hi = np.repeat(hi[:, None, :], n, axis=1)
+        right_lo = np.repeat(lo[:, None, :], n, axis=1)
+        left_hi[:, np.arange(n), np.arange(n)] = middle
+        right_lo[:, np.arange(n), np.arange(n)] = middle
+        trial_lo = np.concatenate([np.repeat(lo[:, None, :], n, axis=1), right_lo]).reshape(-1, n)
+        trial_hi = np.concatenate([left_hi, np.repeat(hi[:, None, :], n, axis=1)]).reshape(-1, n)
+        trial_bounds = self.bound(trial_lo, trial_hi, self.incumbent)[0].reshape(2, m, n)
+
+        # Score: the smaller child bound, ties broken by the relative width
+        width = (hi - lo) / (self.upper - self.lower)
+        score = np.minimum(trial_bounds[0], trial_bounds[1])
+        score = np.where(width > 0, score, -np.inf)
+        best = np.lexsort((width.T, score.T), axis=0)[-1]
+
+        left_hi, right_lo = hi.copy(), lo.copy()
+        left_hi[np.arange(m), best] = middle[np.arange(m), best]
+        right_lo[np.arange(m), best] = middle[np.arange(m), best]
+        return np.concatenate([lo, right_lo]), np.concatenate([left_hi, hi])
+
+
+# Gap-Based Stopping Criterion ----
+def gap_closed(incumbent_f, lower_bound, tolerance):
+    """
+    True once the incumbent is provably within `tolerance` of the global
+    minimum. Any optimizer can use it as a stopping rule: nlopt scripts
+    through `opt.set_stopval(lower_bound + tolerance)` and the ask/tell
+    harness through `run_together(..., stop_value=lower_bound + tolerance)`.
+    """
+    return incumbent_f - lower_bound <= tolerance
+
+
+# Example: Certify the PSO Optimum and the Best Known Solution ----
+if __name__ == "__main__":
+    from CMAES import constraints, lb, objective_function, ub
+
+    # Optimal solution stored in PSO.py
+    optimized_x = np.array([197.3555162, 10000.04094, 6.06058071, 6.06481227,
+                            4.55822528, 26305.20034, 4.36023396, 0.00221809,
+                            55.86751226, 1.54009833, 720.005943, 3600.099775,
+                            524.0792289, 6.04250929, 6.03679917, 4.55245179,
+                            2082.596513, 4423.625629, 52.0247252, 51.7242541])
+    pso_f = objective_function(optimized_x)
+
+    bnb = BranchAndBound(objective_function, constraints, lb, ub)
+    lower_bound, incumbent, incumbent_x = bnb.solve(pso_f, optimized_x, gap_tolerance=1e-2)
+
+    print(f"Lower bound on the global minimum: {lower_bound:.8f} ({bnb.iterations} iterations)")
+    print(f"Gap of the PSO optimum ({pso_f:.8f}): {pso_f - lower_bound:.8f}")
+    print(f"Optimal solution: {', '.join(f'{x:.8f}' for x in incumbent_x)}"
+          f", Objective function value at optimal solution: {incumbent:.8f}")
+    print(f"Gap of the best solution found: {incumbent - lower_bound:.8f}")
+
+    # Archive the best solution found (see solution_archive.py)
+    from solution_archive import SolutionArchive
+    archive = SolutionArchive()
+    key = archive.configure(objective_function, constraints, lb, ub)
+    archive.add(key, incumbent_x, incumbent, sum(max(0.0, -g(incumbent_x)) for g in constraints),
+                source="branch_and_bound.py")
+    archive.save()
@@ -0,0 +1,175 @@
+# **********************************************************************
+# Constraint Handling ----
+#
+# Purpose ----
+# Constraint handling shared by the penalty-based algorithms (GA, SA, BH,
+# PSO, PT and BH-Walkers). Everything works on batches: a constraint matrix G has one row
+# per candidate and one column per constraint (satisfied when g(x) >= 0,
+# as in PSO.py), and the violation matrix V holds max(0, -G). Three
+# techniques are offered:
+# 1. Adaptive penalty: one weight per constraint, set from the statistics
+#    of the latest batch (adaptive penalty method of Barbosa and Lemonge),
+#    so no penalty multiplier has to be tuned and constraints of very
+#    different scales are weighted alike.
+# 2. Deb's feasibility rules: feasible before infeasible, feasible
+#    candidates by f, infeasible candidates by total violation.
+# 3. Epsilon-constrained ranking (Takahama and Sakai): candidates whose
+#    total violation is within a level epsilon, which decreases to 0 over
+#    the generations, are ranked by f as if they were feasible.
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+
+
+# Violations ----
+def violation_matrix(G):
+    return np.maximum(0.0, -np.atleast_2d(G))
+
+
+def total_violation(V):
+    return np.atleast_2d(V).sum(axis=1)
+
+
+# Adaptive Penalty ----
+class AdaptivePenalty:
+    """
+    Penalized objective f + sum_j k_j * v_j with
+    k_j = |mean f| * mean v_j / sum_l (mean v_l)^2 over the latest batch.
+    A constraint that is violated more on average gets a larger weight,
+    and the penalty of an average violation is of the order of |mean f|.
+    For fixed weights the penalty is continuous in x, so gradient-based
+    local searches can minimize it too.
+
+    Population-based algorithms call `update(f, V)` once per generation.
+    Algorithms that evaluate one point at a time `observe(f, V)` every
+    evaluation: the observations are pooled, and the weights are updated
+    every `window` evaluations or when `flush()` is called.
+    """
+
+    def __init__(self, window=None):
+        self.weights = None
+        self.window = window
+        self.observed_f, self.observed_V = [], []
+
+    def update(self, f, V):
+        f, V = np.atleast_1d(f), np.atleast_2d(V)
+        mean_v = V.mean(axis=0)
+        if self.weights is None:
+            self.weights = np.zeros(V.shape[1])
+        if np.any(mean_v > 0):
+            # Constraints that were not violated in the batch keep their weight
+            weights = np.abs(np.mean(f)) * mean_v / np.sum(mean_v ** 2)
+            self.weights = np.where(mean_v > 0, weights, self.weights)
+
+    def calibrate(self, objective_function, constraint_values, lower, upper, size=100, rng=None):
+        """
+        Set the initial weights from a uniform sample within the bounds.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        sample = lower + rng.random((size, len(lower))) * (upper - lower)
+        f = np.array([objective_function(x) for x in sample])
+        V = violation_matrix(np.array([constraint_values(x) for x in sample]))
+        self.update(f, V)
+
+    def observe(self, f, V):
+        self.observed_f.append(np.atleast_1d(f))
+        self.observed_V.append(np.atleast_2d(V))
+        if self.window is not None and len(self.observed_f) >= self.window:
+            self.flush()
+
+    def flush(self):
+        if self.observed_f:
+            self.update(np.concatenate(self.observed_f), np.concatenate(self.observed_V))
+        self.observed_f, self.observed_V = [], []
+
+    def __call__(self, f, V):
+        V = np.atleast_2d(V)
+        if self.weights is None:
+            self.update(f, V)
+        return f + V @ self.weights
+
+    def gradient(self, objective_gradient, g, jacobian):
+        """
+        Gradient of the penalized objective at a single point, given the
+        objective gradient, the constraint values g and their Jacobian
+        (one row per constraint). Where g_j < 0, v_j = -g_j.
+        """
+        return objective_gradient - (self.weights * (g < 0)) @ jacobian
+
+
+class PenalizedObjective:
+    """
+    Point-wise penalized objective function for the libraries that only
+    minimize a scalar function (dual_annealing, basinhopping, pyswarm).
+    `constraint_values(x)` returns all the constraint values at x.
+    Penalized values computed with different weights are not comparable,
+    so the best point evaluated so far by Deb's feasibility rules is kept
+    (x, f and violation) and should be reported instead of the library's
+    own optimum. Every evaluation is reported to `telemetry` if given (see
+    telemetry.py). If `objective_gradient` and `constraints_jacobian` are
+    given, a call returns the penalized value and its gradient, for
+    minimizers called with jac=True.
+    """
+
+    def __init__(self, objective_function, constraint_values, penalty, telemetry=None,
+                 objective_gradient=None, constraints_jacobian=None):
+        self.objective_function = objective_function
+        self.constraint_values = constraint_values
+        self.penalty = penalty
+        self.telemetry = telemetry
+        self.objective_gradient = objective_gradient
+        self.constraints_jacobian = constraints_jacobian
+        self.x, self.f, self.violation = None, np.inf, np.inf
+
+    def __call__(self, x):
+        f = self.objective_function(x)
+        g = self.constraint_values(x)
+        V = violation_matrix(g)
+        violation = total_violation(V)[0]
+        if np.isfinite(f) and (violation, f) < (self.violation, self.f):
+            self.x, self.f, self.violation = np.array(x, dtype=float), f, violation
+        self.penalty.observe(f, V)
+        if self.telemetry is not None:
+            self.telemetry.observe(f, violation)
+        value = float(self.penalty(f, V)[0])
+        if self.objective_gradient is None:
+            return value
+        return value, self.penalty.gradient(self.objective_gradient(x), g, self.constraints_jacobian(x))
+
+
+# Deb's Feasibility Rules ----
+def feasibility_order(f, violation):
+    """
+    Indices of the candidates from best to worst: feasible ones first
+    (by f), then infeasible ones (by total violation).
+    """
+    return epsilon_order(f, violation, 0.0)
+
+
+# Epsilon-Constrained Ranking ----
+class EpsilonLevel:
+    """
+    epsilon(t) = epsilon_0 * (1 - t / T_c)^cp for generation t < T_c, then
+    0, where epsilon_0 is the total violation of the candidate at quantile
+    theta of the initial batch.
+    """
+
+    def __init__(self, initial_violation, control_generations, exponent=5, theta=0.2):
+        self.epsilon0 = np.quantile(initial_violation, theta)
+        self.control_generations = control_generations
+        self.exponent = exponent
+
+    def __call__(self, generation):
+        if generation >= self.control_generations:
+            return 0.0
+        return self.epsilon0 * (1 - generation / self.control_generations) ** self.exponent
+
+
+def epsilon_order(f, violation, epsilon):
+    """
+    Indices of the candidates from best to worst when a total violation
+    up to `epsilon` counts as feasible.
+    """
+    relaxed = np.where(violation <= epsilon, 0.0, violation)
+    return np.lexsort((f, relaxed))
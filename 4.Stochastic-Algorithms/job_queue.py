@@ -0,0 +1,343 @@
+# **********************************************************************
+# Experiment Queue ----
+#
+# Purpose ----
+# Run the algorithms x seeds x scenarios of an experiment on several
+# machines without an outside broker. The jobs (algorithm, configuration,
+# seed) are stored in one SQLite file on a shared filesystem:
+# - producers enqueue jobs (a job that is already queued is not added
+#   twice);
+# - any number of worker processes, on any node, claim the oldest pending
+#   job atomically (in an IMMEDIATE transaction, which takes SQLite's
+#   write lock), run it and write its result back;
+# - a running job is kept alive by a heartbeat; a job whose heartbeat
+#   stopped (crashed or killed worker) is returned to the queue, up to
+#   `max_attempts` attempts, and a job that raised an exception too.
+# Every algorithm of Portfolio.py (and DE) is run through the ask/tell
+# harness (see ask_tell.py) with the configuration of the job:
+# {"max_evaluations": 100000, "lower": {"17": 40}, "upper": {"17": 5000}}
+# where "lower" and "upper" override the bounds of some variables (by
+# index), e.g. for the scenarios of scenario_sweep.py.
+#
+# SQLite needs working file locks on the shared filesystem (e.g. NFS with
+# fcntl locks); the rollback journal is used rather than WAL, which needs
+# shared memory on a single host.
+#
+# python job_queue.py enqueue --algorithms CMA-ES PSO GA --seeds 10 \
+#     --config '{"max_evaluations": 20000}'
+# python job_queue.py worker --processes 8     # On every node
+# python job_queue.py status
+# python job_queue.py results --output experiment-results.csv
+# **********************************************************************
+
+# Imports ----
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+import numpy as np
+
+# Queue Settings ----
+database_file = "experiments.sqlite"
+algorithms = ["CMA-ES", "PSO", "GA", "COBYLA", "ISRES", "SA", "BH", "SLSQP", "DE"]
+default_max_evaluations = 100000
+heartbeat_interval = 10.0  # Seconds between two heartbeats of a running job
+stale_after = 60.0  # Seconds without heartbeat after which a job is retried
+max_attempts = 3
+poll_interval = 5.0  # Seconds between two claims while other jobs are running
+lock_timeout = 60.0  # Seconds to wait for SQLite's lock
+
+schema = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    algorithm TEXT NOT NULL,
+    config TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    enqueued_at REAL,
+    claimed_at REAL,
+    heartbeat REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (algorithm, config, seed)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+Job = namedtuple("Job", ["id", "algorithm", "config", "seed", "attempt"])
+
+
+# Job Queue ----
+class JobQueue:
+    """
+    Jobs stored in a SQLite file. Every process (and thread) opens its own
+    JobQueue.
+    """
+
+    def __init__(self, path=database_file, timeout=lock_timeout):
+        self.path = path
+        # Autocommit mode: the transactions are opened explicitly
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.executescript(schema)
+
+    def close(self):
+        self.connection.close()
+
+    def transaction(self):
+        """
+        Write transaction: the lock is taken when it starts, so that two
+        workers cannot read the same pending job.
+        """
+        queue = self
+
+        class Transaction:
+            def __enter__(self):
+                queue.connection.execute("BEGIN IMMEDIATE")
+                return queue.connection
+
+            def __exit__(self, exception_type, *exception):
+                queue.connection.execute("ROLLBACK" if exception_type else "COMMIT")
+
+        return Transaction()
+
+    def enqueue(self, algorithm, config, seed):
+        """
+        Add a job, unless the same job is already queued. Returns True if
+        it was added.
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO jobs (algorithm, config, seed, enqueued_at) VALUES (?, ?, ?, ?)",
+                (algorithm, json.dumps(config, sort_keys=True), int(seed), time.time()))
+        return cursor.rowcount == 1
+
+    def claim(self, worker):
+        """
+        Claim the oldest pending job for `worker`, after returning the jobs
+        whose heartbeat stopped to the queue. Returns None if no job is
+        pending.
+        """
+        now = time.time()
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = 'no heartbeat from ' || worker WHERE status = 'running' AND heartbeat < ?",
+                (max_attempts, now - stale_after))
+            row = connection.execute(
+                "SELECT id, algorithm, config, seed, attempts FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, claimed_at = ?, "
+                "heartbeat = ? WHERE id = ?", (worker, now, now, row[0]))
+        return Job(row[0], row[1], json.loads(row[2]), row[3], row[4] + 1)
+
+    def heartbeat(self, job, worker):
+        # Only while the job is still this worker's (it may have been
+        # handed to another worker after a long pause)
+        with self.transaction() as connection:
+            connection.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                               (time.time(), job.id, worker))
+
+    def complete(self, job, worker, result):
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job.id, worker))
+
+    def fail(self, job, worker, error):
+        """
+        Return a job that raised an exception to the queue, or mark it as
+        failed after `max_attempts` attempts.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+                "finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (max_attempts, error, time.time(), job.id, worker))
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def finished(self):
+        return not self.connection.execute(
+            "SELECT 1 FROM jobs WHERE status IN ('pending', 'running') LIMIT 1").fetchone()
+
+    def results(self):
+        """
+        (job, result) of every job that is done, in the order of the jobs.
+        """
+        rows = self.connection.execute(
+            "SELECT id, algorithm, config, seed, attempts, worker, result FROM jobs WHERE status = 'done' ORDER BY id")
+        return [(Job(row[0], row[1], json.loads(row[2]), row[3], row[4]), row[5], json.loads(row[6]))
+                for row in rows]
+
+
+class Heartbeat:
+    """
+    Background thread that keeps a claimed job alive (with its own
+    connection, as SQLite connections belong to one thread).
+    """
+
+    def __init__(self, path, job, worker):
+        self.path, self.job, self.worker = path, job, worker
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        queue = JobQueue(self.path)
+        try:
+            while not self.stopped.wait(heartbeat_interval):
+                try:
+                    queue.heartbeat(self.job, self.worker)
+                except sqlite3.OperationalError:
+                    pass  # Lock held too long: the next heartbeat will do
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.stopped.set()
+        self.thread.join()
+
+
+# Running a Job ----
+def run_job(job):
+    """
+    Run one algorithm with the configuration and seed of the job. Returns
+    the best solution by Deb's rules, the evaluations and the time used.
+    """
+    from ask_tell import BatchEvaluator, run
+    from CMAES import evaluate_population, lb, ub
+    from Portfolio import make_optimizer
+
+    lower, upper = lb.copy(), ub.copy()
+    for i, value in job.config.get("lower", {}).items():
+        lower[int(i)] = value
+    for i, value in job.config.get("upper", {}).items():
+        upper[int(i)] = value
+
+    start = time.perf_counter()
+    optimizer = make_optimizer(job.algorithm, job.seed, lower, upper)
+    incumbent = run(optimizer, BatchEvaluator(evaluate_population),
+                    job.config.get("max_evaluations", default_max_evaluations))
+    return {"f": float(incumbent.f), "violation": float(incumbent.violation),
+            "evaluations": int(incumbent.evaluations), "seconds": time.perf_counter() - start,
+            "x": None if incumbent.x is None else incumbent.x.tolist()}
+
+
+def work(path, forever=False):
+    """
+    Claim and run jobs until the queue is finished (no job pending or
+    running, since a running job may still be retried), or forever.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(path)
+    completed = 0
+    try:
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                if not forever and queue.finished():
+                    break
+                time.sleep(poll_interval)
+                continue
+            with Heartbeat(path, job, worker):
+                try:
+                    result = run_job(job)
+                except Exception:
+                    queue.fail(job, worker, traceback.format_exc())
+                    print(f"{worker}: job {job.id} ({job.algorithm}, seed {job.seed}) failed "
+                          f"(attempt {job.attempt})")
+                    continue
+            queue.complete(job, worker, result)
+            completed += 1
+            print(f"{worker}: job {job.id} ({job.algorithm}, seed {job.seed}) done: "
+                  f"f = {result['f']:.8f}, violation = {result['violation']:.8f}, {result['seconds']:.1f} s")
+    finally:
+        queue.close()
+    return completed
+
+
+# Command Line ----
+def print_status(queue):
+    counts = queue.counts()
+    print(", ".join(f"{status}: {counts.get(status, 0)}" for status in ["pending", "running", "done", "failed"]))
+    by_algorithm = {}
+    for job, _, result in queue.results():
+        by_algorithm.setdefault(job.algorithm, []).append(result)
+    for algorithm, results in by_algorithm.items():
+        feasible = [result["f"] for result in results if result["violation"] <= 0]
+        summary = (f"best f {min(feasible):.8f}, median f {np.median(feasible):.8f}" if feasible
+                   else "no feasible solution")
+        print(f"  {algorithm}: {len(results)} done, {len(feasible)} feasible, {summary}")
+
+
+def write_results(queue, output):
+    with open(output, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["job", "algorithm", "seed", "config", "attempts", "worker", "f", "violation",
+                         "evaluations", "seconds"] + [f"x[{i}]" for i in range(20)])
+        for job, worker, result in queue.results():
+            writer.writerow([job.id, job.algorithm, job.seed, json.dumps(job.config, sort_keys=True), job.attempt,
+                             worker, result["f"], result["violation"], result["evaluations"], result["seconds"]]
+                            + (result["x"] or []))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite-backed experiment queue")
+    parser.add_argument("--database", default=database_file, help="SQLite file (on a shared filesystem)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="add algorithm x configuration x seed jobs")
+    enqueue.add_argument("--algorithms", nargs="+", default=algorithms, choices=algorithms)
+    enqueue.add_argument("--seeds", type=int, default=10, help="number of seeds per algorithm and configuration")
+    enqueue.add_argument("--first-seed", type=int, default=0)
+    enqueue.add_argument("--config", action="append", type=json.loads,
+                         help='configuration (JSON), repeatable, e.g. \'{"max_evaluations": 20000}\'')
+    worker = commands.add_parser("worker", help="claim and run jobs")
+    worker.add_argument("--processes", type=int, default=1, help="worker processes on this node")
+    worker.add_argument("--forever", action="store_true", help="keep polling for new jobs")
+    commands.add_parser("status", help="count the jobs by status and summarize the results")
+    results = commands.add_parser("results", help="write the results to a CSV file")
+    results.add_argument("--output", default="experiment-results.csv")
+    arguments = parser.parse_args()
+
+    if arguments.command == "enqueue":
+        queue = JobQueue(arguments.database)
+        configs = arguments.config or [{"max_evaluations": default_max_evaluations}]
+        added = sum(queue.enqueue(algorithm, config, seed)
+                    for config in configs for algorithm in arguments.algorithms
+                    for seed in range(arguments.first_seed, arguments.first_seed + arguments.seeds))
+        print(f"{added} jobs added")
+        print_status(queue)
+    elif arguments.command == "worker":
+        if arguments.processes == 1:
+            work(arguments.database, arguments.forever)
+        else:
+            processes = [multiprocessing.Process(target=work, args=(arguments.database, arguments.forever))
+                         for _ in range(arguments.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+    elif arguments.command == "status":
+        print_status(JobQueue(arguments.database))
+    else:
+        write_results(JobQueue(arguments.database), arguments.output)
+        print(f"Results saved in {arguments.output}")
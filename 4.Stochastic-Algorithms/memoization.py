@@ -0,0 +1,110 @@
+# **********************************************************************
+# Memoization of the Model Evaluations ----
+#
+# Purpose ----
+# Local searches and the scripts revisit points: the GA re-scores the
+# individuals that come out of a generation unchanged (their fitness is
+# invalidated whether or not the mutation changed them), nlopt's COBYLA
+# re-scores its starting point, and a basin-hopping hop may return to a
+# minimum that was already found. An opt-in cache in front of the model
+# returns the stored value of a point that was already evaluated:
+# - keys are the exact bytes of x, or x quantized to a grid of `quantum`
+#   (a scalar or one step per variable), in which case every point of a
+#   grid cell gets the value of the first point evaluated in it;
+# - the least recently used entries are evicted when the cache holds more
+#   than `max_bytes` (keys and values, plus a fixed overhead per entry);
+# - hit, miss and eviction counters are kept per memoized function, so the
+#   evaluations saved by every algorithm can be reported.
+# One cache can serve several functions (the objective function and the
+# constraints of a script), which then share the memory bound.
+# **********************************************************************
+
+# Imports ----
+from collections import OrderedDict
+
+import numpy as np
+
+# Cache Settings ----
+entry_overhead = 200  # Estimated bytes per entry besides the key and value
+
+
+# Evaluation Cache ----
+class EvaluationCache:
+    """
+    Least recently used cache of function values keyed on x.
+
+        cache = EvaluationCache(max_bytes=64 * 2 ** 20)
+        objective_function = cache.memoize(objective_function)
+        ...
+        print(cache.summary())
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20, quantum=None):
+        self.max_bytes = max_bytes
+        self.quantum = None if quantum is None else np.asarray(quantum, dtype=float)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.names = []  # Name of every memoized function
+        self.hits, self.misses, self.evictions = [], [], 0
+
+    def key(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.quantum is not None:
+            return np.round(x / self.quantum).astype(np.int64).tobytes()
+        return x.tobytes()
+
+    def memoize(self, function, name=None):
+        """
+        Memoized version of function(x, *arguments). Only x is part of the
+        key, so the other arguments must not change the value (e.g. the
+        `grad` argument of nlopt, which derivative-free algorithms pass
+        empty).
+        """
+        index = len(self.names)
+        self.names.append(name or getattr(function, "__name__", f"function {index}"))
+        self.hits.append(0)
+        self.misses.append(0)
+
+        def memoized(x, *arguments):
+            key = (index, self.key(x))
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits[index] += 1
+                value = self.entries[key]
+                return value.copy() if isinstance(value, np.ndarray) else value
+            self.misses[index] += 1
+            value = function(x, *arguments)
+            self.store(key, value.copy() if isinstance(value, np.ndarray) else value)
+            return value
+
+        memoized.__name__ = self.names[index]
+        memoized.__doc__ = function.__doc__
+        return memoized
+
+    def store(self, key, value):
+        size = len(key[1]) + np.asarray(value).nbytes + entry_overhead
+        if size > self.max_bytes:
+            return
+        self.entries[key] = value
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            (_, old_key), old_value = self.entries.popitem(last=False)
+            self.bytes -= len(old_key) + np.asarray(old_value).nbytes + entry_overhead
+            self.evictions += 1
+
+    def hit_rate(self):
+        total = sum(self.hits) + sum(self.misses)
+        return sum(self.hits) / total if total else 0.0
+
+    def summary(self, title="Evaluation cache"):
+        """
+        Hits (evaluations saved), misses and hit rate, in total and per
+        memoized function.
+        """
+        lines = [f"{title}: {sum(self.hits)} hits (evaluations saved), {sum(self.misses)} misses, "
+                 f"hit rate {self.hit_rate():.1%}, {len(self.entries)} entries ({self.bytes / 2 ** 20:.2f} MB), "
+                 f"{self.evictions} evictions"]
+        if len(self.names) > 1:
+            for name, hits, misses in zip(self.names, self.hits, self.misses):
+                lines.append(f"  {name}: {hits} hits, {misses} misses")
+        return "\n".join(lines)
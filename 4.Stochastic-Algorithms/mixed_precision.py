@@ -0,0 +1,211 @@
+# **********************************************************************
+# Mixed-Precision Screening ----
+#
+# Purpose ----
+# Screen very large batches of candidates (10^8 - 10^9 points of a random
+# search, a landscape grid or a Monte Carlo study) in float32, which halves
+# the memory traffic of every batch and lets numpy use twice as many SIMD
+# lanes, and re-score in float64 only the candidates whose outcome the
+# float32 values could get wrong:
+# - candidates near the feasibility boundary (a constraint within its
+#   float32 error margin of 0) are re-scored as soon as they are screened,
+#   so their feasibility is decided in float64;
+# - the `top_k` best feasible candidates are re-scored at the end, and the
+#   best solution is the best of them in float64.
+# The error margins are calibrated on a random sample of the bounds: the
+# largest difference between the float32 and float64 values of f and of
+# every constraint, times a safety factor. The screening also counts how
+# often the two precisions disagree (feasibility and order of the top-k),
+# and whether the top-k is certain to contain the float64 best.
+#
+# The model is written index-wise, so the same functions evaluate float32
+# or float64 batches: numpy keeps the precision of the array, whatever the
+# precision of the Python constants.
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+
+
+# Mixed-Precision Screening ----
+class PrecisionScreening:
+    """
+    Screening of batches of candidates (one candidate per row) in float32,
+    with float64 re-scoring of the top-k and of the candidates near the
+    feasibility boundary (constraints are satisfied when g(x) >= 0, as in
+    PSO.py).
+
+        screening = PrecisionScreening(objective_function, constraints, lb, ub)
+        for X in batches:
+            screening.screen(X)
+        X_best, f_best = screening.result()
+        print(screening.statistics())
+    """
+
+    def __init__(self, objective_function, constraints, lower, upper, top_k=100, safety_factor=10.0,
+                 number_of_calibration_points=2 ** 16, dtype=np.float32, rng=None):
+        self.objective_function = objective_function
+        self.constraints = constraints
+        self.top_k = top_k
+        self.dtype = dtype
+        rng = rng if rng is not None else np.random.default_rng()
+
+        # Candidates kept for the final re-scoring (in the screening dtype)
+        self.X = np.empty((0, len(lower)), dtype=dtype)
+        self.f = np.empty(0, dtype=dtype)
+        self.screened = 0  # Candidates screened
+        self.rescored = 0  # Candidates re-scored in float64 near the boundary
+        self.feasibility_disagreements = 0  # Among the re-scored candidates
+        self.calibrate(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float),
+                       safety_factor, number_of_calibration_points, rng)
+
+    def values(self, X):
+        """
+        f and the constraint values (one row per constraint) of a batch, in
+        the precision of X.
+        """
+        x = X.T
+        f = np.empty(len(X), dtype=X.dtype)
+        G = np.empty((len(self.constraints), len(X)), dtype=X.dtype)
+        f[:] = self.objective_function(x)
+        for j, constraint in enumerate(self.constraints):
+            G[j] = constraint(x)
+        f[~np.isfinite(f)] = np.inf
+        return f, G
+
+    def calibrate(self, lower, upper, safety_factor, number_of_points, rng):
+        """
+        Error margins of f and of every constraint: the largest difference
+        between the screening and the float64 values on points drawn
+        within the bounds, times `safety_factor`.
+        """
+        X = (lower + rng.random((number_of_points, len(lower))) * (upper - lower)).astype(self.dtype)
+        f, G = self.values(X)
+        f_64, G_64 = self.values(X.astype(np.float64))
+        finite = np.isfinite(f_64)
+        self.calibration_errors = (np.max(np.abs(f[finite] - f_64[finite]), initial=0.0),
+                                   np.max(np.abs(G - G_64), axis=1))
+        self.f_margin = safety_factor * self.calibration_errors[0]
+        self.margins = safety_factor * self.calibration_errors[1]
+        self.calibration_disagreement = np.mean(np.all(G >= 0, axis=0) != np.all(G_64 >= 0, axis=0))
+
+    def screen(self, X):
+        """
+        Screen a batch and keep its best feasible candidates. Returns the
+        number of feasible candidates in the batch.
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        f, G = self.values(X)
+        margins = self.margins[:, None]
+        possibly_feasible = np.all(G >= -margins, axis=0) & np.isfinite(f)
+        feasible = np.all(G > margins, axis=0) & np.isfinite(f)
+        self.screened += len(X)
+
+        # Near the boundary: feasibility decided in float64
+        uncertain = np.flatnonzero(possibly_feasible & ~feasible)
+        if len(uncertain):
+            _, G_64 = self.values(X[uncertain].astype(np.float64))
+            feasible_64 = np.all(G_64 >= 0, axis=0)
+            self.rescored += len(uncertain)
+            self.feasibility_disagreements += int(np.sum(np.all(G[:, uncertain] >= 0, axis=0) != feasible_64))
+            feasible[uncertain] = feasible_64
+
+        # Best feasible candidates of the batch and of the previous ones
+        candidates = np.flatnonzero(feasible)
+        if len(candidates) > self.top_k:
+            candidates = candidates[np.argpartition(f[candidates], self.top_k - 1)[:self.top_k]]
+        X_kept, f_kept = np.vstack([self.X, X[candidates]]), np.concatenate([self.f, f[candidates]])
+        if len(f_kept) > self.top_k:
+            best = np.argpartition(f_kept, self.top_k - 1)[:self.top_k]
+            X_kept, f_kept = X_kept[best], f_kept[best]
+        self.X, self.f = X_kept, f_kept
+        return int(np.sum(feasible))
+
+    def result(self):
+        """
+        The top-k candidates re-scored in float64, best first: (X, f).
+        Candidates found infeasible in float64 are dropped.
+        """
+        self._X_64 = self.X.astype(np.float64)
+        f_64, G_64 = self.values(self._X_64)
+        self._f_64, self._feasible_64 = f_64, np.all(G_64 >= 0, axis=0)
+        order = np.argsort(np.where(self._feasible_64, f_64, np.inf), kind="stable")
+        order = order[self._feasible_64[order]]
+        return self._X_64[order], f_64[order]
+
+    def statistics(self):
+        """
+        How often the two precisions disagree, and how certain the result
+        is (call after `result()`).
+        """
+        order_screening = np.argsort(self.f, kind="stable")
+        order_64 = np.argsort(self._f_64, kind="stable")
+        best_64 = np.min(self._f_64[self._feasible_64], initial=np.inf)
+        # A candidate outside the top-k has a float64 value above
+        # (k-th float32 value - f_margin)
+        kth = np.max(self.f, initial=np.inf) if len(self.f) >= self.top_k else np.inf
+        return {
+            "screened": self.screened,
+            "rescored near the boundary": self.rescored,
+            "feasibility disagreements near the boundary": self.feasibility_disagreements,
+            "feasibility disagreement rate (calibration sample)": float(self.calibration_disagreement),
+            "top-k infeasible in float64": int(np.sum(~self._feasible_64)),
+            "top-k order disagreements": int(np.sum(order_screening != order_64)),
+            "same best candidate": bool(len(self.f) and order_screening[0] == order_64[0]),
+            "largest f difference in the top-k": float(np.max(np.abs(self.f - self._f_64), initial=0.0)),
+            "f margin": float(self.f_margin),
+            "top-k contains the float64 best": bool(best_64 <= kth - self.f_margin),
+        }
+
+
+# Example: Random Search over 10^8 Candidates ----
+if __name__ == "__main__":
+    import time
+
+    from CMAES import constraints, lb, ub, objective_function
+    from solution_archive import SolutionArchive
+
+    number_of_samples = 10 ** 8
+    comparison_samples = 10 ** 7  # Screened in float64 only, for the throughput
+    batch_size = 2 ** 20
+    top_k = 100
+    rng = np.random.default_rng(42)
+
+    def random_search(screening, size, dtype):
+        # Rows of X are candidates, but every variable is contiguous in
+        # memory (X.T is C-ordered), which is what the model reads
+        lower, width = lb.astype(dtype)[:, None], (ub - lb).astype(dtype)[:, None]
+        feasible, screening_time, start_time = 0, 0.0, time.perf_counter()
+        for start in range(0, size, batch_size):
+            U = rng.random((len(lb), min(batch_size, size - start)), dtype=dtype)
+            X = np.minimum(lower + U * width, ub.astype(dtype)[:, None]).T
+            screening_start = time.perf_counter()
+            feasible += screening.screen(X)
+            screening_time += time.perf_counter() - screening_start
+        return feasible, screening_time, time.perf_counter() - start_time
+
+    reference = PrecisionScreening(objective_function, constraints, lb, ub, top_k=top_k, dtype=np.float64,
+                                   rng=np.random.default_rng(0))
+    _, screening_time_64, elapsed_64 = random_search(reference, comparison_samples, np.float64)
+    screening = PrecisionScreening(objective_function, constraints, lb, ub, top_k=top_k,
+                                   rng=np.random.default_rng(0))
+    feasible, screening_time, elapsed = random_search(screening, number_of_samples, np.float32)
+    X_best, f_best = screening.result()
+
+    archive = SolutionArchive()
+    key = archive.configure(objective_function, constraints, lb, ub)
+    archive.add(key, X_best[0], f_best[0], source="mixed_precision.py")
+    archive.save()
+
+    throughput, throughput_64 = number_of_samples / screening_time, comparison_samples / screening_time_64
+    print(f"{number_of_samples} candidates screened in float32 in {elapsed:.3f} seconds "
+          f"({screening_time:.3f} seconds in the screening), {feasible} feasible")
+    print(f"Screening throughput: {throughput:.3g} per second in float32, {throughput_64:.3g} per second in "
+          f"float64 ({throughput / throughput_64:.2f}x); including the sampling: "
+          f"{(number_of_samples / elapsed) / (comparison_samples / elapsed_64):.2f}x")
+    print(f"Error margins (float32 - float64): f {screening.f_margin:.3g}, "
+          f"constraints {', '.join(f'{margin:.3g}' for margin in screening.margins)}")
+    for name, value in screening.statistics().items():
+        print(f"  {name}: {value}")
+    x_opt_formatted = ", ".join([f"{x:.8f}" for x in X_best[0]])
+    print(f"Optimal solution: [{x_opt_formatted}], Objective function value at optimal solution: {f_best[0]:.8f}")
@@ -0,0 +1,122 @@
+# **********************************************************************
+# Robust Optimization ----
+#
+# Purpose ----
+# The settings that are implemented (acre, qe, tal, the fees exp and mal,
+# ...) will deviate from the values chosen by the optimizer. Instead of
+# f(x) and g(x), the robust mode scores a candidate by the distribution of
+# f(x + noise) and g(x + noise) over a sample of input deviations:
+# - objective: the expected value of f, or f at a quantile (e.g. 0.9 to
+#   minimize a pessimistic outcome);
+# - chance constraints: each constraint must hold with probability at
+#   least `chance`, i.e. its (1 - chance)-quantile must be >= 0; the
+#   violation is by how much that quantile falls below 0.
+# The sample of deviations is drawn once and shared by every candidate
+# (common random numbers), so that two candidates are compared on the same
+# deviations and the sampling noise does not swamp their difference.
+#
+# `RobustEvaluation(...)` has the signature of `evaluate_population(X)`
+# (see CMAES.py and ask_tell.py): a population of P candidates is expanded
+# into P x S perturbed points that are scored in one vectorized call of
+# the model, so the Python overhead per population does not grow with the
+# number of samples S. It can therefore replace `evaluate_population` in
+# any population-based optimizer or ask/tell evaluator.
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+
+
+# Robust Evaluation ----
+class RobustEvaluation:
+    """
+    Robust objective values and chance-constraint violations of a
+    population (one candidate per row).
+
+    noise: {variable index: relative standard deviation}, e.g. {6: 0.05}
+           for a 5% normal deviation of acre
+    statistic: "mean" for the expected value of f, or a quantile level
+    chance: probability with which each constraint must hold (constraints
+            are satisfied when g(x) >= 0, as in PSO.py)
+    """
+
+    def __init__(self, objective_function, constraints, noise, dimension, number_of_samples=64,
+                 statistic="mean", chance=0.95, max_points=2 ** 20, rng=None):
+        self.objective_function = objective_function
+        self.constraints = constraints
+        self.statistic = statistic
+        self.chance = chance
+        self.max_points = max_points
+        self.evaluations = 0  # Perturbed points scored so far
+        rng = rng if rng is not None else np.random.default_rng()
+
+        # Common random numbers: relative deviations of every sample
+        self.deviations = np.zeros((number_of_samples, dimension))
+        for i, relative_std in noise.items():
+            self.deviations[:, i] = relative_std * rng.standard_normal(number_of_samples)
+
+    def scores(self, X):
+        """
+        f and the constraint values at every perturbed point: arrays of
+        shape (P, S) and (number of constraints, P, S).
+        """
+        P, S = len(X), len(self.deviations)
+        Y = (X[:, None, :] * (1 + self.deviations)).reshape(P * S, -1).T
+        self.evaluations += P * S
+        F = self.objective_function(Y).reshape(P, S)
+        G = np.array([constraint(Y) * np.ones(P * S) for constraint in self.constraints]).reshape(-1, P, S)
+        return np.where(np.isfinite(F), F, np.inf), G
+
+    def __call__(self, X):
+        X = np.atleast_2d(X)
+        # Candidates per chunk, so that at most `max_points` points are held
+        chunk = max(1, self.max_points // len(self.deviations))
+        f, violation = np.empty(len(X)), np.empty(len(X))
+        for start in range(0, len(X), chunk):
+            F, G = self.scores(X[start:start + chunk])
+            stop = start + len(F)
+            if self.statistic == "mean":
+                f[start:stop] = F.mean(axis=1)
+            else:
+                f[start:stop] = np.quantile(F, self.statistic, axis=1)
+            violation[start:stop] = np.maximum(0.0, -np.quantile(G, 1 - self.chance, axis=2)).sum(axis=0)
+        return f, violation
+
+    def probabilities(self, x):
+        """
+        Mean of f at x, probability that each constraint holds and
+        probability that all of them hold together.
+        """
+        F, G = self.scores(np.atleast_2d(x))
+        holds = G[:, 0, :] >= 0
+        return F.mean(), holds.mean(axis=1), holds.all(axis=0).mean()
+
+
+# Example: Nominal vs Robust Optimum with CMA-ES ----
+if __name__ == "__main__":
+    from ask_tell import BatchEvaluator, run
+    from CMAES import CMAES, constraints, evaluate_population, ip, lb, objective_function, ub
+
+    # 5% deviations of acre, qe, tal, exp and mal
+    input_noise = {6: 0.05, 8: 0.05, 17: 0.05, 18: 0.05, 19: 0.05}
+    number_of_samples = 64
+    max_evaluations = 20000  # Candidates (each scored on all the samples)
+
+    robust_evaluation = RobustEvaluation(objective_function, constraints, input_noise, len(ip),
+                                         number_of_samples=number_of_samples, statistic="mean", chance=0.95,
+                                         rng=np.random.default_rng(1))
+    nominal = run(CMAES(ip, 0.3, lb, ub, rng=np.random.default_rng(42)),
+                  BatchEvaluator(evaluate_population), max_evaluations)
+    robust = run(CMAES(ip, 0.3, lb, ub, rng=np.random.default_rng(42)),
+                 BatchEvaluator(robust_evaluation), max_evaluations)
+
+    # Out-of-sample check on an independent, larger sample of deviations
+    check = RobustEvaluation(objective_function, constraints, input_noise, len(ip),
+                             number_of_samples=100000, rng=np.random.default_rng(2))
+    for name, incumbent in [("Nominal optimum", nominal), ("Robust optimum", robust)]:
+        expected_f, probabilities, all_hold = check.probabilities(incumbent.x)
+        print(f"{name}: {', '.join(f'{x:.8f}' for x in incumbent.x)}")
+        print(f"  Objective function value without deviations: {objective_function(incumbent.x):.8f}")
+        print(f"  Expected objective function value with deviations: {expected_f:.8f}")
+        print(f"  Probability that each constraint holds: {', '.join(f'{p:.4f}' for p in probabilities)}")
+        print(f"  Probability that all the constraints hold: {all_hold:.4f}")
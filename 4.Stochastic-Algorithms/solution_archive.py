@@ -0,0 +1,198 @@
+# **********************************************************************
+# Solution Archive ----
+#
+# Purpose ----
+# Keep the best known solutions of every problem configuration on disk,
+# so that optimizers, sensitivity analyses and scenario sweeps can start
+# from them instead of from `init_point` or from a hard-coded optimum.
+# A configuration is identified by a hash of the model coefficients, the
+# bounds and the active constraints. Since the model is duplicated in
+# every script, the hash is a fingerprint of the functions themselves:
+# their values at fixed probe points within the bounds. Two scripts with
+# the same model, bounds and active set of constraints therefore share
+# their solutions, whatever the order in which the constraints are listed.
+# For each configuration, the `capacity` best feasible solutions are kept,
+# with a KD-tree over x normalized to the bounds for nearest-neighbour
+# lookups.
+# **********************************************************************
+
+# Imports ----
+import hashlib
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows (saves are then not locked)
+    fcntl = None
+
+# Archive Settings ----
+# One archive shared by all the scripts, whatever the working directory
+archive_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solution-archive.json")
+number_of_probes = 8  # Probe points of the configuration fingerprint
+significant_digits = 12  # Precision of the fingerprint (robust to rounding)
+
+Solution = namedtuple("Solution", ["x", "f", "violation", "source"])
+
+
+# Configuration Hash ----
+def configuration_hash(objective_function, constraints, lower, upper):
+    """
+    Hash of a problem configuration. `constraints` is a list of constraint
+    functions or a function returning all the constraint values (satisfied
+    when g(x) >= 0). Changing a coefficient, a bound or the set of active
+    constraints changes the hash.
+    """
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    probes = lower + np.random.default_rng(0).random((number_of_probes, len(lower))) * (upper - lower)
+    probes = np.vstack([probes, (lower + upper) / 2])
+
+    def constraint_values(x):
+        return constraints(x) if callable(constraints) else [g(x) for g in constraints]
+
+    def fingerprint(values):
+        return ",".join(f"{float(value):.{significant_digits - 1}e}" for value in values)
+
+    objective = fingerprint(objective_function(x) for x in probes)
+    G = np.array([constraint_values(x) for x in probes], dtype=float)
+    # Sorted so that the order of the constraints does not matter
+    active = sorted(fingerprint(column) for column in G.T)
+    description = "|".join([fingerprint(lower), fingerprint(upper), objective] + active)
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+# Solution Archive ----
+class SolutionArchive:
+    """
+    Top-k feasible solutions per configuration, persisted as JSON.
+
+        archive = SolutionArchive()
+        key = archive.configure(objective_function, constraints, lb, ub)
+        starts = archive.best(key, 5)  # or archive.nearest(key, x, 5)
+        ...
+        archive.add(key, xopt, fopt, violation, source="PSO.py")
+        archive.save()
+
+    Solutions with a total violation above `tolerance` are not stored, and
+    a solution within `duplicate_distance` (in normalized x) of a stored
+    one replaces it only when it is better.
+    """
+
+    def __init__(self, path=archive_file, capacity=10, tolerance=1e-6, duplicate_distance=1e-6):
+        self.path = path
+        self.capacity = capacity
+        self.tolerance = tolerance
+        self.duplicate_distance = duplicate_distance
+        self.configurations = self._load()
+        self.trees = {}  # KD-trees, rebuilt after a change
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as file:
+            return json.load(file)
+
+    def configure(self, objective_function, constraints, lower, upper):
+        key = configuration_hash(objective_function, constraints, lower, upper)
+        self.configurations.setdefault(key, {"lower": np.asarray(lower, dtype=float).tolist(),
+                                             "upper": np.asarray(upper, dtype=float).tolist(),
+                                             "solutions": []})
+        return key
+
+    def _normalize(self, key, X):
+        configuration = self.configurations[key]
+        lower, upper = np.array(configuration["lower"]), np.array(configuration["upper"])
+        return (np.atleast_2d(X) - lower) / np.where(upper > lower, upper - lower, 1)
+
+    def _tree(self, key):
+        if key not in self.trees:
+            X = [solution["x"] for solution in self.configurations[key]["solutions"]]
+            self.trees[key] = cKDTree(self._normalize(key, X)) if X else None
+        return self.trees[key]
+
+    def add(self, key, x, f, violation=0.0, source=""):
+        """
+        Store a solution if it is feasible and among the `capacity` best of
+        its configuration. Returns True if it was stored.
+        """
+        if not np.isfinite(f) or violation > self.tolerance:
+            return False
+        solutions = self.configurations[key]["solutions"]
+        tree = self._tree(key)
+        if tree is not None:
+            distance, k = tree.query(self._normalize(key, x)[0])
+            if distance <= self.duplicate_distance:
+                if f >= solutions[k]["f"]:
+                    return False
+                del solutions[k]
+        if len(solutions) >= self.capacity and f >= solutions[-1]["f"]:
+            return False
+        solutions.append({"x": np.asarray(x, dtype=float).tolist(), "f": float(f),
+                          "violation": float(violation), "source": source})
+        solutions.sort(key=lambda solution: solution["f"])
+        del solutions[self.capacity:]
+        self.trees.pop(key, None)
+        return True
+
+    def _solutions(self, key, indices):
+        solutions = self.configurations.get(key, {"solutions": []})["solutions"]
+        return [Solution(np.array(solutions[k]["x"]), solutions[k]["f"], solutions[k]["violation"],
+                         solutions[k]["source"]) for k in indices]
+
+    def best(self, key, count=1):
+        """
+        The `count` best solutions (by f) of a configuration, best first.
+        """
+        stored = len(self.configurations.get(key, {"solutions": []})["solutions"])
+        return self._solutions(key, range(min(count, stored)))
+
+    def nearest(self, key, x, count=1):
+        """
+        The `count` stored solutions nearest to x (in x normalized to the
+        bounds), nearest first.
+        """
+        tree = self._tree(key) if key in self.configurations else None
+        if tree is None:
+            return []
+        count = min(count, tree.n)
+        _, indices = tree.query(self._normalize(key, x)[0], k=count)
+        return self._solutions(key, np.atleast_1d(indices))
+
+    @contextmanager
+    def _locked(self):
+        # Exclusive lock on a companion file (the archive itself is replaced,
+        # so it cannot hold the lock)
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def save(self):
+        """
+        Write the archive, merged with the solutions other runs have saved
+        in the meantime (the file is replaced atomically). The read, merge
+        and replace hold an exclusive lock, so that processes saving at the
+        same time (e.g. the workers of a scenario sweep or of the job
+        queue) do not drop each other's solutions.
+        """
+        with self._locked():
+            on_disk = SolutionArchive(self.path, self.capacity, self.tolerance, self.duplicate_distance)
+            for key, configuration in self.configurations.items():
+                on_disk.configurations.setdefault(key, {"lower": configuration["lower"],
+                                                        "upper": configuration["upper"], "solutions": []})
+                for solution in configuration["solutions"]:
+                    on_disk.add(key, solution["x"], solution["f"], solution["violation"], solution["source"])
+            self.configurations, self.trees = on_disk.configurations, {}
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(self.configurations, file, indent=1)
+            os.replace(temporary, self.path)
@@ -0,0 +1,454 @@
+# **********************************************************************
+# Surrogate-Assisted Optimization ----
+#
+# Purpose ----
+# When the objective function is expensive (the fitted R model behind
+# `/welfare` in API.R, or a model that takes minutes to refit), the 10^5
+# evaluations of the nlopt-based algorithms are out of reach. The
+# surrogate-assisted optimizer fits a cheap model of f on the points
+# evaluated so far and only sends to the true backend the candidates that
+# an infill criterion selects on that model:
+# - surrogate: a cubic radial basis function (RBF) interpolant with a
+#   linear tail, or a Gaussian process (GP) with a Matern 5/2 kernel, on x
+#   scaled to [0, 1]^d;
+# - initial design: a Latin hypercube (plus the initial point), screened
+#   on the constraints;
+# - candidates: perturbations of the best point in a random subset of the
+#   coordinates, with a step that shrinks after failures (DYCORS, Regis
+#   and Shoemaker), plus a few uniform candidates;
+# - infill: for the RBF, a weighted score of the predicted value and of
+#   the distance to the evaluated points (the weight cycles within a batch
+#   from exploration to exploitation); for the GP, the expected
+#   improvement, with the batch filled by the "kriging believer"
+#   (each selected candidate is added with its predicted value);
+# - constraints: known constraint functions (cheap, like g1 to g6) screen
+#   the candidates before they are scored; otherwise the total violation
+#   is modelled by a second surrogate.
+# After every batch the new points are added to the surrogates: the GP
+# appends them to its Cholesky factor and refits its hyperparameters every
+# few batches, and the RBF interpolant (a few hundred points) is refitted
+# in milliseconds.
+#
+# `SurrogateOptimizer` follows the ask/tell protocol of ask_tell.py, so
+# any evaluator can serve as the true backend (e.g. a SerialEvaluator
+# around a remote model queried point by point).
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.linalg import cho_solve, solve_triangular
+from scipy.optimize import minimize
+from scipy.spatial.distance import cdist
+from scipy.stats import norm, qmc
+
+
+# Surrogate Models ----
+class RBFModel:
+    """
+    Cubic RBF interpolant with a linear tail. `smoothing` > 0 trades the
+    interpolation of the data for a smoother model (for noisy backends).
+    """
+
+    def __init__(self, smoothing=0.0):
+        self.smoothing = smoothing
+        self.U, self.y = None, None
+        self.interpolant = None
+
+    def fit(self, U, y):
+        self.U, self.y = np.array(U, dtype=float), np.array(y, dtype=float)
+        self.refit()
+
+    def add(self, U, y):
+        self.fit(np.vstack([self.U, U]), np.concatenate([self.y, y]))
+
+    def refit(self):
+        self.interpolant = RBFInterpolator(self.U, self.y, kernel="cubic", degree=1, smoothing=self.smoothing)
+
+    def predict(self, U):
+        """
+        Predicted values at U (and None: the RBF gives no uncertainty).
+        """
+        return self.interpolant(U), None
+
+
+def matern52(U, V, lengthscales):
+    r = np.sqrt(5) * cdist(U / lengthscales, V / lengthscales)
+    return (1 + r + r ** 2 / 3) * np.exp(-r)
+
+
+class GaussianProcessModel:
+    """
+    Gaussian process with a constant mean and an anisotropic Matern 5/2
+    kernel, on standardized values. The hyperparameters (log length
+    scales and log signal variance) maximize the marginal likelihood and
+    are refitted every `refit_every` calls of `add`; in between, new points
+    are appended to the Cholesky factor (O(n^2) per point).
+    """
+
+    def __init__(self, nugget=1e-6, refit_every=5):
+        self.nugget = nugget
+        self.refit_every = refit_every
+        self.log_lengthscales, self.log_variance = None, 0.0
+        self.additions = 0
+
+    def fit(self, U, y):
+        self.U, self.y = np.array(U, dtype=float), np.array(y, dtype=float)
+        self.mean, self.scale = np.mean(self.y), np.std(self.y) or 1.0
+        if self.log_lengthscales is None:
+            self.log_lengthscales = np.full(self.U.shape[1], np.log(0.5))
+        self.fit_hyperparameters()
+        self.factorize()
+
+    def covariance(self, U, V):
+        return np.exp(self.log_variance) * matern52(U, V, np.exp(self.log_lengthscales))
+
+    def negative_log_likelihood(self, theta, z):
+        lengthscales, variance = np.exp(theta[:-1]), np.exp(theta[-1])
+        K = variance * matern52(self.U, self.U, lengthscales) + self.nugget * np.eye(len(self.U))
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return 1e10
+        alpha = cho_solve((L, True), z)
+        return 0.5 * z @ alpha + np.sum(np.log(np.diag(L)))
+
+    def fit_hyperparameters(self):
+        z = (self.y - self.mean) / self.scale
+        theta = np.append(self.log_lengthscales, self.log_variance)
+        bounds = [(np.log(1e-2), np.log(1e2))] * len(self.log_lengthscales) + [(np.log(1e-2), np.log(1e2))]
+        result = minimize(self.negative_log_likelihood, theta, args=(z,), method="L-BFGS-B", bounds=bounds,
+                          options={"maxiter": 50})
+        self.log_lengthscales, self.log_variance = result.x[:-1], result.x[-1]
+
+    def factorize(self):
+        K = self.covariance(self.U, self.U) + self.nugget * np.eye(len(self.U))
+        self.L = np.linalg.cholesky(K)
+        self.alpha = cho_solve((self.L, True), (self.y - self.mean) / self.scale)
+
+    def add(self, U, y):
+        """
+        Add points without refitting the hyperparameters (except every
+        `refit_every` calls): the Cholesky factor is extended with the new
+        rows, and the mean and scale of the data are kept.
+        """
+        U, y = np.atleast_2d(U), np.atleast_1d(y)
+        self.additions += 1
+        if self.additions % self.refit_every == 0:
+            self.fit(np.vstack([self.U, U]), np.concatenate([self.y, y]))
+            return
+        K_new = self.covariance(self.U, U)
+        L_12 = solve_triangular(self.L, K_new, lower=True)
+        L_22 = np.linalg.cholesky(self.covariance(U, U) + self.nugget * np.eye(len(U)) - L_12.T @ L_12)
+        n, m = len(self.U), len(U)
+        L = np.zeros((n + m, n + m))
+        L[:n, :n], L[n:, :n], L[n:, n:] = self.L, L_12.T, L_22
+        self.L, self.U, self.y = L, np.vstack([self.U, U]), np.concatenate([self.y, y])
+        self.alpha = cho_solve((self.L, True), (self.y - self.mean) / self.scale)
+
+    def copy(self):
+        model = GaussianProcessModel(self.nugget, refit_every=np.inf)
+        model.__dict__.update({key: value for key, value in self.__dict__.items() if key != "refit_every"})
+        return model
+
+    def predict(self, U):
+        """
+        Predicted means and standard deviations at U.
+        """
+        K = self.covariance(U, self.U)
+        mean = K @ self.alpha
+        v = solve_triangular(self.L, K.T, lower=True)
+        variance = np.maximum(np.exp(self.log_variance) - np.sum(v ** 2, axis=0), 1e-12)
+        return self.mean + self.scale * mean, self.scale * np.sqrt(variance)
+
+
+def expected_improvement(mean, std, best):
+    z = (best - mean) / std
+    return (best - mean) * norm.cdf(z) + std * norm.pdf(z)
+
+
+# Surrogate-Assisted Optimizer ----
+class SurrogateOptimizer:
+    """
+    Surrogate-assisted optimizer with the ask/tell interface of
+    ask_tell.py: `ask` returns the initial design, then batches of
+    `batch_size` candidates selected on the surrogate.
+
+    model: "rbf" or "gp"
+    constraint_values(X): the constraint values of the candidates (one
+        row per candidate, satisfied when g >= 0), if they are cheap to
+        compute; otherwise the total violation is modelled
+    repair(X): if given, moves the candidates onto the linear constraints
+        (e.g. CMAES.repair)
+    budget: expected number of true evaluations, which sets the decrease
+        of the share of perturbed coordinates (DYCORS)
+    """
+
+    def __init__(self, lower, upper, x0=None, model="rbf", batch_size=5, initial_points=None,
+                 constraint_values=None, repair=None, budget=500, number_of_candidates=None,
+                 initial_step=0.2, min_step=0.2 * 0.5 ** 6, rng=None):
+        self.lower, self.upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+        self.dimension = len(self.lower)
+        self.x0 = x0
+        self.model_name = model
+        self.batch_size = batch_size
+        self.initial_points = initial_points or 2 * (self.dimension + 1)
+        self.constraint_values = constraint_values
+        self.repair = repair
+        self.budget = budget
+        self.number_of_candidates = number_of_candidates or min(100 * self.dimension, 5000)
+        self.step, self.min_step, self.max_step = initial_step, min_step, initial_step
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # Step adaptation (DYCORS): success and failure counts over batches
+        self.success_tolerance = 3
+        self.failure_tolerance = int(np.ceil(max(5, self.dimension) / batch_size))
+        self.successes = self.failures = 0
+
+        # Evaluated points (scaled to [0, 1]^d) and their scores
+        self.U = np.empty((0, self.dimension))
+        self.f, self.violation = np.empty(0), np.empty(0)
+        self.objective_model = self.violation_model = None
+        self.asked = None
+        self.converged = False
+
+    # Scaling ----
+    def to_unit(self, X):
+        return (X - self.lower) / (self.upper - self.lower)
+
+    def from_unit(self, U):
+        return self.lower + np.clip(U, 0, 1) * (self.upper - self.lower)
+
+    def prepare(self, U):
+        """
+        Repaired candidates and their known violations (None if the
+        constraints are not known).
+        """
+        X = self.from_unit(U)
+        if self.repair is not None:
+            X = self.repair(X)
+        if self.constraint_values is None:
+            return X, None
+        return X, np.maximum(0.0, -np.atleast_2d(self.constraint_values(X))).sum(axis=1)
+
+    def screen(self, X, violation, predicted_violation=None):
+        """
+        Candidates that satisfy the known constraints, or the surrogate of
+        the violation; the least violated ones if none does.
+        """
+        if violation is None and predicted_violation is None:
+            return X
+        violation = violation if violation is not None else np.maximum(predicted_violation, 0.0)
+        return X[violation <= max(np.min(violation), 0.0)]
+
+    # Initial Design ----
+    def initial_design(self):
+        """
+        Latin hypercube, screened on the known constraints: a larger
+        hypercube is drawn, and the points are picked greedily, the least
+        violated first and then the farthest from the points picked so far.
+        """
+        oversampling = 1 if self.constraint_values is None else 20
+        U = qmc.LatinHypercube(d=self.dimension, seed=self.rng).random(oversampling * self.initial_points)
+        X, violation = self.prepare(U)
+        if self.x0 is not None:
+            X0, violation0 = self.prepare(self.to_unit(np.atleast_2d(self.x0)))
+            X = np.vstack([X0, X])
+            violation = None if violation is None else np.concatenate([violation0, violation])
+        if violation is None:
+            return X[:self.initial_points]
+
+        chosen = []
+        distance = np.full(len(X), np.inf)
+        for _ in range(self.initial_points):
+            least = np.min(np.where(np.isin(np.arange(len(X)), chosen), np.inf, violation))
+            eligible = (violation <= least) & ~np.isin(np.arange(len(X)), chosen)
+            i = np.flatnonzero(eligible)[np.argmax(distance[eligible])]
+            chosen.append(i)
+            distance = np.minimum(distance, np.linalg.norm(self.to_unit(X) - self.to_unit(X[i]), axis=1))
+        return X[chosen]
+
+    # Candidates ----
+    def best(self):
+        """
+        Index of the best evaluated point (Deb's feasibility rules).
+        """
+        f = np.where(np.isfinite(self.f), self.f, np.inf)
+        return np.lexsort((f, self.violation))[0]
+
+    def candidates(self):
+        """
+        DYCORS candidates around the best point, in a random subset of
+        the coordinates whose expected size decreases with the number of
+        evaluations, plus 10% of uniform candidates.
+        """
+        n = self.number_of_candidates
+        used = max(len(self.f) - self.initial_points, 0)
+        remaining = max(self.budget - self.initial_points, 2)
+        probability = min(20 / self.dimension, 1) * (1 - np.log(used + 1) / np.log(remaining))
+        probability = max(probability, 1 / self.dimension)
+
+        u_best = self.U[self.best()]
+        mask = self.rng.random((n, self.dimension)) < probability
+        # At least one perturbed coordinate per candidate
+        mask[np.arange(n), self.rng.integers(self.dimension, size=n)] = True
+        U = u_best + mask * self.step * self.rng.standard_normal((n, self.dimension))
+        U = np.clip(U, 0, 1)
+        uniform = self.rng.random((n // 10, self.dimension))
+        return np.vstack([U, uniform])
+
+    # Infill ----
+    def select(self, X):
+        """
+        The batch chosen among the candidates X by the infill criterion.
+        """
+        U = self.to_unit(X)
+        if self.model_name == "gp":
+            return self.select_expected_improvement(X, U)
+
+        # RBF: weighted score of the predicted value and of the distance
+        # to the evaluated (and already selected) points, both scaled to
+        # [0, 1]; the weights go from exploration to exploitation
+        predicted, _ = self.objective_model.predict(U)
+        distance = cdist(U, self.U).min(axis=1)
+        weights = [0.3, 0.5, 0.8, 0.95]
+        batch = []
+        for k in range(min(self.batch_size, len(X))):
+            w = weights[k % len(weights)]
+            available = np.ones(len(X), dtype=bool)
+            available[batch] = False
+            scaled_f = (predicted - predicted[available].min()) / (np.ptp(predicted[available]) or 1.0)
+            scaled_distance = (distance.max() - distance) / (np.ptp(distance[available]) or 1.0)
+            score = np.where(available & (distance > 1e-9), w * scaled_f + (1 - w) * scaled_distance, np.inf)
+            if not np.isfinite(np.min(score)):
+                break
+            i = np.argmin(score)
+            batch.append(i)
+            distance = np.minimum(distance, np.linalg.norm(U - U[i], axis=1))
+        return X[batch]
+
+    def select_expected_improvement(self, X, U):
+        """
+        Expected improvement over the best feasible value, with the batch
+        filled by the kriging believer.
+        """
+        model = self.objective_model.copy()
+        best = self.f[self.best()]
+        batch = []
+        for _ in range(min(self.batch_size, len(X))):
+            mean, std = model.predict(U)
+            ei = expected_improvement(mean, std, best)
+            ei[batch] = -np.inf
+            i = np.argmax(ei)
+            batch.append(i)
+            model.add(U[i:i + 1], mean[i:i + 1])
+        return X[batch]
+
+    # Ask/Tell ----
+    def propose(self, U):
+        """
+        The batch selected among the candidates U (in [0, 1]^d).
+        """
+        X, violation = self.prepare(U)
+        predicted_violation = None
+        if violation is None:
+            predicted_violation, _ = self.violation_model.predict(self.to_unit(X))
+        return self.select(self.screen(X, violation, predicted_violation))
+
+    def ask(self):
+        if len(self.f) == 0:
+            self.asked = self.initial_design()
+            return self.asked
+        self.asked = self.propose(self.candidates())
+        if not len(self.asked):
+            # Every candidate is an evaluated point (the step has collapsed
+            # onto the best point, or the repair maps the candidates onto
+            # it): fall back to uniform candidates, and stop if even these
+            # are all evaluated
+            self.asked = self.propose(self.rng.random((self.number_of_candidates, self.dimension)))
+            self.converged = not len(self.asked)
+        return self.asked
+
+    def tell(self, f, violation):
+        f, violation = np.asarray(f, dtype=float), np.asarray(violation, dtype=float)
+        previous = (self.violation[self.best()], self.f[self.best()]) if len(self.f) else (np.inf, np.inf)
+        U = self.to_unit(self.asked)
+        self.U = np.vstack([self.U, U])
+        self.f, self.violation = np.concatenate([self.f, f]), np.concatenate([self.violation, violation])
+
+        # Surrogates of the objective function (on the points where it is
+        # defined) and, if the constraints are not known, of the violation
+        Model = GaussianProcessModel if self.model_name == "gp" else RBFModel
+        defined = np.isfinite(self.f)
+        if self.objective_model is None or not np.all(np.isfinite(f)):
+            self.objective_model = Model()
+            self.objective_model.fit(self.U[defined], self.f[defined])
+        else:
+            self.objective_model.add(U, f)
+        if self.constraint_values is None:
+            if self.violation_model is None:
+                self.violation_model = RBFModel()
+                self.violation_model.fit(self.U, self.violation)
+            else:
+                self.violation_model.add(U, violation)
+
+        # Step adaptation: a batch succeeds if it improves the best point
+        current = (self.violation[self.best()], self.f[self.best()])
+        if previous != (np.inf, np.inf):
+            if current[0] < previous[0] or current[1] < previous[1] - 1e-3 * abs(previous[1]):
+                self.successes, self.failures = self.successes + 1, 0
+            else:
+                self.successes, self.failures = 0, self.failures + 1
+            if self.successes >= self.success_tolerance:
+                self.step, self.successes = min(2 * self.step, self.max_step), 0
+            if self.failures >= self.failure_tolerance:
+                self.step, self.failures = self.step / 2, 0
+                self.converged = self.step < self.min_step
+
+    def inject(self, x, f, violation):
+        self.asked = np.atleast_2d(x)
+        self.tell(np.atleast_1d(f), np.atleast_1d(violation))
+
+    def stop(self):
+        return self.converged
+
+
+# Example: a Few Hundred True Evaluations ----
+if __name__ == "__main__":
+    import time
+
+    from ask_tell import BatchEvaluator, ParticleSwarm, run
+    from CMAES import CMAES, constraints, evaluate_population, ip, lb, objective_function, repair, ub
+    from CMAES import target_objective_value
+    from solution_archive import SolutionArchive
+
+    max_evaluations = 300  # True evaluations (the nlopt-based algorithms use 10^5)
+    number_of_seeds = 5
+
+    def constraint_values(X):
+        return np.array([g(X.T) for g in constraints]).T
+
+    def make_optimizer(name, seed):
+        rng = np.random.default_rng(seed)
+        if name in ("RBF", "GP"):
+            return SurrogateOptimizer(lb, ub, x0=ip, model=name.lower(), constraint_values=constraint_values,
+                                      repair=repair, budget=max_evaluations, rng=rng)
+        if name == "CMA-ES":
+            return CMAES(ip, 0.3, lb, ub, rng=rng)
+        return ParticleSwarm(lb, ub, swarm_size=20, repair=repair, rng=rng)
+
+    archive = SolutionArchive()
+    key = archive.configure(objective_function, constraints, lb, ub)
+    print(f"Target: {target_objective_value}, {max_evaluations} true evaluations per run")
+    for name in ["RBF", "GP", "CMA-ES", "PSO"]:
+        start_time = time.perf_counter()
+        incumbents = [run(make_optimizer(name, seed), BatchEvaluator(evaluate_population), max_evaluations)
+                      for seed in range(number_of_seeds)]
+        f = np.array([incumbent.f if incumbent.violation <= 0 else np.inf for incumbent in incumbents])
+        print(f"{name}: best {f.min():.6f}, median {np.median(f):.6f}, target reached in "
+              f"{np.sum(f <= target_objective_value)}/{number_of_seeds} runs, "
+              f"{(time.perf_counter() - start_time) / number_of_seeds:.2f} seconds per run")
+        for incumbent in incumbents:
+            if incumbent.violation <= 0:
+                archive.add(key, incumbent.x, incumbent.f, source=f"surrogate.py ({name})")
+    archive.save()
@@ -0,0 +1,245 @@
+# **********************************************************************
+# Telemetry of Long-Running Optimizations ----
+#
+# Purpose ----
+# Watch a running optimizer (throughput, incumbent, stalled runs) without
+# a debugger or `debug=True` console output. The optimizer reports every
+# evaluation, or every batch, with `observe`, which only updates a few
+# counters. A background thread turns them every `interval` seconds into
+# metrics:
+# - evaluations per second and feasibility rate over the last interval;
+# - total evaluations and feasible evaluations;
+# - incumbent: best feasible f (or the lowest violation while no
+#   evaluation is feasible) and seconds since it last improved;
+# - generation (reported by the optimizer, or evaluations divided by the
+#   population size);
+# - resident memory of the process.
+# The metrics are served in the Prometheus text format on a local HTTP
+# endpoint (http://127.0.0.1:<port>/metrics) and appended as one JSON
+# object per line to a file. Only the Python standard library is used.
+# **********************************************************************
+
+# Imports ----
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Metrics: name, Prometheus type and help text
+metrics = [
+    ("evaluations_total", "counter", "Objective function evaluations"),
+    ("feasible_evaluations_total", "counter", "Evaluations of feasible points"),
+    ("evaluations_per_second", "gauge", "Evaluations per second over the last interval"),
+    ("feasibility_rate", "gauge", "Share of feasible evaluations over the last interval"),
+    ("incumbent_objective", "gauge", "Objective function value of the best feasible point (NaN if none)"),
+    ("incumbent_violation", "gauge", "Constraint violation of the incumbent"),
+    ("seconds_since_improvement", "gauge", "Seconds since the incumbent last improved"),
+    ("generation", "gauge", "Generation (or iteration) of the optimizer"),
+    ("resident_memory_bytes", "gauge", "Resident memory of the process"),
+    ("uptime_seconds", "gauge", "Seconds since the telemetry started"),
+]
+
+
+def resident_memory():
+    """
+    Current resident memory in bytes (peak resident memory where /proc is
+    not available).
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return float("nan")
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def prometheus_value(value):
+    value = float(value)
+    if np.isnan(value):
+        return "NaN"
+    if np.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+# Telemetry ----
+class Telemetry:
+    """
+    Metrics of a running optimization, served over HTTP (`port`, 0 for any
+    free port) and/or written to a JSON-lines file (`path`).
+
+        telemetry = Telemetry("PSO.py", port=9100, path="PSO-telemetry.jsonl")
+        with telemetry:
+            ...
+            telemetry.observe(f, violation)  # In the objective function
+
+    A violation up to `tolerance` counts as feasible.
+    """
+
+    def __init__(self, algorithm, port=None, path=None, interval=5.0, population_size=None, tolerance=0.0,
+                 host="127.0.0.1"):
+        self.algorithm = algorithm
+        self.port, self.path, self.host = port, path, host
+        self.interval = interval
+        self.population_size = population_size
+        self.tolerance = tolerance
+
+        # Counters updated by the optimizer
+        self.evaluations = 0
+        self.feasible_evaluations = 0
+        self.incumbent = (np.inf, np.inf)  # (violation, f), compared by Deb's rules
+        self.improvement_time = None
+        self.generation = None
+
+        # Metrics computed by the background thread
+        self.start_time = time.time()
+        self.previous = (self.start_time, 0, 0)  # Time, evaluations, feasible evaluations
+        self.rates = (0.0, float("nan"))
+        self.server = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    # Updates by the optimizer (cheap) ----
+    def observe(self, f, violation):
+        """
+        Report one evaluation, or a batch (arrays f and violation).
+        """
+        if np.ndim(f):
+            f, violation = np.asarray(f, dtype=float), np.asarray(violation, dtype=float)
+            self.evaluations += len(f)
+            feasible = violation <= self.tolerance
+            self.feasible_evaluations += int(np.count_nonzero(feasible))
+            if np.any(feasible):
+                k = np.flatnonzero(feasible)[np.argmin(f[feasible])]
+            else:
+                k = np.argmin(violation)
+            f, violation = f[k], violation[k]
+        else:
+            self.evaluations += 1
+            if violation <= self.tolerance:
+                self.feasible_evaluations += 1
+        candidate = (0.0 if violation <= self.tolerance else float(violation), float(f))
+        if np.isfinite(candidate[1]) and candidate < self.incumbent:
+            self.incumbent = candidate
+            self.improvement_time = time.time()
+
+    def set_generation(self, generation):
+        self.generation = generation
+
+    # Metrics ----
+    def snapshot(self):
+        now = time.time()
+        violation, f = self.incumbent
+        if self.generation is not None:
+            generation = self.generation
+        elif self.population_size:
+            generation = self.evaluations // self.population_size
+        else:
+            generation = float("nan")
+        return {
+            "timestamp": now,
+            "algorithm": self.algorithm,
+            "evaluations_total": self.evaluations,
+            "feasible_evaluations_total": self.feasible_evaluations,
+            "evaluations_per_second": self.rates[0],
+            "feasibility_rate": self.rates[1],
+            "incumbent_objective": f if violation == 0 else float("nan"),
+            "incumbent_violation": violation if np.isfinite(violation) else float("nan"),
+            "seconds_since_improvement": now - (self.improvement_time or self.start_time),
+            "generation": generation,
+            "resident_memory_bytes": resident_memory(),
+            "uptime_seconds": now - self.start_time,
+        }
+
+    def prometheus(self):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        labels = f'{{algorithm="{self.algorithm}"}}'
+        lines = []
+        for name, kind, description in metrics:
+            lines.append(f"# HELP optimizer_{name} {description}")
+            lines.append(f"# TYPE optimizer_{name} {kind}")
+            lines.append(f"optimizer_{name}{labels} {prometheus_value(snapshot[name])}")
+        return "\n".join(lines) + "\n"
+
+    def update_rates(self):
+        now = time.time()
+        previous_time, previous_evaluations, previous_feasible = self.previous
+        evaluations, feasible = self.evaluations, self.feasible_evaluations
+        elapsed = max(now - previous_time, 1e-9)
+        new = evaluations - previous_evaluations
+        self.rates = (new / elapsed, (feasible - previous_feasible) / new if new else float("nan"))
+        self.previous = (now, evaluations, feasible)
+
+    def write(self):
+        if self.path is not None:
+            # NaN and infinity are not valid JSON: they are written as null
+            snapshot = {name: None if isinstance(value, float) and not np.isfinite(value) else value
+                        for name, value in self.snapshot().items()}
+            with open(self.path, "a") as file:
+                file.write(json.dumps(snapshot) + "\n")
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.update_rates()
+            self.write()
+
+    # Start and Stop ----
+    def start(self):
+        if self.port is not None:
+            telemetry = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") not in ("", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = telemetry.prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *arguments):
+                    pass  # No console output per request
+
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.port = self.server.server_address[1]
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            print(f"Telemetry: http://{self.host}:{self.port}/metrics")
+        self.start_time = time.time()
+        self.previous = (self.start_time, self.evaluations, self.feasible_evaluations)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Write the final metrics and stop the HTTP server.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.update_rates()
+        self.write()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exception):
+        self.stop()
@@ -0,0 +1,333 @@
+# **********************************************************************
+# Hyperparameter Tuning with Iterated Racing ----
+#
+# Purpose ----
+# Tune the hyperparameters of GA.py (population size, crossover and
+# mutation probabilities), PSO.py (swarm size, omega, phip, phig) and
+# BH.py (temperature T and step size), which were set by hand, for the
+# fewest evaluations to reach a target objective function value.
+#
+# Iterated racing (as in irace):
+# 1. Sample candidate configurations: uniformly in the first iteration
+#    (plus the current defaults), then around the elite configurations of
+#    the previous iteration, with a spread that shrinks every iteration.
+# 2. Race them: every round, the configurations still in the race are run
+#    on one more instance (seed) in parallel; after `first_test`
+#    instances, a Friedman test on the ranks of the costs, followed by
+#    pairwise comparisons of the rank sums (Conover), drops the
+#    configurations that are statistically worse than the best one.
+# 3. The survivors become the elites of the next iteration; their costs on
+#    the instances already run are reused.
+# The cost of a run is the number of evaluations until a feasible point
+# reaches the target, or `penalty_factor` times the budget plus the
+# relative gap to the target if the run does not reach it (PAR-style).
+#
+# The runs are those of the scripts themselves, built by the functions
+# they export (GA.make_toolbox, PSO.make_penalized_objective,
+# BH.make_constrained_objective and BH.basin_hopping), so the tuned values
+# apply to the same initialization and constraint handling. The winning
+# configurations are written to tuned-configurations.json, which GA.py,
+# PSO.py and BH.py read when it exists.
+# **********************************************************************
+
+# Imports ----
+import argparse
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.stats import chi2, rankdata, t as student_t
+
+# Tuning Settings ----
+tuned_configurations_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuned-configurations.json")
+target_objective_value = -3515.885829  # As in CMAES.py
+evaluation_budget = 20000  # Evaluations per run
+penalty_factor = 2  # Cost of a run that does not reach the target, in budgets
+number_of_iterations = 3
+configurations_per_iteration = 16  # New configurations sampled per iteration
+instances_per_race = 16  # Seeds
+first_test = 5  # Instances before the first statistical test
+confidence_level = 0.95
+min_survivors = 2  # The race stops when this many configurations are left
+max_elites = 4  # Survivors kept as elites for the next iteration
+max_runs = 500  # Runs per algorithm (all iterations)
+number_of_processes = os.cpu_count() or 1
+random_seed = 42
+
+# Hyperparameter Spaces ----
+# name: (type, lower, upper, log scale)
+spaces = {
+    "GA": {
+        "population_size": ("int", 10, 400, True),
+        "crossover_probability": ("float", 0.1, 1.0, False),
+        "mutation_probability": ("float", 0.0, 0.8, False),
+    },
+    "PSO": {
+        "swarm_size": ("int", 10, 400, True),
+        "omega": ("float", 0.1, 1.0, False),
+        "phip": ("float", 0.1, 3.0, False),
+        "phig": ("float", 0.1, 3.0, False),
+    },
+    "BH": {
+        "T": ("float", 0.01, 1000.0, True),
+        "stepsize": ("float", 0.01, 100.0, True),
+    },
+}
+
+# Hand-set values of the scripts
+defaults = {
+    "GA": {"population_size": 50, "crossover_probability": 0.7, "mutation_probability": 0.2},
+    "PSO": {"swarm_size": 100, "omega": 0.5, "phip": 0.5, "phig": 0.5},
+    "BH": {"T": 1.0, "stepsize": 0.5},
+}
+
+
+# Tuned Configurations ----
+def load_tuned_configuration(algorithm):
+    """
+    The tuned hyperparameters of `algorithm` ({} if tuning.py was not run),
+    for the scripts to use instead of their hand-set values.
+    """
+    if not os.path.exists(tuned_configurations_file):
+        return {}
+    with open(tuned_configurations_file) as file:
+        return json.load(file).get(algorithm, {}).get("configuration", {})
+
+
+# Runs ----
+class RunMonitor:
+    """
+    Count the evaluations of a run and keep its best point by Deb's
+    feasibility rules; stop the run (StopOptimization, raised inside the
+    library's call of the objective function) once a feasible point
+    reaches the target or the budget is spent. It is passed to the
+    scripts' PenalizedObjective in place of a telemetry object.
+    """
+
+    def __init__(self):
+        self.evaluations = 0
+        self.f, self.violation = np.inf, np.inf
+
+    def observe(self, f, violation):
+        from ask_tell import StopOptimization
+
+        self.evaluations += 1
+        if np.isfinite(f) and (violation, f) < (self.violation, self.f):
+            self.f, self.violation = f, violation
+        if (self.violation <= 0 and self.f <= target_objective_value) or self.evaluations >= evaluation_budget:
+            raise StopOptimization
+
+
+def run_script(algorithm, configuration, seed, monitor):
+    """
+    One run of GA.py, PSO.py or BH.py with the given hyperparameters,
+    reporting every evaluation to `monitor`.
+    """
+    from ask_tell import StopOptimization
+
+    rng = np.random.default_rng(seed)
+    try:
+        if algorithm == "GA":
+            from deap import algorithms
+            from GA import make_toolbox, objective
+
+            def evaluate(individual):
+                violation, f = objective(individual)
+                monitor.observe(f, violation)
+                return violation, f
+
+            random.seed(seed)
+            toolbox = make_toolbox(evaluate)
+            population = toolbox.population(n=configuration["population_size"])
+            algorithms.eaSimple(population, toolbox, cxpb=configuration["crossover_probability"],
+                                mutpb=configuration["mutation_probability"], ngen=evaluation_budget, verbose=False)
+        elif algorithm == "PSO":
+            from pyswarm import pso
+            from PSO import lb, make_penalized_objective, ub
+
+            np.random.seed(seed)  # pyswarm draws from numpy's global generator
+            pso(make_penalized_objective(configuration["swarm_size"], telemetry=monitor, rng=rng), lb, ub,
+                maxiter=evaluation_budget, swarmsize=configuration["swarm_size"], omega=configuration["omega"],
+                phip=configuration["phip"], phig=configuration["phig"])
+        elif algorithm == "BH":
+            from BH import basin_hopping, make_constrained_objective
+
+            basin_hopping(make_constrained_objective(telemetry=monitor, rng=rng), configuration["T"],
+                          configuration["stepsize"], niter=evaluation_budget, seed=seed)
+        else:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+    except StopOptimization:
+        pass
+
+
+def run_configuration(arguments):
+    """
+    Cost of one run: evaluations until a feasible point reaches the
+    target, or a penalty if the budget runs out first.
+    """
+    algorithm, configuration, seed = arguments
+    monitor = RunMonitor()
+    run_script(algorithm, configuration, seed, monitor)
+    if monitor.violation <= 0 and monitor.f <= target_objective_value:
+        return float(monitor.evaluations)
+    gap = (monitor.f - target_objective_value) / abs(target_objective_value) if monitor.violation <= 0 else 1.0
+    return float(evaluation_budget * (penalty_factor + min(gap, 1.0)))
+
+
+# Sampling ----
+def to_unit(space, configuration):
+    """
+    Configuration as a point of [0, 1]^d (log scale where specified).
+    """
+    u = []
+    for name, (_, low, high, log) in space.items():
+        value = configuration[name]
+        u.append((np.log(value) - np.log(low)) / (np.log(high) - np.log(low)) if log else (value - low) / (high - low))
+    return np.array(u)
+
+
+def from_unit(space, u):
+    configuration = {}
+    for (name, (kind, low, high, log)), ui in zip(space.items(), np.clip(u, 0, 1)):
+        value = np.exp(np.log(low) + ui * (np.log(high) - np.log(low))) if log else low + ui * (high - low)
+        configuration[name] = int(round(value)) if kind == "int" else float(value)
+    return configuration
+
+
+def sample_configurations(rng, space, elites, iteration, size):
+    """
+    Uniform sample in the first iteration; later, normal perturbations of
+    elites chosen with weights decreasing with their rank.
+    """
+    if not elites:
+        return [from_unit(space, rng.random(len(space))) for _ in range(size)]
+    # The spread shrinks geometrically with the iterations, as in irace
+    spread = 0.5 * (1 / size) ** (iteration / len(space))
+    weights = np.arange(len(elites), 0, -1, dtype=float)
+    parents = rng.choice(len(elites), size=size, p=weights / weights.sum())
+    return [from_unit(space, to_unit(space, elites[k]) + spread * rng.standard_normal(len(space)))
+            for k in parents]
+
+
+# Racing ----
+def eliminate(costs, alive):
+    """
+    Configurations that survive the Friedman test and the Conover
+    pairwise comparisons with the best one. costs: instances x alive.
+    """
+    b, k = costs.shape
+    if k < 2:
+        return alive
+    ranks = np.apply_along_axis(rankdata, 1, costs)
+    R = ranks.sum(axis=0)
+    A = np.sum(ranks ** 2)
+    C = b * k * (k + 1) ** 2 / 4
+    if A - C <= 1e-12:
+        return alive  # All the configurations tie on every instance
+    T = (k - 1) * (np.sum(R ** 2) - b * C) / (A - C)
+    if chi2.sf(T, k - 1) >= 1 - confidence_level:
+        return alive
+    threshold = student_t.ppf(1 - (1 - confidence_level) / 2, (b - 1) * (k - 1)) * np.sqrt(
+        2 * (b * A - np.sum(R ** 2)) / ((b - 1) * (k - 1)))
+    return [c for c, r in zip(alive, R) if r - R.min() <= threshold]
+
+
+def race(pool, algorithm, configurations, results, runs):
+    """
+    Race the configurations over the instances; `results` caches the cost
+    of every (configuration, instance). Returns the survivors, best first,
+    and the number of runs done.
+    """
+    keys = [json.dumps(configuration, sort_keys=True) for configuration in configurations]
+    alive = list(range(len(configurations)))
+    for instance in range(instances_per_race):
+        pending = [c for c in alive if (keys[c], instance) not in results]
+        if runs + len(pending) > max_runs:
+            break
+        costs = pool.map(run_configuration, [(algorithm, configurations[c], random_seed + instance) for c in pending])
+        for c, cost in zip(pending, costs):
+            results[keys[c], instance] = cost
+        runs += len(pending)
+
+        if instance + 1 >= first_test:
+            matrix = np.array([[results[keys[c], i] for c in alive] for i in range(instance + 1)])
+            alive = eliminate(matrix, alive)
+        if len(alive) <= min_survivors:
+            break
+
+    # Survivors by mean rank on the instances that all of them have run
+    played = [i for i in range(instances_per_race) if all((keys[c], i) in results for c in alive)]
+    if not played:
+        return alive, runs
+    matrix = np.array([[results[keys[c], i] for c in alive] for i in played])
+    order = np.argsort(np.apply_along_axis(rankdata, 1, matrix).mean(axis=0), kind="stable")
+    return [alive[i] for i in order], runs
+
+
+def tune(pool, algorithm, rng):
+    space = spaces[algorithm]
+    results, elites, runs = {}, [], 0
+    for iteration in range(number_of_iterations):
+        # As many new configurations as the remaining runs allow to race up to the first test
+        size = min(configurations_per_iteration, (max_runs - runs) // first_test - len(elites) - (iteration == 0))
+        if size < 1:
+            break
+        new = sample_configurations(rng, space, elites, iteration, size)
+        configurations = elites + ([defaults[algorithm]] if iteration == 0 else []) + new
+        survivors, runs = race(pool, algorithm, configurations, results, runs)
+        elites = [configurations[c] for c in survivors[:max_elites]]
+        print(f"{algorithm}, iteration {iteration + 1}: {len(configurations)} configurations raced, "
+              f"{len(elites)} survivors, {runs} runs so far")
+        if runs >= max_runs:
+            break
+
+    def summary(configuration):
+        costs = [cost for (key, _), cost in results.items() if key == json.dumps(configuration, sort_keys=True)]
+        reached = [cost for cost in costs if cost <= evaluation_budget]
+        return {"instances": len(costs), "mean cost": float(np.mean(costs)),
+                "success rate": len(reached) / len(costs),
+                "median evaluations to target": float(np.median(reached)) if reached else None}
+
+    return elites[0], summary(elites[0]), summary(defaults[algorithm]), runs
+
+
+# Perform the Tuning ----
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Iterated racing of the hyperparameters of GA, PSO and BH")
+    parser.add_argument("--algorithms", nargs="+", default=list(spaces), choices=list(spaces))
+    parser.add_argument("--processes", type=int, default=number_of_processes)
+    arguments = parser.parse_args()
+
+    rng = np.random.default_rng(random_seed)
+    tuned = {}
+    if os.path.exists(tuned_configurations_file):
+        with open(tuned_configurations_file) as file:
+            tuned = json.load(file)
+
+    with Pool(arguments.processes) as pool:
+        for algorithm in arguments.algorithms:
+            start_time = time.perf_counter()
+            best, tuned_summary, default_summary, runs = tune(pool, algorithm, rng)
+            configuration = dict(best)
+            if algorithm == "GA":
+                # Same evaluation budget as the tuning runs, on average:
+                # eaSimple evaluates the initial population, then only the
+                # individuals changed by crossover or mutation, a fraction
+                # 1 - (1 - cxpb) (1 - mutpb) of the population per generation
+                changed = 1 - (1 - best["crossover_probability"]) * (1 - best["mutation_probability"])
+                evaluations_per_generation = changed * best["population_size"]
+                configuration["number_of_generations"] = max(1, int(
+                    (evaluation_budget - best["population_size"]) / evaluations_per_generation))
+            tuned[algorithm] = {"configuration": configuration, "target": target_objective_value,
+                                "evaluation budget": evaluation_budget, "tuned": tuned_summary,
+                                "default": default_summary, "runs": runs}
+            print(f"{algorithm}: {configuration} in {time.perf_counter() - start_time:.1f} seconds")
+            print(f"  Tuned: {tuned_summary}")
+            print(f"  Default: {default_summary}")
+
+    with open(tuned_configurations_file, "w") as file:
+        json.dump(tuned, file, indent=1)
+    print(f"Tuned configurations saved in {tuned_configurations_file}")
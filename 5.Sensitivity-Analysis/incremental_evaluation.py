@@ -0,0 +1,244 @@
+# **********************************************************************
+# Incremental (Delta) Evaluation ----
+#
+# Purpose ----
+# Evaluate the objective function and the constraints after a sparse
+# change of a base point (e.g. one variable in a sensitivity analysis, or
+# a few variables in an annealing or coordinate move) by recomputing only
+# the terms that depend on the changed variables. The contribution of
+# every term at the base point is cached.
+# **********************************************************************
+
+# Imports ----
+import numpy as np
+
+
+# Intermediate Quantities ----
+# The sine factors and the products that are shared by the objective
+# function and the constraints
+def sine_w(x, q): return np.sin((2 * np.pi) / x[2] * (x[3] - x[4]))
+
+
+def sine_s(x, q): return np.sin((2 * np.pi) / x[13] * (x[14] - x[15]))
+
+
+def water(x, q): return (x[1] * q["sine_w"] + x[5]) * x[6] * x[7]
+
+
+def energy(x, q): return x[8] * x[6] * x[9]
+
+
+def summer(x, q): return x[12] * q["sine_s"] + x[16]
+
+
+# Terms of the Objective Function ----
+def t1(x, q): return 0.2350747 * x[0] ** (-1.0)
+
+
+def t2(x, q): return 0.4804318 * (q["water"] ** 0.4) * q["energy"] ** 0.6
+
+
+def t3(x, q): return 0.2811869 * x[10]
+
+
+def t4(x, q): return - 0.9963252 * x[11]
+
+
+def t5(x, q): return - 0.1230044 * (q["summer"] - x[10])
+
+
+def t6(x, q): return 0.2777817 * x[17] ** (-1.0)
+
+
+def t7(x, q): return 1.1544897 * x[16] ** (-1.0)
+
+
+def t8(x, q): return 0.1500959 * x[18] ** (-1.0)
+
+
+def t9(x, q): return 0.1491099 * x[19] ** (-1.0)
+
+
+constant_term = 0.0004785
+
+
+# Constraint Functions ----
+def g1(x, q): return x[17] - x[0]
+
+
+def g2(x, q): return q["water"] - x[0]
+
+
+def g3(x, q): return q["energy"] - x[0]
+
+
+def g4(x, q): return np.abs(q["summer"] + x[10]) - 1000
+
+
+def g5(x, q): return x[0] - (x[18] + x[19])
+
+
+def g6(x, q): return x[11]
+
+
+def g8(x, q): return - x[17]
+
+
+# Dependency Graph ----
+# name: (function, indices of x it reads, intermediate quantities it reads)
+# Listed in evaluation order: a quantity comes before everything that reads it
+quantities = {
+    "sine_w": (sine_w, (2, 3, 4), ()),
+    "sine_s": (sine_s, (13, 14, 15), ()),
+    "water": (water, (1, 5, 6, 7), ("sine_w",)),
+    "energy": (energy, (6, 8, 9), ()),
+    "summer": (summer, (12, 16), ("sine_s",)),
+    "t1": (t1, (0,), ()),
+    "t2": (t2, (), ("water", "energy")),
+    "t3": (t3, (10,), ()),
+    "t4": (t4, (11,), ()),
+    "t5": (t5, (10,), ("summer",)),
+    "t6": (t6, (17,), ()),
+    "t7": (t7, (16,), ()),
+    "t8": (t8, (18,), ()),
+    "t9": (t9, (19,), ()),
+    "g1": (g1, (0, 17), ()),
+    "g2": (g2, (0,), ("water",)),
+    "g3": (g3, (0,), ("energy",)),
+    "g4": (g4, (10,), ("summer",)),
+    "g5": (g5, (0, 18, 19), ()),
+    "g6": (g6, (11,), ()),
+    "g8": (g8, (17,), ()),
+}
+terms = ["t1", "t2", "t3", "t4", "t5", "t6", "t7", "t8", "t9"]
+constraints = ["g1", "g2", "g3", "g4", "g5", "g6", "g8"]
+
+
+def affected_quantities(indices):
+    """
+    Names of the quantities that must be recomputed when the variables at
+    `indices` change, in evaluation order.
+    """
+    affected = []
+    for name, (_, x_indices, inputs) in quantities.items():
+        if set(x_indices) & set(indices) or set(inputs) & set(affected):
+            affected.append(name)
+    return affected
+
+
+# Evaluation Plans ----
+# For a set of changed indices, the quantities that the objective function
+# needs recomputed (intermediate quantities and terms) and those that the
+# constraints need (intermediate quantities and constraints), as
+# (name, function, is_term) steps in evaluation order. Every intermediate
+# quantity feeds at least one term.
+# Precomputed for every single index, built on first use for several.
+def evaluation_plans(indices):
+    affected = affected_quantities(indices)
+    objective_plan = tuple((name, quantities[name][0], name in terms)
+                           for name in affected if name not in constraints)
+    constraint_plan = tuple((name, quantities[name][0], False)
+                            for name in affected if name not in terms)
+    return objective_plan, constraint_plan
+
+
+plans = {(index,): evaluation_plans((index,)) for index in range(20)}
+
+
+# Incremental Evaluator ----
+class IncrementalEvaluator:
+    """
+    Cache every term and constraint at a base point and re-evaluate only
+    the ones that depend on the changed variables. Changes are given as
+    {index: new value}; a new value can also be an array of values, in
+    which case all of them are evaluated at once (a one-variable sweep).
+
+    The changes are written into the base point and the cache, evaluated
+    and then undone, so that no copy is made per call (an evaluator must
+    therefore not be shared between threads).
+    """
+
+    def __init__(self, x):
+        self.x = [float(value) for value in x]
+        self.base = list(self.x)  # Restores the changed entries of x
+        self.cache = {}
+        for name, (function, _, _) in quantities.items():
+            self.cache[name] = function(self.x, self.cache)
+        self.value = sum(self.cache[name] for name in terms) + constant_term
+        self.recomputed = 0  # Number of quantities recomputed so far
+
+    @staticmethod
+    def _plans(changes):
+        key = tuple(changes) if len(changes) == 1 else tuple(sorted(changes))
+        try:
+            return plans[key]
+        except KeyError:
+            plans[key] = evaluation_plans(key)
+            return plans[key]
+
+    def _evaluate(self, changes, plan):
+        """
+        Write the changes into the base point, recompute the quantities of
+        `plan` in place and return the change of the objective value and
+        the previous values of the recomputed quantities, which `_undo`
+        restores together with the base point.
+        """
+        x, cache = self.x, self.cache
+        for index, value in changes.items():
+            x[index] = value
+        delta = 0.0
+        saved = []
+        try:
+            for name, function, is_term in plan:
+                old = cache[name]
+                saved.append(old)
+                cache[name] = new = function(x, cache)
+                if is_term:
+                    delta = delta + (new - old)
+        except Exception:
+            # Leave the base point as it was (e.g. after a division by zero)
+            self._undo(changes, plan, saved)
+            raise
+        self.recomputed += len(plan)
+        return delta, saved
+
+    def _undo(self, changes, plan, saved):
+        x, cache = self.x, self.cache
+        for index in changes:
+            x[index] = self.base[index]
+        for (name, _, _), old in zip(plan, saved):
+            cache[name] = old
+
+    def objective(self, changes=None):
+        if not changes:
+            return self.value
+        plan = self._plans(changes)[0]
+        delta, saved = self._evaluate(changes, plan)
+        self._undo(changes, plan, saved)
+        return self.value + delta
+
+    def constraints(self, changes=None):
+        if not changes:
+            return [self.cache[name] for name in constraints]
+        plan = self._plans(changes)[1]
+        _, saved = self._evaluate(changes, plan)
+        values = [self.cache[name] for name in constraints]
+        self._undo(changes, plan, saved)
+        return values
+
+    def move(self, changes):
+        """
+        Make the changed point the new base point (a batch of base points
+        if a new value is an array). The objective value is summed again
+        from the cached terms rather than updated by differences, so that
+        rounding errors do not build up over many moves.
+        """
+        changes = {index: np.array(value, dtype=float) if np.ndim(value) else float(value)
+                   for index, value in changes.items()}
+        objective_plan, constraint_plan = self._plans(changes)
+        # Intermediate quantities appear in both plans; keep them once, in order
+        plan = tuple({step[0]: step for step in objective_plan + constraint_plan}.values())
+        self._evaluate(changes, plan)
+        for index, value in changes.items():
+            self.base[index] = value
+        self.value = sum(self.cache[name] for name in terms) + constant_term
@@ -0,0 +1,247 @@
+# **********************************************************************
+# Scenario Sweep with Warm-Started Re-Optimization ----
+#
+# Purpose ----
+# Re-solve the optimization problem over a grid of policy scenarios (e.g.
+# different upper bounds on the fees exp and mal, on tal or on qd) instead
+# of editing `upper_bounds` and rerunning from `init_point` each time.
+# Scenarios are solved in parallel, in waves of one scenario per process;
+# every solve is warm-started from the best known solution of the scenario
+# in the solution archive or, if there is none, from the optimum of the
+# nearest scenario solved so far, so that it only needs a single local search (SLSQP)
+# instead of a cold multi-start. Results are streamed into a table (CSV)
+# as they come in.
+# **********************************************************************
+
+# Imports ----
+import csv
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.optimize import minimize
+
+# The solution archive is shared with the optimizers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "4.Stochastic-Algorithms"))
+from solution_archive import SolutionArchive
+
+
+# Objective Function ----
+def objective_function(x):
+    """
+    The variables and parameters have been coded as follows:
+    x[0] = r
+    x[1] = amp_w
+    x[2] = t_w
+    x[3] = tp_w
+    x[4] = phase_w
+    x[5] = vert_w
+    x[6] = acre
+    x[7] = c_w
+    x[8] = qe
+    x[9] = ce
+    x[10] = qd
+    x[11] = qs
+    x[12] = amp_s
+    x[13] = t_s
+    x[14] = tp_s
+    x[15] = phase_s
+    x[16] = vert_s
+    x[17] = tal
+    x[18] = exp
+    x[19] = mal
+    """
+    return (
+        0.2350747 * x[0] ** (-1.0)
+        + 0.4804318 * (
+            (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+            (x[8] * x[6] * x[9]) ** 0.6
+        )
+        + 0.2811869 * x[10]
+        - 0.9963252 * x[11]
+        - 0.1230044 * ((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10])
+        + 0.2777817 * x[17] ** (-1.0)
+        + 1.1544897 * x[16] ** (-1.0)
+        + 0.1500959 * x[18] ** (-1.0)
+        + 0.1491099 * x[19] ** (-1.0)
+        + 0.0004785
+    )
+
+
+# Constraint Functions ----
+def g1(x): return x[17] - x[0]
+
+
+def g2(x): return ((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) - x[0]
+
+
+def g3(x): return (x[8] * x[6] * x[9]) - x[0]
+
+
+def g4(x): return np.abs((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) + x[10]) - 1000
+
+
+def g5(x): return x[0] - (x[18] + x[19])
+
+
+def g6(x): return x[11]
+
+
+def g7(x): return x[11] + x[10] - 1000  # Inactive (removed)
+
+
+def g8(x): return - x[17]
+
+
+def g9(x): return x[18] - x[19]  # Inactive (removed)
+
+
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py: a constraint is satisfied when
+# g(x) >= 0
+constraints = [g1, g2, g3, g4, g5, g6]
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
+lower_bounds = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+upper_bounds = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+init_point = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
+               52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
+               74.185, 222.395])
+variable_names = ["r", "amp_w", "t_w", "tp_w", "phase_w", "vert_w", "acre", "c_w", "qe", "ce",
+                  "qd", "qs", "amp_s", "t_s", "tp_s", "phase_s", "vert_s", "tal", "exp", "mal"]
+
+# Scenario Settings ----
+# Variable index: values of its upper bound. Every combination is a
+# scenario (10 x 10 x 10 = 1,000 scenarios); e.g. add 10: [...] for qd
+scenario_grid = {
+    18: np.linspace(1, 148.1, 10),  # exp
+    19: np.linspace(1, 444.52, 10),  # mal
+    17: np.geomspace(40, 7400.1, 10),  # tal
+}
+number_of_processes = os.cpu_count() or 1
+number_of_cold_starts = 5  # SLSQP starts (init_point + random) of a cold solve
+cold_start_sample = 20  # Scenarios also solved cold, to compare the costs
+objective_scale = 1e3  # Order of |f| at the optimum: SLSQP stops early (mode 8) unscaled
+output_file = "scenario-sweep.csv"
+random_seed = 42
+
+
+# Scenario Problem ----
+def scenario_bounds(scenario):
+    lower, upper = lower_bounds.copy(), upper_bounds.copy()
+    for i, value in zip(scenario_grid, scenario):
+        upper[i] = max(value, lower[i])
+    return lower, upper
+
+
+def local_search(start, lower, upper):
+    """
+    SLSQP in coordinates normalized to the bounds of the scenario, on the
+    objective function divided by `objective_scale`. Returns x, f, the
+    constraint violation and the number of evaluations.
+    """
+    span = upper - lower
+    result = minimize(lambda u: objective_function(lower + u * span) / objective_scale, np.clip((start - lower) / span, 0, 1),
+                      method="SLSQP", bounds=[(0, 1)] * len(span),
+                      constraints=[{"type": "ineq", "fun": lambda u, g=g: g(lower + u * span)} for g in constraints],
+                      options={"ftol": 1e-10, "maxiter": 1000})
+    x = lower + np.clip(result.x, 0, 1) * span
+    violation = sum(max(0.0, -g(x)) for g in constraints)
+    return x, objective_function(x), violation, result.nfev
+
+
+def solve_scenario(arguments):
+    """
+    Solve one scenario from the given starting points and keep the best
+    result by Deb's feasibility rules (feasible first, then by f).
+    """
+    scenario, starts = arguments
+    lower, upper = scenario_bounds(scenario)
+    best, evaluations = None, 0
+    for start in starts:
+        x, f, violation, nfev = local_search(start, lower, upper)
+        evaluations += nfev
+        if best is None or (violation, f) < (best[2], best[1]):
+            best = (x, f, violation)
+    return best + (evaluations,)
+
+
+def cold_starts(rng):
+    return [init_point] + [lower_bounds + rng.random(len(init_point)) * (upper_bounds - lower_bounds)
+                           for _ in range(number_of_cold_starts - 1)]
+
+
+# Perform the Sweep ----
+if __name__ == "__main__":
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(random_seed)
+    scenarios = np.array(list(itertools.product(*scenario_grid.values())))
+    # Distances between scenarios are measured relative to the grid ranges
+    low, high = scenarios.min(axis=0), scenarios.max(axis=0)
+    normalized = (scenarios - low) / np.where(high > low, high - low, 1)
+
+    # Every scenario is a configuration of its own in the solution archive
+    archive = SolutionArchive()
+    keys = [archive.configure(objective_function, constraints, *scenario_bounds(scenario)) for scenario in scenarios]
+
+    # The first scenario is solved cold; then the others are solved in
+    # waves of one scenario per process, each warm-started from the nearest
+    # scenario solved in an earlier wave (archived scenarios are warm-started
+    # from their best known solution instead)
+    waves = [[0]] + [list(range(k, min(k + number_of_processes, len(scenarios))))
+                     for k in range(1, len(scenarios), number_of_processes)]
+    optima = {}
+    warm_evaluations = []
+    with open(output_file, "w", newline="") as file, Pool(number_of_processes) as pool:
+        writer = csv.writer(file)
+        writer.writerow(["scenario"] + [f"ub_{variable_names[i]}" for i in scenario_grid]
+                        + ["warm_start_from", "objective_value", "constraint_violation", "evaluations"]
+                        + variable_names)
+        for wave in waves:
+            solved = np.array(list(optima))
+            sources, tasks = [], []
+            for k in wave:
+                archived = archive.best(keys[k])
+                if archived:
+                    source, starts = "archive", [archived[0].x]
+                elif optima:
+                    source = int(solved[np.argmin(np.linalg.norm(normalized[solved] - normalized[k], axis=1))])
+                    starts = [optima[source]]
+                else:
+                    source, starts = None, cold_starts(rng)
+                sources.append(source)
+                tasks.append((scenarios[k], starts))
+            # Rows are written (and flushed) as soon as each solve finishes
+            for k, source, (x, f, violation, evaluations) in zip(wave, sources, pool.imap(solve_scenario, tasks)):
+                writer.writerow([k] + list(scenarios[k]) + ["" if source is None else source,
+                                                            f, violation, evaluations] + list(x))
+                file.flush()
+                optima[k] = x
+                archive.add(keys[k], x, f, violation, source="scenario_sweep.py")
+                if source is not None:
+                    warm_evaluations.append(evaluations)
+        sweep_time = time.perf_counter() - start_time
+        archive.save()
+
+        # Cold solves of a sample of the scenarios, to compare the costs
+        sample = rng.choice(np.arange(1, len(scenarios)), size=min(cold_start_sample, len(scenarios) - 1),
+                            replace=False)
+        cold = pool.map(solve_scenario, [(scenarios[k], cold_starts(rng)) for k in sample])
+
+    # Print the Summary ----
+    cold_evaluations = np.mean([evaluations for _, _, _, evaluations in cold])
+    differences = [f - objective_function(optima[k]) for k, (_, f, _, _) in zip(sample, cold)]
+    print(f"Scenarios solved: {len(scenarios)} (results in {output_file})")
+    print(f"Sweep time: {sweep_time:.3f} seconds on {number_of_processes} processes")
+    print(f"Average evaluations per scenario: {np.mean(warm_evaluations):.1f} warm-started, "
+          f"{cold_evaluations:.1f} cold ({number_of_cold_starts} starts, sample of {len(sample)})")
+    print(f"Estimated cost of the sweep: {len(scenarios) * np.mean(warm_evaluations):.0f} evaluations, "
+          f"vs {len(scenarios) * cold_evaluations:.0f} from cold starts")
+    print(f"Largest improvement of a cold solve over the warm-started one: {-min(min(differences), 0.0):.6f}")
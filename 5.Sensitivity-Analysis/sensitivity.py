@@ -8,7 +8,15 @@
 # **********************************************************************
 
 # Imports ----
+import os
+import sys
+
 import numpy as np
+from incremental_evaluation import IncrementalEvaluator
+
+# The solution archive is shared with the optimizers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "4.Stochastic-Algorithms"))
+from solution_archive import SolutionArchive
 
 # Objective Function ----
 def objective_function(x):
@@ -62,13 +70,32 @@ def g7(x): return x[11] + x[10] - 1000  # Inactive (removed)
 def g8(x): return - x[17]
 def g9(x): return x[18] - x[19]  # Inactive (removed)
 
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py: a constraint is satisfied when g(x) >= 0
+constraints = [g1, g2, g3, g4, g5, g6]
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub) ----
+lb = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+ub = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+
 # Optimal Solution ----
-# Optimal solution leads to an objective function value of -3,515.885829
-optimized_x = np.array([197.3555162, 10000.04094, 6.06058071, 6.06481227,
-                        4.55822528, 26305.20034, 4.36023396, 0.00221809,
-                        55.86751226, 1.54009833, 720.005943, 3600.099775,
-                        524.0792289, 6.04250929, 6.03679917, 4.55245179,
-                        2082.596513, 4423.625629, 52.0247252, 51.7242541])
+# Best known solution of this configuration in the solution archive, or
+# else the solution found by PSO (objective function value of -3,440.923538)
+archive = SolutionArchive()
+best_known = archive.best(archive.configure(objective_function, constraints, lb, ub))
+if best_known:
+    optimized_x = best_known[0].x
+    print(f"Best known solution from {best_known[0].source}: objective function value {best_known[0].f:.8f}")
+else:
+    optimized_x = np.array([197.3555162, 10000.04094, 6.06058071, 6.06481227,
+                            4.55822528, 26305.20034, 4.36023396, 0.00221809,
+                            55.86751226, 1.54009833, 720.005943, 3600.099775,
+                            524.0792289, 6.04250929, 6.03679917, 4.55245179,
+                            2082.596513, 4423.625629, 52.0247252, 51.7242541])
 
 variables_of_interest_indices = [16, 17, 18, 19]
 perturbation_percentage = 0.15  # 15% perturbation
@@ -77,27 +104,27 @@ perturbation_percentage = 0.15  # 15% perturbation
 def perform_sensitivity_analysis(optimized_x, variables_indices, perturbation_percentage):
     # Store the results
     results = {}
+
+    # Only the terms that depend on the perturbed variable are recomputed
+    evaluator = IncrementalEvaluator(optimized_x)
+    obj_value_optimal = evaluator.objective()
     
     for var_index in variables_indices:
         # Perturb the variable up and down by the specified percentage
         perturbation = optimized_x[var_index] * perturbation_percentage
-        x_perturbed_up = optimized_x.copy()
-        x_perturbed_down = optimized_x.copy()
-        
-        x_perturbed_up[var_index] += perturbation
-        x_perturbed_down[var_index] -= perturbation
+        values = optimized_x[var_index] + np.array([perturbation, -perturbation])
         
         # Calculate the objective function value for the perturbed values
-        obj_value_up = objective_function(x_perturbed_up)
-        obj_value_down = objective_function(x_perturbed_down)
+        # (both in one call)
+        obj_value_up, obj_value_down = evaluator.objective({var_index: values})
         
         # Store the results
         results[f'x[{var_index}]'] = {
             'Perturbation': perturbation,
             'Objective Value (Perturbed Up)': obj_value_up,
             'Objective Value (Perturbed Down)': obj_value_down,
-            'Change (Perturbed Up)': obj_value_up - objective_function(optimized_x),
-            'Change (Perturbed Down)': obj_value_down - objective_function(optimized_x),
+            'Change (Perturbed Up)': obj_value_up - obj_value_optimal,
+            'Change (Perturbed Down)': obj_value_down - obj_value_optimal,
         }
     
     return results
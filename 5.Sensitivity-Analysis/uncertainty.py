@@ -0,0 +1,261 @@
+# **********************************************************************
+# Propagation of the Uncertainty of the Fitted Coefficients ----
+#
+# Purpose ----
+# The coefficients of the objective function were estimated by the
+# regression in 1.Curve-Fitting/curve-fitting.R, so they are uncertain,
+# yet the optimization treats them as exact. This script samples K
+# coefficient vectors from their estimated distribution (multivariate
+# normal around the fitted values) and reports the resulting distribution
+# of the objective function value at the PSO optimum and at other
+# candidate solutions.
+#
+# The objective function is linear in its coefficients:
+# f(x) = beta . phi(x), where phi(x) holds the 10 regressors of the model
+# (1, 1/r, the Cobb-Douglas term, qd, ...). The K x N values for K
+# coefficient vectors and N candidates are therefore one matrix product,
+# B (K x 10) @ Phi (10 x N), computed in chunks of K so that the memory
+# stays bounded for any K.
+#
+# The constraints contain no fitted coefficients, so the feasibility of a
+# candidate does not depend on them and is reported once per candidate.
+# **********************************************************************
+
+# Imports ----
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+# The solution archive is shared with the optimizers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "4.Stochastic-Algorithms"))
+from solution_archive import SolutionArchive
+
+
+# Objective Function ----
+def objective_function(x):
+    """
+    The variables and parameters have been coded as follows:
+    x[0] = r
+    x[1] = amp_w
+    x[2] = t_w
+    x[3] = tp_w
+    x[4] = phase_w
+    x[5] = vert_w
+    x[6] = acre
+    x[7] = c_w
+    x[8] = qe
+    x[9] = ce
+    x[10] = qd
+    x[11] = qs
+    x[12] = amp_s
+    x[13] = t_s
+    x[14] = tp_s
+    x[15] = phase_s
+    x[16] = vert_s
+    x[17] = tal
+    x[18] = exp
+    x[19] = mal
+    """
+    return (
+        0.2350747 * x[0] ** (-1.0)
+        + 0.4804318 * (
+            (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+            (x[8] * x[6] * x[9]) ** 0.6
+        )
+        + 0.2811869 * x[10]
+        - 0.9963252 * x[11]
+        - 0.1230044 * ((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10])
+        + 0.2777817 * x[17] ** (-1.0)
+        + 1.1544897 * x[16] ** (-1.0)
+        + 0.1500959 * x[18] ** (-1.0)
+        + 0.1491099 * x[19] ** (-1.0)
+        + 0.0004785
+    )
+
+
+# Regressors of the Objective Function ----
+# Same order as `coefficients` (the terms of the regression in
+# curve-fitting.R); the model is written index-wise, so X.T gives one
+# column of Phi per candidate
+def regressors(x):
+    ones = np.ones_like(x[0], dtype=float)
+    return np.array([
+        ones,
+        x[0] ** (-1.0),
+        (((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) ** 0.4) *
+        (x[8] * x[6] * x[9]) ** 0.6,
+        x[10],
+        x[11],
+        (x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) - x[10],
+        x[17] ** (-1.0),
+        x[16] ** (-1.0),
+        x[18] ** (-1.0),
+        x[19] ** (-1.0),
+    ])
+
+
+coefficient_names = ["(Intercept)", "r_var", "water_energy_util_var", "dem_var", "supp_var",
+                     "diff_sup_dem_var", "tal_var", "vert_s", "exp_var", "mal_var"]
+coefficients = np.array([0.0004785, 0.2350747, 0.4804318, 0.2811869, -0.9963252,
+                         -0.1230044, 0.2777817, 1.1544897, 0.1500959, 0.1491099])
+
+
+# Constraint Functions ----
+def g1(x): return x[17] - x[0]
+
+
+def g2(x): return ((x[1] * np.sin((2 * np.pi) / x[2] * (x[3] - x[4])) + x[5]) * x[6] * x[7]) - x[0]
+
+
+def g3(x): return (x[8] * x[6] * x[9]) - x[0]
+
+
+def g4(x): return np.abs((x[12] * np.sin((2 * np.pi) / x[13] * (x[14] - x[15])) + x[16]) + x[10]) - 1000
+
+
+def g5(x): return x[0] - (x[18] + x[19])
+
+
+def g6(x): return x[11]
+
+
+def g7(x): return x[11] + x[10] - 1000  # Inactive (removed)
+
+
+def g8(x): return - x[17]
+
+
+def g9(x): return x[18] - x[19]  # Inactive (removed)
+
+
+# Constraints passed as a list of functions
+# Same active set and sense as PSO.py: a constraint is satisfied when g(x) >= 0
+constraints = [g1, g2, g3, g4, g5, g6]
+
+# Bounds: Lower-Bound (lb), Upper-Bound (ub), and Initial Point (IP) ----
+lb = np.array([34.5799, 9999.9999, 5.9999, 5.9999, 4.4999, 26305.1399, 0.0999,
+               0.00034, 4.9999, 1.4899, 719.9999, 719.9999, 179.9999, 5.9999,
+               5.9999, 4.4999, 719.9999, 36.9999, 0.3699, 0.3699])
+ub = np.array([345.68, 10000.1, 6.1, 6.1, 4.6, 26305.24, 20.1, 0.10044, 100.1,
+               1.59, 3600.1, 3600.1, 675.1, 6.1, 6.1, 4.6, 2700.1, 7400.1,
+               148.1, 444.52])
+ip = np.array([190.08,  10000,  6,  6,  4.5,  26305.14,  10.05,  0.00044,
+               52.5,  1.49,  2160,  2160,  427.5,  6,  6,  4.5,  1710,  3718.5,
+               74.185, 222.395])
+
+# Optimal solution found by PSO
+pso_x = np.array([197.3555162, 10000.04094, 6.06058071, 6.06481227,
+                  4.55822528, 26305.20034, 4.36023396, 0.00221809,
+                  55.86751226, 1.54009833, 720.005943, 3600.099775,
+                  524.0792289, 6.04250929, 6.03679917, 4.55245179,
+                  2082.596513, 4423.625629, 52.0247252, 51.7242541])
+
+# Uncertainty Settings ----
+# Covariance matrix of the coefficients exported by curve-fitting.R
+covariance_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1.Curve-Fitting",
+                               "coefficient-covariance.csv")
+number_of_samples = 10 ** 7  # K coefficient vectors
+chunk_size = 10 ** 6  # Coefficient vectors per chunk
+number_of_archived_candidates = 3  # Best known solutions added as candidates
+number_of_bins = 4000  # Histogram bins per candidate (for the quantiles)
+quantiles = [0.05, 0.5, 0.95]
+random_seed = 42
+
+
+# Distribution of the Coefficients ----
+def coefficient_covariance():
+    """
+    Covariance matrix in the order of `coefficient_names`. Coefficients
+    that the stepwise selection dropped (absent from the file) keep their
+    value with no uncertainty.
+    """
+    if not os.path.exists(covariance_file):
+        raise FileNotFoundError(f"{covariance_file} not found: run 1.Curve-Fitting/curve-fitting.R first "
+                                "to export the covariance of the fitted coefficients")
+    with open(covariance_file) as file:
+        rows = list(csv.reader(file))
+    names = rows[0][1:]
+    values = {row[0]: dict(zip(names, map(float, row[1:]))) for row in rows[1:]}
+    covariance = np.array([[values.get(i, {}).get(j, 0.0) for j in coefficient_names] for i in coefficient_names])
+    return covariance
+
+
+def sample_coefficients(rng, size, cholesky):
+    return coefficients + rng.standard_normal((size, len(coefficients))) @ cholesky.T
+
+
+# Perform the Uncertainty Analysis ----
+if __name__ == "__main__":
+    rng = np.random.default_rng(random_seed)
+    covariance = coefficient_covariance()
+    # Cholesky factor (eigen-decomposition, so that a singular or
+    # semi-definite covariance also works)
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    cholesky = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+    # Candidate solutions: the initial point, PSO's optimum and the best
+    # known solutions in the solution archive
+    candidates = {"Initial point": ip, "PSO optimum": pso_x}
+    archive = SolutionArchive()
+    for k, solution in enumerate(archive.best(archive.configure(objective_function, constraints, lb, ub),
+                                              number_of_archived_candidates)):
+        candidates[f"Best known #{k + 1} ({solution.source})"] = solution.x
+    names = list(candidates)
+    X = np.array(list(candidates.values()))
+    Phi = regressors(X.T)
+    nominal = coefficients @ Phi
+    assert np.allclose(nominal, objective_function(X.T)), "regressors() does not match objective_function()"
+
+    # The distribution of f is normal since f is linear in beta: the
+    # histogram spans +-8 standard deviations around the nominal value
+    exact_std = np.sqrt(np.einsum("in,ij,jn->n", Phi, covariance, Phi))
+    low, high = nominal - 8 * exact_std - 1e-12, nominal + 8 * exact_std + 1e-12
+    histograms = np.zeros((len(names), number_of_bins + 2), dtype=np.int64)  # + under/overflow
+
+    # Streaming statistics over the chunks
+    total, total_squares = np.zeros(len(names)), np.zeros(len(names))
+    minimum, maximum = np.full(len(names), np.inf), np.full(len(names), -np.inf)
+    times_best = np.zeros(len(names), dtype=np.int64)
+    evaluation_time = 0.0
+    start_time = time.perf_counter()
+    for start in range(0, number_of_samples, chunk_size):
+        B = sample_coefficients(rng, min(chunk_size, number_of_samples - start), cholesky)
+        evaluation_start = time.perf_counter()
+        F = B @ Phi  # K x N values of the objective function in one product
+        evaluation_time += time.perf_counter() - evaluation_start
+
+        total += F.sum(axis=0)
+        total_squares += (F ** 2).sum(axis=0)
+        minimum, maximum = np.minimum(minimum, F.min(axis=0)), np.maximum(maximum, F.max(axis=0))
+        times_best += np.bincount(F.argmin(axis=1), minlength=len(names))
+        bins = np.floor((F - low) / (high - low) * number_of_bins).astype(np.int64) + 1
+        bins = np.clip(bins, 0, number_of_bins + 1)
+        for n in range(len(names)):
+            histograms[n] += np.bincount(bins[:, n], minlength=number_of_bins + 2)
+    elapsed = time.perf_counter() - start_time
+
+    mean = total / number_of_samples
+    std = np.sqrt(np.maximum(total_squares / number_of_samples - mean ** 2, 0))
+    cumulative = np.cumsum(histograms, axis=1) / number_of_samples
+
+    # Print the Results ----
+    print(f"Coefficients: {covariance_file}")
+    print(f"{number_of_samples} coefficient vectors x {len(names)} candidates = "
+          f"{number_of_samples * len(names)} evaluations in {elapsed:.3f} seconds "
+          f"({number_of_samples * len(names) / evaluation_time:.3g} evaluations per second in the products, "
+          f"{number_of_samples * len(names) / elapsed:.3g} including the sampling)")
+    for n, name in enumerate(names):
+        # Quantiles from the histogram (bin k + 1 covers low + k * width)
+        width = (high[n] - low[n]) / number_of_bins
+        values = [low[n] + (np.searchsorted(cumulative[n], q) - 1 + 0.5) * width for q in quantiles]
+        violation = sum(max(0.0, -g(X[n])) for g in constraints)
+        print(f"\n{name}:")
+        print(f"  Objective function value (fitted coefficients): {nominal[n]:.6f}")
+        print(f"  Mean: {mean[n]:.6f}, standard deviation: {std[n]:.6f} (exact: {exact_std[n]:.6f})")
+        print(f"  Minimum: {minimum[n]:.6f}, maximum: {maximum[n]:.6f}")
+        print("  Quantiles: " + ", ".join(f"{q:.0%}: {value:.6f}" for q, value in zip(quantiles, values)))
+        print(f"  Probability of being the best candidate: {times_best[n] / number_of_samples:.4f}")
+        print(f"  Feasible for every coefficient vector: {violation <= 1e-6} (constraint violation {violation:.6g})")
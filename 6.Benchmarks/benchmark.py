@@ -0,0 +1,286 @@
+# **********************************************************************
+# Kernel Microbenchmarks ----
+#
+# Purpose ----
+# Measure the throughput (points evaluated per second) of the model
+# kernels that every algorithm spends its time in: the objective function,
+# the constraints g1..g9, the feasibility check of the random search, the
+# fitness and penalized objectives of GA.py and SA.py, the fused
+# population evaluation of CMAES.py and the exact gradients of
+# BH-Walkers.py. Each kernel is timed for batch sizes of 1, 10^2, 10^4 and
+# 10^6 points, with each backend it supports:
+# - scalar: one Python call per point, as the scipy/nlopt/pyswarm scripts
+#   do;
+# - batched: one call on the whole batch, x = X.T (the model is written
+#   index-wise);
+# - fused: objective function and all the constraints in one pass;
+# - compiled: the batched kernel compiled with numba (only if installed).
+# The kernels are loaded from the scripts themselves (definitions only,
+# without running the optimizations), so a slowdown in any script shows.
+#
+# Results are compared with a machine-readable baseline (baseline.json)
+# and the run fails (exit status 1) when the throughput of a kernel falls
+# by more than `threshold`. To compare results across hosts, every
+# throughput is also normalized by the speed of a fixed reference workload
+# timed alternately with the kernel (pure Python for the scalar and
+# single-point cases, numpy otherwise), and the comparison uses the
+# normalized values.
+#
+# python benchmark.py                    # Compare with the baseline
+# python benchmark.py --save-baseline    # Store a new baseline
+# python benchmark.py --filter g2 --threshold 0.1
+# **********************************************************************
+
+# Imports ----
+import argparse
+import ast
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Benchmark Settings ----
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+baseline_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+batch_sizes = [1, 10 ** 2, 10 ** 4, 10 ** 6]
+max_scalar_size = 10 ** 4  # Scalar backends are too slow for larger batches
+threshold = 0.35  # Largest tolerated fall in normalized throughput (noise is ~20%)
+min_time = 0.1  # Seconds per repeat (the number of calls is adjusted)
+repeats = 5  # The best repeat is kept, as in timeit
+random_seed = 42
+
+
+# Loading the Kernels ----
+def load_definitions(path):
+    """
+    Run only the definitions of a script: imports, functions, classes and
+    assignments that call nothing but numpy (the model, bounds and
+    constraint lists), skipping everything that runs an optimization.
+    Returns the resulting namespace.
+    """
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+
+    def only_numpy_calls(node):
+        return all(isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name)
+                   and call.func.value.id == "np" for call in ast.walk(node) if isinstance(call, ast.Call))
+
+    namespace = {"__name__": os.path.splitext(os.path.basename(path))[0], "__file__": path}
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    try:
+        for node in tree.body:
+            if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+                exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+            elif isinstance(node, ast.Assign) and only_numpy_calls(node):
+                try:
+                    exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+                except NameError:
+                    pass  # Reads the result of a statement that was skipped
+    finally:
+        sys.path.pop(0)
+    return namespace
+
+
+def compiled(function):
+    """
+    The batched kernel compiled with numba, or None if numba is not
+    installed or cannot compile it.
+    """
+    if numba is None:
+        return None
+    kernel = numba.njit(function)
+    try:
+        kernel(np.ones((20, 2)))
+    except Exception:
+        return None
+    return lambda X: kernel(np.ascontiguousarray(X.T))
+
+
+def kernels():
+    """
+    (kernel name, backend, function of a batch X with one point per row)
+    for every kernel and backend.
+    """
+    scripts = {
+        "random-search.py": os.path.join(root, "2.Baseline", "random-search.py"),
+        "CMAES.py": os.path.join(root, "4.Stochastic-Algorithms", "CMAES.py"),
+        "GA.py": os.path.join(root, "4.Stochastic-Algorithms", "GA.py"),
+        "SA.py": os.path.join(root, "4.Stochastic-Algorithms", "SA.py"),
+        "BH-Walkers.py": os.path.join(root, "4.Stochastic-Algorithms", "BH-Walkers.py"),
+    }
+    loaded = {name: load_definitions(path) for name, path in scripts.items()}
+    model = loaded["random-search.py"]
+
+    cases = []
+    for name in ["objective_function"] + [f"g{k}" for k in range(1, 10)]:
+        function = model[name]
+        cases.append((name, "scalar", lambda X, function=function: [function(x) for x in X]))
+        cases.append((name, "batched", lambda X, function=function: function(X.T)))
+        kernel = compiled(function)
+        if kernel is not None:
+            cases.append((name, "compiled", kernel))
+    cases.append(("is_feasible", "scalar", lambda X: [model["is_feasible"](x) for x in X]))
+
+    # Fitness of GA.py (constraint violation and f of an individual)
+    ga = loaded["GA.py"]
+    cases.append(("GA.py objective", "scalar", lambda X: [ga["objective"](list(x)) for x in X]))
+
+    # Penalized objective of SA.py, with its adaptive penalty weights
+    sa = loaded["SA.py"]
+    penalty = sa["AdaptivePenalty"](window=1000)
+    penalty.calibrate(sa["objective_function"], sa["constraint_values"], sa["lb"], sa["ub"],
+                      rng=np.random.default_rng(random_seed))
+    penalized = sa["PenalizedObjective"](sa["objective_function"], sa["constraint_values"], penalty)
+    cases.append(("SA.py penalized objective", "scalar", lambda X: [penalized(x) for x in X]))
+
+    cmaes = loaded["CMAES.py"]
+    cases.append(("evaluate_population", "fused", cmaes["evaluate_population"]))
+    cases.append(("repair", "batched", cmaes["repair"]))
+
+    # Gradient paths, with the penalized objective and gradient that the
+    # walkers of BH-Walkers.py give to L-BFGS-B (jac=True)
+    bh = loaded["BH-Walkers.py"]
+    cases.append(("objective_gradient", "scalar", lambda X: [bh["objective_gradient"](x) for x in X]))
+    cases.append(("objective_gradient", "batched", lambda X: bh["objective_gradient"](X.T)))
+    cases.append(("constraints_jacobian", "scalar", lambda X: [bh["constraints_jacobian"](x) for x in X]))
+    bh_penalty = bh["AdaptivePenalty"]()
+    bh_penalty.calibrate(bh["objective_function"], bh["constraint_values"], bh["lb"], bh["ub"],
+                         rng=np.random.default_rng(random_seed))
+    bh_penalized = bh["PenalizedObjective"](bh["objective_function"], bh["constraint_values"], bh_penalty,
+                                            objective_gradient=bh["objective_gradient"],
+                                            constraints_jacobian=bh["constraints_jacobian"])
+    cases.append(("BH-Walkers.py penalized objective", "scalar", lambda X: [bh_penalized(x) for x in X]))
+    return cases, cmaes["lb"], cmaes["ub"]
+
+
+# Reference Workloads ----
+# Fixed workloads that measure the speed of the host: a pure Python loop
+# and a numpy expression similar to the model
+python_values = [float(i) for i in range(10 ** 4)]
+numpy_values = np.random.default_rng(random_seed).random(10 ** 5) + 1.0
+
+
+def python_workload():
+    total = 0.0
+    for value in python_values:
+        total += value * 0.5 + 1.0
+    return total
+
+
+def numpy_workload():
+    return np.sin(numpy_values) * numpy_values ** 0.4 + numpy_values ** (-1.0)
+
+
+reference_workloads = {"python": (python_workload, len(python_values)),
+                       "numpy": (numpy_workload, len(numpy_values))}
+
+
+# Timing ----
+def calls_per_repeat(function, *arguments):
+    """
+    Number of calls of function(*arguments) that lasts `min_time`.
+    """
+    function(*arguments)  # Warm-up
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function(*arguments)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls
+        calls = max(2 * calls, int(calls * min_time / max(elapsed, 1e-9)))
+
+
+def seconds_per_call(function, calls, *arguments):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function(*arguments)
+    return (time.perf_counter() - start) / calls
+
+
+def measure(function, X, reference):
+    """
+    Throughput of function(X) in points per second (best of `repeats`),
+    and the throughput normalized by the reference workload. The kernel
+    and the reference are timed alternately, and the median ratio is kept,
+    so that changes in the speed of the host during the run cancel out.
+    """
+    workload, operations = reference_workloads[reference]
+    calls, reference_calls = calls_per_repeat(function, X), calls_per_repeat(workload)
+    throughputs, ratios = [], []
+    for _ in range(repeats):
+        throughput = len(X) / seconds_per_call(function, calls, X)
+        throughputs.append(throughput)
+        ratios.append(throughput / (operations / seconds_per_call(workload, reference_calls)))
+    return max(throughputs), float(np.median(ratios))
+
+
+def host_information():
+    return {"machine": platform.machine(), "processor": platform.processor(), "system": platform.system(),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "numba": numba.__version__ if numba is not None else None}
+
+
+# Perform the Benchmarks ----
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kernel microbenchmarks with regression thresholds")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=baseline_file, help="baseline file (JSON)")
+    parser.add_argument("--threshold", type=float, default=threshold,
+                        help="largest tolerated fall in normalized throughput (0.35 = 35%%)")
+    parser.add_argument("--filter", default="", help="only the kernels whose name contains this text")
+    parser.add_argument("--max-size", type=int, default=max(batch_sizes), help="largest batch size")
+    arguments = parser.parse_args()
+
+    cases, lower, upper = kernels()
+    rng = np.random.default_rng(random_seed)
+    batches = {size: lower + rng.random((size, len(lower))) * (upper - lower)
+               for size in batch_sizes if size <= arguments.max_size}
+
+    baseline = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results, regressions = {}, []
+    print(f"{'Kernel':<34}{'Backend':<10}{'Size':>9}{'Points/s':>14}{'Normalized':>12}{'vs baseline':>13}")
+    for name, backend, function in cases:
+        if arguments.filter not in name:
+            continue
+        for size, X in batches.items():
+            if backend == "scalar" and size > max_scalar_size:
+                continue
+            reference = "python" if backend == "scalar" or size == 1 else "numpy"
+            throughput, normalized = measure(function, X, reference)
+            key = f"{name}/{backend}/{size}"
+            results[key] = {"throughput": throughput, "normalized": normalized, "reference": reference}
+
+            comparison = ""
+            if key in baseline:
+                ratio = normalized / baseline[key]["normalized"]
+                comparison = f"{ratio:.2f}x"
+                if ratio < 1 - arguments.threshold:
+                    regressions.append((key, ratio))
+                    comparison += " SLOWER"
+            print(f"{name:<34}{backend:<10}{size:>9}{throughput:>14.4g}{normalized:>12.4g}{comparison:>13}")
+
+    if arguments.save_baseline:
+        # Merge, so that a filtered run only replaces its own kernels
+        with open(arguments.baseline, "w") as file:
+            json.dump({"host": host_information(), "results": {**baseline, **results}},
+                      file, indent=1, sort_keys=True)
+        print(f"Baseline saved in {arguments.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} kernel(s) slower than the baseline by more than {arguments.threshold:.0%}:")
+        for key, ratio in regressions:
+            print(f"  {key}: {ratio:.2f}x")
+        sys.exit(1)